@@ -1,30 +1,203 @@
 """
 Configuration for AgentCore agent
-HARDCODED values since environment variables weren't loading properly
+HARDCODED defaults below; any setting can be overridden by an environment
+variable of the same name (USE_TRANSLATE=true, LOG_LEVEL=DEBUG, ...).
+The environment is read once, on first access.
 """
+import os
 
-# Bedrock configuration
-USE_BEDROCK = True
-BEDROCK_MODEL_ID = 'anthropic.claude-3-5-sonnet-20241022-v2:0'
-BEDROCK_REGION = 'us-east-1'
+_SRC_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Knowledge Base configuration
-USE_KNOWLEDGE_BASE = True
-KNOWLEDGE_BASE_ID = 'QHCE1VIKMX'
 
-# Comprehend configuration
-USE_COMPREHEND = True
+class Settings:
+    """
+    Typed agent settings; field annotations drive environment parsing
+    """
 
-# Translate configuration
-USE_TRANSLATE = False
+    # Bedrock configuration
+    use_bedrock: bool = True
+    bedrock_model_id: str = 'anthropic.claude-3-5-sonnet-20241022-v2:0'
+    bedrock_region: str = 'us-east-1'
 
-# Region
-AWS_REGION = 'us-east-1'
+    # Knowledge Base configuration
+    use_knowledge_base: bool = True
+    knowledge_base_id: str = 'QHCE1VIKMX'
+    knowledge_base_docs_dir: str = os.path.join(_SRC_DIR, '..', '..', '..', '..', 'knowledge-base')
 
-print(f"[CONFIG] Loaded configuration:")
-print(f"  USE_BEDROCK: {USE_BEDROCK}")
-print(f"  USE_KNOWLEDGE_BASE: {USE_KNOWLEDGE_BASE}")
-print(f"  KNOWLEDGE_BASE_ID: {KNOWLEDGE_BASE_ID}")
-print(f"  USE_COMPREHEND: {USE_COMPREHEND}")
-print(f"  USE_TRANSLATE: {USE_TRANSLATE}")
-print(f"  AWS_REGION: {AWS_REGION}")
+    # Policy answer cache configuration
+    use_policy_cache: bool = True
+    policy_cache_max_entries: int = 512
+    policy_cache_ttl_seconds: float = 900
+    policy_cache_similarity: float = 0.8
+    # Policy documents are re-stat'ed for changes at most this often
+    policy_namespace_recheck_seconds: float = 30
+
+    # Local policy retrieval: confident matches are answered in-process without Bedrock
+    use_local_retrieval: bool = True
+    local_index_path: str = '/tmp/policy-index.idx'
+    local_retrieval_min_confidence: float = 0.7
+
+    # Concurrent identical knowledge base / translate requests share one AWS call
+    use_request_coalescing: bool = True
+
+    # Conversation sessions keyed by sessionId; SESSION_DB (e.g. '/tmp/sessions.db') persists them
+    use_sessions: bool = True
+    session_max_entries: int = 1000
+    session_ttl_seconds: float = 3600
+    session_db: str = None
+
+    # Record IDs and PNRs: each process needs a distinct node. Set ID_NODE (0-65535, one
+    # per process) to guarantee it; otherwise each process draws a random node, kept
+    # distinct from others on the same host via lock files in ID_NODE_DIR. Set
+    # ID_NODE_REQUIRED where nodes are assigned, so a missing ID_NODE fails fast.
+    id_node: int = None
+    id_node_dir: str = '/tmp/agent-id-nodes'
+    id_node_required: bool = False
+
+    # Comprehend configuration
+    use_comprehend: bool = True
+    # Identify the language locally and answer clear-cut sentiment from word lists; only
+    # ambiguous text reaches Comprehend, in its language (or translated to English when
+    # Comprehend does not support it and USE_TRANSLATE is on). Below
+    # language_min_confidence the message is treated as English.
+    use_local_sentiment: bool = True
+    language_min_confidence: float = 0.8
+
+    # Translate configuration
+    use_translate: bool = False
+    use_translation_memory: bool = True
+    translation_memory_max_entries: int = 5000
+    # Optional on-disk tier, e.g. '/tmp/translation-memory.db'; None keeps it in memory only
+    translation_memory_db: str = None
+    # Language groups of a broadcast_notification translated concurrently
+    broadcast_max_concurrency: int = 4
+
+    # Flight schedule (.csv, .json, .parquet or saved .idx); mock options are generated when missing
+    flight_schedule_path: str = os.path.join(_SRC_DIR, 'data', 'flight_schedule.csv')
+    rebooking_option_count: int = 5
+
+    # Seat inventory for hold_seats / confirm_booking. BOOKING_DB (e.g. '/tmp/bookings.db')
+    # shares holds and seat counters between processes; None keeps them in this process.
+    # Flights missing from the schedule get default_flight_seats seats.
+    use_booking_inventory: bool = True
+    booking_db: str = None
+    seat_hold_ttl_seconds: float = 600
+    default_flight_seats: int = 9
+
+    # Escalations wait in a priority queue for human agents (assign_escalations). Priority,
+    # tier and sentiment set a starting score (0-130); every minute waited adds aging
+    # points, so a calm General passenger's NORMAL escalation is eventually served ahead
+    # of new HIGH ones from furious Platinum passengers (110 points: 220 minutes at 0.5).
+    use_escalation_queue: bool = True
+    escalation_aging_points_per_minute: float = 0.5
+
+    # Tool execution configuration
+    tool_timeout_seconds: float = 30
+    tool_timeouts: dict = {
+        'query_policy': 20,
+        'translate_message': 10,
+        'analyze_passenger_sentiment': 10,
+    }
+    max_tool_concurrency: int = 8
+    # Kept back from the caller's budget (timeoutSeconds / runtime time left) to build the response
+    deadline_margin_seconds: float = 0.25
+
+    # AWS dependency resilience (Bedrock knowledge base, Comprehend, Translate).
+    # After circuit_failure_threshold consecutive failures a service's circuit opens and
+    # calls fail fast to the tools' fallback answers; one probe is let through after
+    # circuit_reset_seconds.
+    use_circuit_breakers: bool = True
+    circuit_failure_threshold: int = 5
+    circuit_reset_seconds: float = 30
+    # A second, identical request is sent when the first is slower than this percentile
+    # of the service's recent latencies; hedges are capped at hedge_max_ratio of calls.
+    # Only cheap idempotent reads are hedged: services not listed never are, nor are
+    # Bedrock model calls (billed per invocation) or calls shared by a single-flight group.
+    use_hedged_requests: bool = True
+    hedge_percentiles: dict = {
+        'comprehend': 95,
+        'translate': 95,
+    }
+    hedge_max_ratio: float = 0.1
+
+    # Response encoding: JSON_CODEC is auto (orjson when installed), orjson or json.
+    # Bodies of at least compression_min_bytes are compressed (brotli when installed,
+    # else gzip) for callers sending Accept-Encoding, and returned base64-encoded.
+    json_codec: str = 'auto'
+    response_compression: bool = True
+    compression_min_bytes: int = 1024
+    compression_level: int = 5
+
+    # Region
+    aws_region: str = 'us-east-1'
+
+    # Metrics configuration
+    metrics_enabled: bool = True
+    metrics_namespace: str = 'FlightDisruptionAgent'
+    # EMF metric lines are written to stdout at most this often
+    metrics_flush_interval_seconds: float = 60
+
+    # Logging configuration
+    log_level: str = 'INFO'
+    # Fraction of full request/response payload logs kept at DEBUG level
+    log_payload_sample_rate: float = 0.01
+    log_redact_passenger_text: bool = True
+
+    def __init__(self, **overrides):
+        for name, value in overrides.items():
+            if name not in self.__annotations__:
+                raise TypeError(f"Unknown setting: {name}")
+            setattr(self, name, value)
+
+    @classmethod
+    def from_env(cls, environ=None):
+        """
+        Defaults overridden by upper-case environment variables
+        """
+        environ = os.environ if environ is None else environ
+        overrides = {}
+        for name, kind in cls.__annotations__.items():
+            raw = environ.get(name.upper())
+            if raw is not None:
+                overrides[name] = _parse(name, kind, raw)
+        return cls(**overrides)
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__annotations__)
+        return f"Settings({fields})"
+
+
+def _parse(name: str, kind: type, raw: str):
+    raw = raw.strip()
+    if kind is bool:
+        if raw.lower() in ('1', 'true', 'yes', 'on'):
+            return True
+        if raw.lower() in ('0', 'false', 'no', 'off', ''):
+            return False
+        raise ValueError(f"{name.upper()} must be a boolean, got {raw!r}")
+    if kind is dict:
+        import json
+        return json.loads(raw)
+    if kind is str:
+        return raw or None
+    return kind(raw)
+
+
+_settings = None
+
+
+def get_settings() -> Settings:
+    """
+    Shared settings, read from the environment on first use
+    """
+    global _settings
+    if _settings is None:
+        _settings = Settings.from_env()
+    return _settings
+
+
+def __getattr__(name: str):
+    # Module-level constants (from config import USE_BEDROCK) resolve against the settings
+    if name.isupper() and name.lower() in Settings.__annotations__:
+        return getattr(get_settings(), name.lower())
+    raise AttributeError(f"module 'config' has no attribute {name!r}")
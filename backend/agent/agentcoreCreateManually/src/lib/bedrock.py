@@ -1,23 +1,35 @@
 """
 Bedrock utilities for knowledge base queries
 """
-import boto3
 import json
-from config import AWS_REGION, KNOWLEDGE_BASE_ID
+from lib.log import get_logger, redact
+from lib.resilience import call_service
+from lib.singleflight import SingleFlight
+from config import AWS_REGION, KNOWLEDGE_BASE_ID, USE_REQUEST_COALESCING
 
-bedrock_agent_runtime = boto3.client('bedrock-agent-runtime', region_name=AWS_REGION)
+logger = get_logger('bedrock')
+
+_in_flight = SingleFlight('bedrock.retrieve_and_generate')
 
 
 def query_knowledge_base(query: str, kb_id: str = None) -> dict:
     """
-    Query the Bedrock Knowledge Base
+    Query the Bedrock Knowledge Base.
+    Concurrent identical questions (ignoring case and spacing) share one request.
     """
     kb_id = kb_id or KNOWLEDGE_BASE_ID
-    
-    print(f"[BEDROCK] Querying knowledge base {kb_id}: {query}")
+    if USE_REQUEST_COALESCING:
+        key = (kb_id, ' '.join(query.lower().split()))
+        return _in_flight.do(key, _query_knowledge_base, query, kb_id)
+    return _query_knowledge_base(query, kb_id)
+
+
+def _query_knowledge_base(query: str, kb_id: str) -> dict:
+    logger.info("Querying knowledge base %s: %s", kb_id, redact(query))
     
     try:
-        response = bedrock_agent_runtime.retrieve_and_generate(
+        response = call_service(
+            'bedrock-agent-runtime', 'retrieve_and_generate',
             input={'text': query},
             retrieveAndGenerateConfiguration={
                 'type': 'KNOWLEDGE_BASE',
@@ -40,7 +52,7 @@ def query_knowledge_base(query: str, kb_id: str = None) -> dict:
                     'location': ref.get('location', {})
                 })
         
-        print(f"[BEDROCK] Knowledge base response: {answer[:100]}...")
+        logger.info("Knowledge base response: %d chars, %d citations", len(answer), len(citations))
         
         return {
             'answer': answer,
@@ -48,5 +60,5 @@ def query_knowledge_base(query: str, kb_id: str = None) -> dict:
         }
     
     except Exception as e:
-        print(f"[BEDROCK ERROR] {e}")
+        logger.error("Knowledge base query failed: %s", e)
         raise
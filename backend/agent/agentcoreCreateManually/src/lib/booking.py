@@ -0,0 +1,329 @@
+"""
+Seat holds and idempotent booking confirmation against per-flight seat counters.
+Counters are kept per flight instance (lib.options.flight_instance: number and
+departure), so each day's departure of a flight number has its own seats.
+Stores mimic DynamoDB: versioned items and all-or-nothing conditional transactions,
+so the engine runs unchanged on a table-backed store.
+"""
+import datetime
+import heapq
+import json
+import random
+import sqlite3
+import threading
+import time
+from lib import metrics
+from lib.ids import new_pnr, new_id
+from lib.log import get_logger
+from lib.options import parse_flight_instance
+
+logger = get_logger('booking')
+
+# Tables
+INVENTORY = 'inventory'
+HOLDS = 'holds'
+BOOKINGS = 'bookings'
+REQUESTS = 'requests'
+
+HELD, CONFIRMED, EXPIRED = 'HELD', 'CONFIRMED', 'EXPIRED'
+
+# Optimistic attempts before giving up on a hot flight; later attempts back off briefly
+MAX_ATTEMPTS = 50
+BACKOFF_AFTER = 3
+MAX_BACKOFF_SECONDS = 0.005
+
+# Expired holds released per sweep
+SWEEP_LIMIT = 100
+
+
+class ConditionFailed(Exception):
+    """
+    A transaction's version check failed; nothing was written
+    """
+
+
+class BookingError(Exception):
+    """
+    A hold or booking that cannot be made. code is SOLD_OUT, HOLD_NOT_FOUND or CONTENTION.
+    """
+
+    def __init__(self, code: str, message: str, flights: list = None):
+        super().__init__(message)
+        self.code = code
+        self.flights = flights or []
+
+
+class MemoryBookingStore:
+    """
+    In-process store: items keyed by (table, key), each with a version.
+
+    transact() applies a list of writes (table, key, expected_version, item)
+    atomically: expected_version None means the item must not exist yet, item
+    None deletes it. Items carrying an 'expires_at' are indexed for expiring().
+    """
+
+    def __init__(self):
+        self._items = {}
+        self._expiry = []
+        self._lock = threading.Lock()
+
+    def get(self, table: str, key: str):
+        item = self._items.get((table, key))
+        return dict(item) if item is not None else None
+
+    def transact(self, writes: list):
+        with self._lock:
+            for table, key, version, _item in writes:
+                current = self._items.get((table, key))
+                if (current['version'] if current is not None else None) != version:
+                    raise ConditionFailed(f"{table}/{key} changed")
+            for table, key, version, item in writes:
+                if item is None:
+                    self._items.pop((table, key), None)
+                    continue
+                item = dict(item, version=(version or 0) + 1)
+                self._items[(table, key)] = item
+                if 'expires_at' in item:
+                    heapq.heappush(self._expiry, (item['expires_at'], table, key))
+
+    def expiring(self, table: str, now: float, limit: int) -> list:
+        """
+        Up to limit items of table whose expires_at has passed
+        """
+        found = []
+        with self._lock:
+            while self._expiry and self._expiry[0][0] <= now and len(found) < limit:
+                expires_at, entry_table, key = heapq.heappop(self._expiry)
+                item = self._items.get((entry_table, key))
+                # Entries left behind by later writes are skipped
+                if entry_table == table and item is not None and item.get('expires_at') == expires_at:
+                    found.append((key, dict(item)))
+        return found
+
+
+class SqliteBookingStore:
+    """
+    Local stand-in for DynamoDB tables, shared by every process on the host.
+    Reads are plain SELECTs; transact() checks versions and writes inside one
+    IMMEDIATE transaction, like a TransactWriteItems call with conditions.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        db = self._db()
+        db.execute(
+            'CREATE TABLE IF NOT EXISTS items (tbl TEXT, key TEXT, version INTEGER, expires_at REAL, '
+            'value TEXT, PRIMARY KEY (tbl, key)) WITHOUT ROWID'
+        )
+        db.execute('CREATE INDEX IF NOT EXISTS items_expiry ON items (tbl, expires_at) WHERE expires_at IS NOT NULL')
+
+    def _db(self):
+        # One connection per thread; SQLite handles the locking between them and between processes
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+        return db
+
+    def get(self, table: str, key: str):
+        row = self._db().execute('SELECT version, value FROM items WHERE tbl = ? AND key = ?', (table, key)).fetchone()
+        return dict(json.loads(row[1]), version=row[0]) if row else None
+
+    def transact(self, writes: list):
+        db = self._db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            for table, key, version, _item in writes:
+                row = db.execute('SELECT version FROM items WHERE tbl = ? AND key = ?', (table, key)).fetchone()
+                if (row[0] if row else None) != version:
+                    raise ConditionFailed(f"{table}/{key} changed")
+            for table, key, version, item in writes:
+                if item is None:
+                    db.execute('DELETE FROM items WHERE tbl = ? AND key = ?', (table, key))
+                    continue
+                value = _without(item)
+                db.execute('INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, ?)',
+                           (table, key, (version or 0) + 1, item.get('expires_at'), json.dumps(value)))
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def expiring(self, table: str, now: float, limit: int) -> list:
+        rows = self._db().execute(
+            'SELECT key, version, value FROM items WHERE tbl = ? AND expires_at IS NOT NULL AND expires_at <= ? LIMIT ?',
+            (table, now, limit)
+        ).fetchall()
+        return [(key, dict(json.loads(value), version=version)) for key, version, value in rows]
+
+
+class BookingEngine:
+    """
+    Seat holds with a TTL and idempotent confirmations.
+
+    Each flight has a counter of available seats. A hold takes a seat on every
+    leg of an itinerary and expires after hold_ttl seconds unless confirmed;
+    expired holds give their seats back. Every change is read-validate-write:
+    the items are read, the new state is computed, and the transaction commits
+    only if none of them changed in between (otherwise it is retried), so no
+    lock is held while deciding and no seat is ever sold twice.
+
+    A confirmation is recorded under its idempotency key in the same transaction
+    that creates the booking: a retried confirm returns the original PNR.
+    """
+
+    def __init__(self, store=None, capacity=None, hold_ttl: float = 600, default_seats: int = 9, clock=time.time):
+        self.store = store if store is not None else MemoryBookingStore()
+        self.capacity = capacity or (lambda flight: default_seats)
+        self.hold_ttl = hold_ttl
+        self._clock = clock
+        self._next_sweep = 0.0
+
+    def hold(self, passenger_id: str, flights: list) -> dict:
+        """
+        Hold a seat on every flight of an itinerary for hold_ttl seconds
+        """
+        for attempt in range(MAX_ATTEMPTS):
+            now = self._clock()
+            self._maybe_sweep(now)
+            seats = self._take_seats(flights, now)
+            hold_id = new_id('HLD')
+            hold = {'passenger_id': passenger_id, 'flights': list(flights), 'status': HELD,
+                    'expires_at': now + self.hold_ttl}
+            try:
+                self.store.transact(seats + [(HOLDS, hold_id, None, hold)])
+            except ConditionFailed:
+                self._conflict(attempt)
+                continue
+            metrics.increment('booking.holds')
+            return {'hold_id': hold_id, 'flights': list(flights), 'expires_at': _iso(hold['expires_at'])}
+        raise BookingError('CONTENTION', 'Too many concurrent updates; try again', flights)
+
+    def confirm(self, passenger_id: str, option_id: str, flights: list, idempotency_key: str,
+                hold_id: str = None) -> dict:
+        """
+        Book an itinerary, using the passenger's hold when one is given and still valid.
+        Returns the booking; a repeated idempotency key returns the original booking.
+        """
+        for attempt in range(MAX_ATTEMPTS):
+            done = self.store.get(REQUESTS, idempotency_key)
+            if done is not None:
+                metrics.increment('booking.replayed')
+                return dict(done['booking'], replayed=True)
+
+            now = self._clock()
+            hold = self.store.get(HOLDS, hold_id) if hold_id else None
+            if hold_id and (hold is None or hold['passenger_id'] != passenger_id):
+                raise BookingError('HOLD_NOT_FOUND', f"No hold {hold_id} for passenger {passenger_id}", flights)
+            if hold is not None and hold['status'] == CONFIRMED:
+                # Confirmed before under another key: same booking
+                return dict(self.store.get(BOOKINGS, hold['pnr']), replayed=True)
+
+            pnr = new_pnr()
+            booking = {'pnr': pnr, 'passenger_id': passenger_id, 'option_id': option_id,
+                       'flights': list(hold['flights'] if hold else flights), 'status': CONFIRMED,
+                       'confirmed_at': _iso(now)}
+            writes = [(REQUESTS, idempotency_key, None, {'booking': booking}), (BOOKINGS, pnr, None, booking)]
+            if hold is not None:
+                # A lapsed hold keeps its seats until it is swept, so it can still be honoured
+                writes.append((HOLDS, hold_id, hold['version'], dict(_without(hold, 'expires_at'), status=CONFIRMED, pnr=pnr)))
+            if hold is None or hold['status'] == EXPIRED:
+                self._maybe_sweep(now)
+                writes.extend(self._take_seats(booking['flights'], now))
+
+            try:
+                self.store.transact(writes)
+            except ConditionFailed:
+                self._conflict(attempt)
+                continue
+            metrics.increment('booking.confirmed')
+            return booking
+        raise BookingError('CONTENTION', 'Too many concurrent updates; try again', flights)
+
+    def available(self, flight: str) -> int:
+        item = self.store.get(INVENTORY, flight)
+        return item['available'] if item is not None else self.capacity(flight)
+
+    def release_expired(self, now: float = None) -> int:
+        """
+        Give the seats of lapsed holds back; returns the number of holds released
+        """
+        now = self._clock() if now is None else now
+        released = 0
+        for hold_id, hold in self.store.expiring(HOLDS, now, SWEEP_LIMIT):
+            if hold['status'] != HELD:
+                continue
+            writes = [(HOLDS, hold_id, hold['version'], dict(_without(hold, 'expires_at'), status=EXPIRED))]
+            for flight in dict.fromkeys(hold['flights']):
+                item = self.store.get(INVENTORY, flight)
+                writes.append((INVENTORY, flight, item['version'], dict(_without(item), available=item['available'] + 1)))
+            try:
+                self.store.transact(writes)
+                released += 1
+            except ConditionFailed:
+                # Confirmed or released concurrently, or a counter moved; the next sweep retries
+                continue
+        if released:
+            metrics.increment('booking.holds_expired', released)
+        return released
+
+    def _take_seats(self, flights: list, now: float) -> list:
+        """
+        Writes taking one seat on each flight, or BookingError when one is full
+        """
+        writes = []
+        for flight in dict.fromkeys(flights):
+            item = self.store.get(INVENTORY, flight)
+            if item is None:
+                item = {'available': self.capacity(flight), 'version': None}
+            if item['available'] < 1 and self.release_expired(now):
+                item = self.store.get(INVENTORY, flight)
+            if item['available'] < 1:
+                metrics.increment('booking.sold_out')
+                raise BookingError('SOLD_OUT', f"No seats left on {flight}", [flight])
+            writes.append((INVENTORY, flight, item['version'], dict(_without(item), available=item['available'] - 1)))
+        return writes
+
+    def _maybe_sweep(self, now: float):
+        # At most one sweep per second per engine keeps expired holds from piling up
+        if now >= self._next_sweep:
+            self._next_sweep = now + 1.0
+            self.release_expired(now)
+
+    @staticmethod
+    def _conflict(attempt: int):
+        metrics.increment('booking.conflicts')
+        if attempt >= BACKOFF_AFTER:
+            time.sleep(random.uniform(0, MAX_BACKOFF_SECONDS))
+
+
+def schedule_capacity(index, default_seats: int):
+    """
+    Seats per flight instance from a flight index: the seats of the scheduled
+    departure the instance names, default_seats for flights not in the schedule
+    """
+    rows = {}
+    for row, number in enumerate(index.flight_numbers):
+        rows.setdefault(number, []).append(row)
+
+    def capacity(flight: str) -> int:
+        number, departure = parse_flight_instance(flight)
+        for row in rows.get(number, ()):
+            if index.departure[row] == departure:
+                return index.seats[row]
+        return default_seats
+
+    return capacity
+
+
+def _without(item: dict, *names) -> dict:
+    """
+    Copy of a stored item without its version (and any other named attributes)
+    """
+    return {name: value for name, value in item.items() if name != 'version' and name not in names}
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.datetime.utcfromtimestamp(timestamp).isoformat()
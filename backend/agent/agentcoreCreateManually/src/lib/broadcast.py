@@ -0,0 +1,145 @@
+"""
+Passenger broadcast notifications: one message template, many passengers and languages.
+Each distinct language is translated once; passenger fields are filled in afterwards.
+"""
+import re
+from concurrent.futures import ThreadPoolExecutor
+from lib.log import get_logger
+from lib.request_context import run_with_context
+
+logger = get_logger('broadcast')
+
+# {field} placeholders, filled per passenger after translation
+PLACEHOLDER = re.compile(r'\{(\w+)\}')
+
+# Placeholders travel through translation as numbered markers, which Translate leaves alone;
+# field names would otherwise be translated ({name} -> {nom})
+MARKER = '[[{}]]'
+MARKER_PATTERN = re.compile(r'\[\[\s*(\d+)\s*\]\]')
+
+# Placeholders and line breaks, kept by re.split
+SPLIT_POINTS = re.compile(r'(\{\w+\}|\n)')
+
+
+def normalize_language(code: str, default: str) -> str:
+    """
+    'DE' -> 'de', 'pt_br' -> 'pt-BR'; empty codes fall back to default
+    """
+    if not code or not str(code).strip():
+        return default
+    primary, _, region = str(code).strip().replace('_', '-').partition('-')
+    return f"{primary.lower()}-{region.upper()}" if region else primary.lower()
+
+
+def protect(template: str) -> tuple:
+    """
+    Template with placeholders swapped for markers, and the field name behind each marker
+    """
+    fields = []
+
+    def marker(match):
+        fields.append(match.group(1))
+        return MARKER.format(len(fields) - 1)
+
+    return PLACEHOLDER.sub(marker, template), fields
+
+
+def restore(translated: str, fields: list):
+    """
+    Translated template with markers turned back into placeholders, or None when
+    translation lost, duplicated or mangled a marker
+    """
+    found = [int(n) for n in MARKER_PATTERN.findall(translated)]
+    if sorted(found) != list(range(len(fields))):
+        return None
+    return MARKER_PATTERN.sub(lambda match: '{' + fields[int(match.group(1))] + '}', translated)
+
+
+def fill(template: str, values: dict) -> str:
+    """
+    Substitute {field} placeholders; unknown fields become empty rather than leaking braces
+    """
+    return PLACEHOLDER.sub(lambda match: str(values.get(match.group(1), '')), template)
+
+
+def translate_template(template: str, translate, source_language: str, target_language: str) -> str:
+    """
+    Translate a template once for a language, keeping its placeholders intact.
+    When markers do not survive, the text between placeholders is translated as
+    separate lines (still one request) and reassembled around them.
+    """
+    protected, fields = protect(template)
+    restored = restore(translate(protected, source_language, target_language), fields)
+    if restored is not None:
+        return restored
+
+    logger.warning("Placeholders lost translating to %s; translating around them", target_language)
+    # Text between placeholders and line breaks, sent as the lines of one request
+    pieces = SPLIT_POINTS.split(template)
+    texts = [n for n in range(0, len(pieces), 2) if pieces[n].strip()]
+    translated = translate('\n'.join(pieces[n].strip() for n in texts), source_language, target_language).split('\n')
+    if len(translated) != len(texts):
+        raise ValueError(f"Could not keep placeholders while translating to {target_language}")
+
+    for n, line in zip(texts, translated):
+        # Keep the original spacing around each placeholder
+        piece = pieces[n]
+        pieces[n] = piece[:len(piece) - len(piece.lstrip())] + line + piece[len(piece.rstrip()):]
+    return ''.join(pieces)
+
+
+def broadcast(template: str, passengers: list, translate, source_language: str = 'en',
+              fields: dict = None, max_workers: int = 4) -> dict:
+    """
+    Personalized messages for every passenger, in manifest order.
+
+    translate(text, source_language, target_language) -> str is called once per
+    distinct target language; language groups run concurrently on up to
+    max_workers threads. A language whose translation fails falls back to the
+    source-language text for its passengers and is listed under 'failed'.
+    """
+    if not template or not template.strip():
+        raise ValueError('template is required')
+
+    source_language = normalize_language(source_language, 'en')
+    groups = {}
+    for position, passenger in enumerate(passengers):
+        language = normalize_language(passenger.get('language'), source_language)
+        groups.setdefault(language, []).append(position)
+
+    def render(language):
+        try:
+            return language, translate_template(template, translate, source_language, language), None
+        except Exception as e:
+            logger.error("Broadcast translation to %s failed: %s", language, e)
+            return language, template, str(e)
+
+    targets = [language for language in groups if language != source_language]
+    logger.info("Broadcast to %d passengers in %d languages (%d to translate)",
+                len(passengers), len(groups), len(targets))
+
+    rendered = {source_language: (template, None)}
+    if targets:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(targets)))) as pool:
+            for language, text, error in pool.map(run_with_context(render), targets):
+                rendered[language] = (text, error)
+
+    shared = fields or {}
+    messages = [None] * len(passengers)
+    for language, positions in groups.items():
+        text, error = rendered[language]
+        for position in positions:
+            passenger = passengers[position]
+            messages[position] = {
+                'passenger_id': passenger.get('passenger_id'),
+                'language': language if error is None else source_language,
+                'message': fill(text, {**shared, **passenger}),
+                'translated': language != source_language and error is None
+            }
+
+    return {
+        'messages': messages,
+        'languages': {language: len(positions) for language, positions in groups.items()},
+        'translated_languages': len(targets),
+        'failed': {language: error for language, (_text, error) in rendered.items() if error is not None}
+    }
@@ -0,0 +1,235 @@
+"""
+Semantic answer cache for knowledge base queries
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+STOPWORDS = {
+    'a', 'an', 'and', 'am', 'are', 'be', 'can', 'could', 'do', 'does', 'for', 'i', 'if', 'in',
+    'is', 'it', 'me', 'my', 'of', 'on', 'or', 'please', 'the', 'to', 'what', 'when', 'will',
+    'with', 'would', 'you', 'your'
+}
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def content_tokens(text: str) -> list:
+    """
+    Lowercased content tokens of a text, stopwords removed, plurals folded
+    """
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        # Cheap plural folding so "delays" and "delay" match
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def tokenize_query(query: str) -> frozenset:
+    """
+    Normalize a query into a set of content tokens
+    """
+    return frozenset(content_tokens(query))
+
+
+def normalize_query(query: str) -> str:
+    """
+    Canonical exact-match key for a query
+    """
+    return ' '.join(sorted(tokenize_query(query)))
+
+
+# (kb_id, docs_dir) -> (time checked, fingerprint) for policy_namespace rechecks
+_namespaces = {}
+_namespace_lock = threading.Lock()
+
+
+def policy_namespace(kb_id: str, docs_dir: str = None, recheck_seconds: float = 0, clock=time.monotonic) -> str:
+    """
+    Fingerprint of the knowledge base ID and policy documents.
+    Any change to either yields a new namespace and invalidates cached answers.
+    The documents are stat'ed at most once per recheck_seconds; in between, the
+    last fingerprint is returned, so a document change shows up within that time.
+    """
+    if recheck_seconds <= 0:
+        return _fingerprint(kb_id, docs_dir)
+    key = (kb_id, docs_dir)
+    now = clock()
+    with _namespace_lock:
+        cached = _namespaces.get(key)
+    if cached is not None and now - cached[0] < recheck_seconds:
+        return cached[1]
+    namespace = _fingerprint(kb_id, docs_dir)
+    with _namespace_lock:
+        _namespaces[key] = (now, namespace)
+    return namespace
+
+
+def _fingerprint(kb_id: str, docs_dir: str = None) -> str:
+    digest = hashlib.sha1(str(kb_id).encode('utf-8'))
+    if docs_dir and os.path.isdir(docs_dir):
+        for name in sorted(os.listdir(docs_dir)):
+            if not name.endswith('.md'):
+                continue
+            stat = os.stat(os.path.join(docs_dir, name))
+            digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class _Entry:
+    __slots__ = ('key', 'tokens', 'value', 'expires_at')
+
+    def __init__(self, key, tokens, value, expires_at):
+        self.key = key
+        self.tokens = tokens
+        self.value = value
+        self.expires_at = expires_at
+
+
+class AnswerCache:
+    """
+    Thread-safe TTL + LRU cache matching exact and near-duplicate questions.
+
+    Near-duplicates are found through an inverted token index and scored with
+    Jaccard similarity; numeric tokens (delay hours, distances) must match
+    exactly so "4h delay" never reuses the answer for "2h delay".
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 900,
+                 similarity_threshold: float = 0.8, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._index = {}
+        self._namespace = None
+        self._stats = {'hits': 0, 'near_hits': 0, 'misses': 0, 'evictions': 0,
+                       'expirations': 0, 'invalidations': 0}
+
+    def get(self, query: str, namespace: str = None):
+        """
+        Return the cached value for a query, or None on a miss
+        """
+        tokens = tokenize_query(query)
+        key = ' '.join(sorted(tokens))
+        now = self._clock()
+
+        with self._lock:
+            self._check_namespace(namespace)
+
+            entry = self._entries.get(key)
+            if entry is not None and self._is_live(entry, now):
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry.value
+
+            entry = self._find_similar(tokens, now)
+            if entry is not None:
+                self._entries.move_to_end(entry.key)
+                self._stats['near_hits'] += 1
+                return entry.value
+
+            self._stats['misses'] += 1
+            return None
+
+    def put(self, query: str, value, namespace: str = None):
+        """
+        Store a value for a query, evicting least recently used entries
+        """
+        tokens = tokenize_query(query)
+        if not tokens:
+            return
+        key = ' '.join(sorted(tokens))
+
+        with self._lock:
+            self._check_namespace(namespace)
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(key, tokens, value, self._clock() + self.ttl_seconds)
+            for token in tokens:
+                self._index.setdefault(token, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats['evictions'] += 1
+
+    def invalidate(self):
+        """
+        Drop every cached entry
+        """
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters and current size
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        lookups = stats['hits'] + stats['near_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['hits'] + stats['near_hits']) / lookups, 4) if lookups else 0.0
+        return stats
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _check_namespace(self, namespace):
+        if namespace != self._namespace:
+            if self._namespace is not None:
+                self._stats['invalidations'] += 1
+            self._clear()
+            self._namespace = namespace
+
+    def _clear(self):
+        self._entries.clear()
+        self._index.clear()
+
+    def _is_live(self, entry, now) -> bool:
+        if entry.expires_at > now:
+            return True
+        self._remove(entry.key)
+        self._stats['expirations'] += 1
+        return False
+
+    def _find_similar(self, tokens, now):
+        if not tokens or self.similarity_threshold >= 1:
+            return None
+
+        numbers = {t for t in tokens if t[0].isdigit()}
+        candidates = set()
+        for token in tokens:
+            candidates.update(self._index.get(token, ()))
+
+        # Expired candidates are dropped as they are met, so the best live entry wins
+        best, best_score = None, self.similarity_threshold
+        for key in candidates:
+            entry = self._entries[key]
+            if not self._is_live(entry, now):
+                continue
+            if {t for t in entry.tokens if t[0].isdigit()} != numbers:
+                continue
+            score = len(tokens & entry.tokens) / len(tokens | entry.tokens)
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        for token in entry.tokens:
+            keys = self._index.get(token)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[token]
@@ -0,0 +1,76 @@
+"""
+Shared, lazily created AWS clients
+"""
+import threading
+from lib.log import get_logger
+from lib.metrics import instrument_client
+from config import AWS_REGION
+
+logger = get_logger('clients')
+
+
+# (connect timeout, read timeout) in seconds per service
+SERVICE_TIMEOUTS = {
+    'bedrock-agent-runtime': (3, 60),
+    'comprehend': (2, 10),
+    'translate': (2, 10),
+}
+DEFAULT_TIMEOUTS = (3, 30)
+
+# Enough pooled connections for the concurrent tool executor and batch fan-out
+MAX_POOL_CONNECTIONS = 50
+MAX_RETRY_ATTEMPTS = 3
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_client(service: str):
+    """
+    Return the shared client for a service, creating it on first use.
+    boto3 clients are thread-safe once created; creation itself is serialized.
+    """
+    client = _clients.get(service)
+    if client is None:
+        with _lock:
+            client = _clients.get(service)
+            if client is None:
+                client = _create_client(service)
+                _clients[service] = client
+    return client
+
+
+def set_client(service: str, client):
+    """
+    Inject a client for a service (stubs in tests and benchmarks)
+    """
+    with _lock:
+        _clients[service] = client
+
+
+def reset_clients():
+    """
+    Drop all cached clients so the next call recreates them
+    """
+    with _lock:
+        _clients.clear()
+
+
+def _create_client(service: str):
+    # Deferred so importing the agent does not pay for boto3 until a tool needs AWS
+    import boto3
+    from botocore.config import Config
+
+    connect_timeout, read_timeout = SERVICE_TIMEOUTS.get(service, DEFAULT_TIMEOUTS)
+    logger.info("Creating %s client", service)
+
+    return instrument_client(service, boto3.session.Session().client(
+        service,
+        region_name=AWS_REGION,
+        config=Config(
+            max_pool_connections=MAX_POOL_CONNECTIONS,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            retries={'max_attempts': MAX_RETRY_ATTEMPTS, 'mode': 'adaptive'}
+        )
+    ))
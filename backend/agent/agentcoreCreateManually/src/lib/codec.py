@@ -0,0 +1,95 @@
+"""
+JSON codec for handler payloads: orjson when it is installed, the standard library otherwise.
+Select one with JSON_CODEC (auto, orjson or json); every codec produces standard JSON.
+"""
+import json
+from lib.log import get_logger
+
+try:
+    import orjson
+except ImportError:  # standard library fallback
+    orjson = None
+
+logger = get_logger('codec')
+
+
+class StdlibCodec:
+    """
+    json module; output is exactly json.dumps(value)
+    """
+    name = 'json'
+
+    def dumps(self, value, default=None) -> str:
+        return json.dumps(value, default=default)
+
+    def dumps_bytes(self, value, default=None) -> bytes:
+        return json.dumps(value, default=default).encode('utf-8')
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    """
+    orjson: compact, non-ASCII characters unescaped. Values orjson rejects
+    (integers beyond 64 bits, ...) are encoded by the standard library instead.
+    """
+    name = 'orjson'
+    OPTIONS = orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+    def dumps(self, value, default=None) -> str:
+        return self.dumps_bytes(value, default).decode('utf-8')
+
+    def dumps_bytes(self, value, default=None) -> bytes:
+        try:
+            return orjson.dumps(value, default=default, option=self.OPTIONS)
+        except orjson.JSONEncodeError as e:
+            # json raises its own error if the value cannot be encoded at all
+            logger.debug("orjson could not encode a value, using json: %s", e)
+            return json.dumps(value, default=default).encode('utf-8')
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+CODECS = {'json': StdlibCodec, 'orjson': OrjsonCodec}
+
+_codec = None
+
+
+def get_codec():
+    """
+    The configured codec, chosen on first use
+    """
+    global _codec
+    if _codec is None:
+        from config import JSON_CODEC
+        _codec = create_codec(JSON_CODEC)
+    return _codec
+
+
+def create_codec(name: str):
+    if name in (None, 'auto'):
+        name = 'orjson' if orjson is not None else 'json'
+    if name == 'orjson' and orjson is None:
+        logger.warning("JSON_CODEC=orjson but orjson is not installed; using json")
+        name = 'json'
+    if name not in CODECS:
+        raise ValueError(f"Unknown JSON codec: {name}")
+    return CODECS[name]()
+
+
+def set_codec(codec):
+    """
+    Replace the codec (benchmarks, tests); a name or a codec instance
+    """
+    global _codec
+    _codec = create_codec(codec) if isinstance(codec, str) or codec is None else codec
+
+
+def dumps(value, default=None) -> str:
+    return get_codec().dumps(value, default)
+
+
+def loads(data):
+    return get_codec().loads(data)
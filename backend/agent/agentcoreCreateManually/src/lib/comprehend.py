@@ -1,39 +1,186 @@
 """
 AWS Comprehend utilities for sentiment analysis
 """
-import boto3
-from config import AWS_REGION
+from concurrent.futures import ThreadPoolExecutor
+from lib import metrics
+from lib.log import get_logger, redact
+from lib.preclassifier import comprehend_language, preclassify
+from lib.request_context import current_session, run_with_context
+from lib.resilience import CircuitOpenError, DeadlineExceeded, call_service
+from config import USE_LOCAL_SENTIMENT, LANGUAGE_MIN_CONFIDENCE, USE_TRANSLATE
 
-comprehend = boto3.client('comprehend', region_name=AWS_REGION)
+logger = get_logger('comprehend')
 
+# Comprehend accepts at most 25 documents per batch_detect_sentiment call
+BATCH_SIZE = 25
 
-def analyze_sentiment(text: str) -> dict:
+
+def analyze_sentiment(text: str, language: str = None) -> dict:
     """
-    Analyze sentiment of text using AWS Comprehend
+    Analyze sentiment of text. Clear-cut messages are answered locally; the rest
+    go to AWS Comprehend in their detected language (or the given one).
     """
-    print(f"[COMPREHEND] Analyzing sentiment: {text[:50]}...")
+    logger.debug("Analyzing sentiment: %s", redact(text))
+    
+    if language is None:
+        language, local = _preclassify(text)
+        if local is not None:
+            return local
     
     try:
-        response = comprehend.detect_sentiment(
+        text, language_code = _comprehend_input(text, language)
+        response = call_service(
+            'comprehend', 'detect_sentiment',
             Text=text,
-            LanguageCode='en'
+            LanguageCode=language_code
         )
         
         sentiment = response.get('Sentiment', 'NEUTRAL')
-        scores = response.get('SentimentScore', {})
         
-        print(f"[COMPREHEND] Sentiment: {sentiment}")
+        logger.info("Sentiment: %s (%s)", sentiment, language_code)
         
-        return {
-            'sentiment': sentiment,
-            'scores': {
-                'positive': scores.get('Positive', 0),
-                'negative': scores.get('Negative', 0),
-                'neutral': scores.get('Neutral', 0),
-                'mixed': scores.get('Mixed', 0)
-            }
-        }
+        return {**_format_sentiment(response), 'language': language, 'source': 'comprehend'}
     
     except Exception as e:
-        print(f"[COMPREHEND ERROR] {e}")
+        logger.error("Sentiment analysis failed: %s", e)
         raise
+
+
+def analyze_sentiment_batch(texts: list, max_workers: int = 4) -> list:
+    """
+    Analyze sentiment of many texts using batch_detect_sentiment.
+    Clear-cut texts are answered locally; the rest are batched per language.
+    Returns one entry per input, in input order; failed items carry an 'error' key.
+    """
+    logger.info("Analyzing sentiment batch: %d texts", len(texts))
+    
+    results = [None] * len(texts)
+    by_language = {}
+    for i, text in enumerate(texts):
+        language = 'en'
+        if text and text.strip():
+            language, results[i] = _preclassify(text)
+        if results[i] is None:
+            by_language.setdefault(language, []).append(i)
+    
+    chunks = [
+        (language, positions[start:start + BATCH_SIZE])
+        for language, positions in by_language.items()
+        for start in range(0, len(positions), BATCH_SIZE)
+    ]
+    if not chunks:
+        return results
+    
+    def analyze(chunk):
+        language, positions = chunk
+        return positions, _analyze_chunk([texts[i] for i in positions], language)
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+        for positions, chunk_results in pool.map(run_with_context(analyze), chunks):
+            for i, result in zip(positions, chunk_results):
+                results[i] = result
+    
+    errors = sum(1 for r in results if 'error' in r)
+    logger.info("Batch complete: %d ok, %d failed, %d answered locally", len(texts) - errors, errors,
+                len(texts) - sum(len(positions) for positions in by_language.values()))
+    
+    return results
+
+
+def _preclassify(text: str) -> tuple:
+    """
+    (language, local result or None); ('en', None) when local analysis is off
+    """
+    if not USE_LOCAL_SENTIMENT:
+        return 'en', None
+    # Messages too short to identify are taken to be in the language the passenger is served in
+    state = current_session()
+    guess = preclassify(text, LANGUAGE_MIN_CONFIDENCE, getattr(state, 'language', None) or 'en')
+    if guess.sentiment is None:
+        metrics.increment('sentiment.comprehend')
+        return guess.language, None
+    metrics.increment('sentiment.local')
+    return guess.language, {**guess.sentiment, 'language': guess.language, 'source': 'local'}
+
+
+def _comprehend_input(text: str, language: str) -> tuple:
+    """
+    (text, LanguageCode) for Comprehend: the text as is when Comprehend supports its
+    language, otherwise translated to English (or sent as English without USE_TRANSLATE)
+    """
+    language_code = comprehend_language(language)
+    if language_code is not None:
+        return text, language_code
+    if USE_TRANSLATE:
+        try:
+            from lib.translate import translate_text
+            translated = translate_text(text, language, 'en')
+            metrics.increment('sentiment.translated')
+            return translated['translated_text'], 'en'
+        except Exception as e:
+            logger.warning("Could not translate %s text for sentiment, analyzing it as English: %s", language, e)
+    return text, 'en'
+
+
+def _analyze_chunk(texts: list, language: str = 'en') -> list:
+    """
+    Run one batch call for texts in one language, falling back to per-item calls for items that failed
+    """
+    results = [None] * len(texts)
+    
+    # Empty documents fail validation for the whole batch, so keep them out of it
+    positions = []
+    for i, text in enumerate(texts):
+        if text and text.strip():
+            positions.append(i)
+        else:
+            results[i] = {'error': 'Text is empty', 'error_code': 'EMPTY_TEXT'}
+    
+    if not positions:
+        return results
+    
+    inputs = [_comprehend_input(texts[i], language) for i in positions]
+    try:
+        response = call_service(
+            'comprehend', 'batch_detect_sentiment',
+            TextList=[text for text, _ in inputs],
+            LanguageCode=inputs[0][1]
+        )
+    except (CircuitOpenError, DeadlineExceeded) as e:
+        # Retrying items one by one would fail the same way
+        logger.warning("Batch call not attempted: %s", e)
+        for i in positions:
+            results[i] = {'error': str(e), 'error_code': 'SERVICE_UNAVAILABLE'}
+        return results
+    except Exception as e:
+        logger.warning("Batch call failed, retrying items individually: %s", e)
+        response = {'ResultList': [], 'ErrorList': [{'Index': n} for n in range(len(positions))]}
+    
+    for item in response.get('ResultList', []):
+        results[positions[item['Index']]] = {**_format_sentiment(item), 'language': language, 'source': 'comprehend'}
+    
+    for item in response.get('ErrorList', []):
+        i = positions[item['Index']]
+        try:
+            results[i] = analyze_sentiment(texts[i], language)
+        except Exception as e:
+            results[i] = {'error': str(e), 'error_code': item.get('ErrorCode', 'FALLBACK_FAILED')}
+    
+    return results
+
+
+def _format_sentiment(response: dict) -> dict:
+    """
+    Map a Comprehend sentiment result to the tool result shape
+    """
+    scores = response.get('SentimentScore', {})
+    
+    return {
+        'sentiment': response.get('Sentiment', 'NEUTRAL'),
+        'scores': {
+            'positive': scores.get('Positive', 0),
+            'negative': scores.get('Negative', 0),
+            'neutral': scores.get('Neutral', 0),
+            'mixed': scores.get('Mixed', 0)
+        }
+    }
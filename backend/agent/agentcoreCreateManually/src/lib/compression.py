@@ -0,0 +1,77 @@
+"""
+Accept-Encoding aware response compression (brotli when installed, gzip) for large bodies
+"""
+import base64
+import gzip
+from lib import metrics
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+
+def accepted_encoding(accept_encoding: str) -> str:
+    """
+    Best encoding the client accepts ('br', 'gzip'), or None for identity
+    """
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.lower().split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    wildcard = accepted.get('*', 0.0)
+    for encoding in (('br', 'gzip') if brotli is not None else ('gzip',)):
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def compress(data: bytes, encoding: str, level: int = 5) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def request_encoding(event: dict) -> str:
+    """
+    Accept-Encoding of an API Gateway style event (any header case) or its acceptEncoding field
+    """
+    headers = event.get('headers') or {}
+    for name, value in headers.items():
+        if name.lower() == 'accept-encoding':
+            return value
+    return event.get('acceptEncoding')
+
+
+def compress_response(response: dict, accept_encoding: str, min_bytes: int = 1024, level: int = 5) -> dict:
+    """
+    The response with its body compressed and base64-encoded when the client accepts
+    an encoding and the body is at least min_bytes; otherwise the response unchanged
+    """
+    body = response.get('body')
+    if not isinstance(body, (str, bytes)) or response.get('isBase64Encoded') or len(body) < min_bytes:
+        return response
+    encoding = accepted_encoding(accept_encoding)
+    if encoding is None:
+        return response
+
+    data = body.encode('utf-8') if isinstance(body, str) else body
+    compressed = compress(data, encoding, level)
+    if len(compressed) >= len(data):
+        return response
+    metrics.increment(f"compression.{encoding}")
+    metrics.increment('compression.bytes_saved', len(data) - len(compressed))
+    return {
+        **response,
+        'headers': {**(response.get('headers') or {}), 'Content-Encoding': encoding, 'Vary': 'Accept-Encoding'},
+        'body': base64.b64encode(compressed).decode('ascii'),
+        'isBase64Encoded': True
+    }
@@ -0,0 +1,182 @@
+"""
+Rebooking constraint parsing.
+Constraint tokens become search-window bounds, a hub list and per-itinerary predicates.
+"""
+import datetime
+import re
+import zoneinfo
+
+ARRIVE_BEFORE = re.compile(r'^arrive_before_(\d{1,2})_(\d{2})$')
+MAX_STOPS = re.compile(r'^max_stops_(\d+)$')
+MIN_CABIN = re.compile(r'^min_cabin_([a-z_]+)$')
+AVOID_HUB = re.compile(r'^avoid_(?:hub_)?([a-z]{3})$', re.IGNORECASE)
+MAX_LAYOVER = re.compile(r'^max_layover_(\d+)(h|m)?$')
+
+UNCONSTRAINED = float('inf')
+
+# Local time zone per airport; arrive_before_* is read on the arrival airport's clock,
+# UTC for airports not listed here
+AIRPORT_TIMEZONES = {
+    'ATL': 'America/New_York', 'BOS': 'America/New_York', 'CLT': 'America/New_York',
+    'DTW': 'America/Detroit', 'EWR': 'America/New_York', 'IAD': 'America/New_York',
+    'JFK': 'America/New_York', 'MIA': 'America/New_York',
+    'DFW': 'America/Chicago', 'IAH': 'America/Chicago', 'MSP': 'America/Chicago', 'ORD': 'America/Chicago',
+    'DEN': 'America/Denver', 'PHX': 'America/Phoenix',
+    'LAS': 'America/Los_Angeles', 'LAX': 'America/Los_Angeles', 'SEA': 'America/Los_Angeles',
+    'SFO': 'America/Los_Angeles',
+    'DUB': 'Europe/Dublin', 'LHR': 'Europe/London',
+    'AMS': 'Europe/Amsterdam', 'CDG': 'Europe/Paris', 'FCO': 'Europe/Rome', 'FRA': 'Europe/Berlin',
+    'MAD': 'Europe/Madrid', 'MUC': 'Europe/Berlin', 'VIE': 'Europe/Vienna', 'ZRH': 'Europe/Zurich',
+}
+
+# Cabin classes from lowest to highest
+CABIN_RANK = {'Economy': 0, 'Premium Economy': 1, 'Business': 2, 'First': 3}
+
+
+class Constraints:
+    """
+    Parsed rebooking constraints; unset fields are unconstrained
+    """
+    __slots__ = ('deadline', 'max_stops', 'min_cabin', 'avoid_hubs', 'max_layover', 'ignored')
+
+    def __init__(self):
+        self.deadline = UNCONSTRAINED
+        self.max_stops = UNCONSTRAINED
+        self.min_cabin = 0
+        self.avoid_hubs = set()
+        self.max_layover = UNCONSTRAINED
+        self.ignored = []
+
+    def hubs(self, hubs) -> tuple:
+        """
+        Connection hubs to search; none when only direct flights are allowed.
+        Avoided hubs stay in the list (so the memoized connection table is shared)
+        and are rejected by predicate().
+        """
+        if self.max_stops < 1:
+            return ()
+        return tuple(hubs)
+
+    def cabin(self, cabin_classes: list):
+        """
+        First offered cabin meeting the cabin minimum, or None
+        """
+        for cabin in cabin_classes:
+            if CABIN_RANK.get(cabin, 0) >= self.min_cabin:
+                return cabin
+        return None
+
+    def predicate(self, index):
+        """
+        Itinerary check for the constraints the search window and hub list cannot express
+        (deadline, avoided hubs, layover limit), or None when every itinerary qualifies.
+        The checks are folded into one closure since it runs once per scanned candidate.
+        """
+        if self.deadline == UNCONSTRAINED and not self.avoid_hubs and self.max_layover == UNCONSTRAINED:
+            return None
+
+        arrival, departure, destination = index.arrival, index.departure, index.destination
+        deadline, max_layover = self.deadline, self.max_layover
+        avoid = {i for i, code in enumerate(index.airports) if code in self.avoid_hubs}
+
+        def accept(legs):
+            if arrival[legs[-1]] > deadline:
+                return False
+            for n in range(len(legs) - 1):
+                leg = legs[n]
+                if destination[leg] in avoid or departure[legs[n + 1]] - arrival[leg] > max_layover:
+                    return False
+            return True
+
+        return accept
+
+    def allows(self, stops: int, arrival: int, hubs=(), layovers=()) -> bool:
+        """
+        Check a single itinerary described by plain values (mock options)
+        """
+        return (
+            stops <= self.max_stops
+            and arrival <= self.deadline
+            and not self.avoid_hubs.intersection(hubs)
+            and all(layover <= self.max_layover for layover in layovers)
+        )
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"Constraints({fields})"
+
+
+def parse_constraints(tokens: list, earliest: int, destination: str = None) -> Constraints:
+    """
+    Parse constraint tokens relative to the earliest departure (epoch minutes).
+
+    arrive_before_HH_MM  arrival deadline, the next HH:MM at or after earliest, local
+                         time at destination (UTC when it has no known time zone)
+    max_stops_N          at most N connections; direct_only is max_stops_0
+    min_cabin_<class>    e.g. min_cabin_business, min_cabin_premium_economy
+    avoid_<HUB>          never connect through HUB (avoid_hub_<HUB> also accepted)
+    max_layover_N[h|m]   longest connection, minutes unless suffixed with h
+
+    Unknown tokens are kept in .ignored rather than rejected.
+    """
+    parsed = Constraints()
+    for token in tokens or []:
+        match = ARRIVE_BEFORE.match(token)
+        if match:
+            hour, minute = int(match.group(1)), int(match.group(2))
+            if hour < 24 and minute < 60:
+                parsed.deadline = min(parsed.deadline, local_deadline(earliest, hour, minute, destination))
+                continue
+
+        match = MAX_STOPS.match(token)
+        if match:
+            parsed.max_stops = min(parsed.max_stops, int(match.group(1)))
+            continue
+        if token == 'direct_only':
+            parsed.max_stops = 0
+            continue
+
+        match = MIN_CABIN.match(token)
+        if match:
+            cabin = match.group(1).replace('_', ' ').title()
+            if cabin in CABIN_RANK:
+                parsed.min_cabin = max(parsed.min_cabin, CABIN_RANK[cabin])
+                continue
+
+        match = MAX_LAYOVER.match(token)
+        if match:
+            minutes = int(match.group(1)) * (60 if match.group(2) == 'h' else 1)
+            parsed.max_layover = min(parsed.max_layover, minutes)
+            continue
+
+        match = AVOID_HUB.match(token)
+        if match:
+            parsed.avoid_hubs.add(match.group(1).upper())
+            continue
+
+        parsed.ignored.append(token)
+    return parsed
+
+
+def ignored_constraints(tokens: list) -> list:
+    """
+    Tokens parse_constraints() does not understand, to report back to the caller
+    """
+    return parse_constraints(tokens, 0).ignored
+
+
+def local_deadline(earliest: int, hour: int, minute: int, airport: str = None) -> int:
+    """
+    Epoch minutes of the first HH:MM on the airport's local clock at or after earliest
+    """
+    name = AIRPORT_TIMEZONES.get((airport or '').upper())
+    zone = zoneinfo.ZoneInfo(name) if name else datetime.timezone.utc
+    day = datetime.datetime.fromtimestamp(earliest * 60, zone).date()
+    deadline = _epoch_minutes(day, hour, minute, zone)
+    if deadline < earliest:
+        deadline = _epoch_minutes(day + datetime.timedelta(days=1), hour, minute, zone)
+    return deadline
+
+
+def _epoch_minutes(day: datetime.date, hour: int, minute: int, zone) -> int:
+    return int(datetime.datetime(day.year, day.month, day.day, hour, minute, tzinfo=zone).timestamp() // 60)
@@ -0,0 +1,171 @@
+"""
+Escalation queue for human agents: ordered by passenger distress, loyalty tier and
+requested priority, with aging so that no escalation waits forever.
+"""
+import heapq
+import threading
+import time
+from dataclasses import dataclass
+from lib import metrics
+from lib.log import get_logger
+
+logger = get_logger('escalations')
+
+# Score points; an escalation's score grows by aging_per_minute while it waits
+PRIORITY_POINTS = {'URGENT': 60, 'HIGH': 40, 'MEDIUM': 20, 'NORMAL': 0, 'LOW': -10}
+TIER_POINTS = {'Platinum': 30, 'Gold': 20, 'Silver': 10}
+DISTRESS_POINTS = 40
+
+DEFAULT_POOL = 'general'
+
+
+@dataclass(slots=True)
+class Escalation:
+    escalation_id: str
+    passenger_id: str
+    reason: str
+    priority: str = 'NORMAL'
+    tier: str = None
+    distress: float = 0.0
+    pool: str = DEFAULT_POOL
+    enqueued_at: float = 0.0
+
+    @property
+    def base_score(self) -> float:
+        return (PRIORITY_POINTS.get(self.priority, 0) + TIER_POINTS.get(self.tier, 0)
+                + DISTRESS_POINTS * self.distress)
+
+
+def distress(scores: dict = None, sentiment: float = None) -> float:
+    """
+    0-1 distress from Comprehend sentiment scores (negative, half of mixed) or,
+    failing those, a session sentiment value (positive - negative)
+    """
+    if scores:
+        return min(1.0, scores.get('negative', 0.0) + 0.5 * scores.get('mixed', 0.0))
+    if sentiment is not None:
+        return min(1.0, max(0.0, -sentiment))
+    return 0.0
+
+
+class EscalationQueue:
+    """
+    Priority queue of pending escalations, one heap per agent pool.
+
+    score = base_score + aging_per_minute * minutes waited. All escalations age
+    at the same rate, so their order is fixed by base_score - aging * enqueue
+    minute and heap keys never change as time passes. Reprioritizing pushes a
+    fresh entry and marks the old one stale (skipped when popped): push,
+    reprioritize and pop are all O(log n).
+    """
+
+    def __init__(self, aging_per_minute: float = 0.5, clock=time.time):
+        self.aging_per_minute = aging_per_minute
+        self._clock = clock
+        self._heaps = {}
+        self._entries = {}
+        self._by_passenger = {}
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def push(self, escalation: Escalation) -> float:
+        """
+        Queue an escalation; returns its score
+        """
+        with self._lock:
+            if not escalation.enqueued_at:
+                escalation.enqueued_at = self._clock()
+            self._push(escalation)
+        metrics.increment('escalation.enqueued')
+        return escalation.base_score
+
+    def pending(self, passenger_id: str):
+        """
+        The passenger's queued escalation, or None
+        """
+        entry = self._entries.get(self._by_passenger.get(passenger_id))
+        return entry[2] if entry is not None else None
+
+    def reprioritize(self, escalation_id: str, priority: str = None, tier: str = None,
+                     distress: float = None) -> float:
+        """
+        Change a queued escalation's inputs, keeping the time it has waited; returns its score or None
+        """
+        with self._lock:
+            entry = self._entries.get(escalation_id)
+            if entry is None:
+                return None
+            escalation = entry[2]
+            entry[2] = None
+            if priority is not None:
+                escalation.priority = priority
+            if tier is not None:
+                escalation.tier = tier
+            if distress is not None:
+                escalation.distress = distress
+            self._push(escalation)
+        metrics.increment('escalation.reprioritized')
+        return self.score(escalation)
+
+    def remove(self, escalation_id: str) -> bool:
+        with self._lock:
+            entry = self._entries.pop(escalation_id, None)
+            if entry is None:
+                return False
+            self._by_passenger.pop(entry[2].passenger_id, None)
+            entry[2] = None
+            return True
+
+    def pop_batch(self, count: int, pools: list = None) -> list:
+        """
+        Up to count highest-scoring escalations from the given pools (default all),
+        as (escalation, seconds waited)
+        """
+        now = self._clock()
+        batch = []
+        with self._lock:
+            heaps = [self._heaps[pool] for pool in (pools or list(self._heaps)) if pool in self._heaps]
+            while len(batch) < count:
+                for heap in heaps:
+                    while heap and heap[0][2] is None:
+                        heapq.heappop(heap)
+                best = min((heap for heap in heaps if heap), key=lambda heap: heap[0][:2], default=None)
+                if best is None:
+                    break
+                escalation = heapq.heappop(best)[2]
+                del self._entries[escalation.escalation_id]
+                self._by_passenger.pop(escalation.passenger_id, None)
+                batch.append((escalation, now - escalation.enqueued_at))
+        for _, waited in batch:
+            metrics.record('escalation.wait', waited * 1000)
+        metrics.increment('escalation.dequeued', len(batch))
+        return batch
+
+    def score(self, escalation: Escalation, now: float = None) -> float:
+        now = self._clock() if now is None else now
+        return escalation.base_score + self.aging_per_minute * (now - escalation.enqueued_at) / 60
+
+    def stats(self) -> dict:
+        """
+        Queue depth per pool and the longest current wait
+        """
+        now = self._clock()
+        with self._lock:
+            escalations = [entry[2] for entry in self._entries.values()]
+        depth = {}
+        for escalation in escalations:
+            depth[escalation.pool] = depth.get(escalation.pool, 0) + 1
+        oldest = min((escalation.enqueued_at for escalation in escalations), default=now)
+        return {'depth': depth, 'total': len(escalations), 'oldest_wait_seconds': round(now - oldest, 1)}
+
+    def _push(self, escalation: Escalation):
+        # Smaller keys first: higher score, then earlier arrival at equal score
+        key = self.aging_per_minute * escalation.enqueued_at / 60 - escalation.base_score
+        self._sequence += 1
+        entry = [key, self._sequence, escalation]
+        self._entries[escalation.escalation_id] = entry
+        self._by_passenger[escalation.passenger_id] = escalation.escalation_id
+        heapq.heappush(self._heaps.setdefault(escalation.pool, []), entry)
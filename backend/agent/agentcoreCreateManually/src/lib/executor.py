@@ -0,0 +1,106 @@
+"""
+Asyncio tool execution engine for batched tool invocations
+"""
+import asyncio
+import functools
+import inspect
+import time
+from concurrent.futures import ThreadPoolExecutor
+from lib.log import get_logger
+from lib.request_context import remaining_seconds, run_with_context, set_deadline
+
+logger = get_logger('executor')
+
+
+async def run_invocation(tools: dict, invocation: dict, semaphore: asyncio.Semaphore,
+                         executor: ThreadPoolExecutor, timeout: float) -> dict:
+    """
+    Run one tool invocation and wrap the outcome in a result envelope.
+    Blocking tools run on the executor; coroutine tools run on the loop.
+    """
+    tool_name = invocation.get("toolName")
+    tool_input = invocation.get("toolInput", {}) or {}
+
+    if not tool_name:
+        return {"toolName": tool_name, "statusCode": 400, "error": "toolName is required"}
+
+    tool_func = tools.get(tool_name)
+    if not tool_func:
+        return {"toolName": tool_name, "statusCode": 404, "error": f"Tool not found: {tool_name}"}
+
+    async with semaphore:
+        start = time.perf_counter()
+        # Never run past the caller's deadline; AWS calls inside the tool stop waiting with it
+        remaining = remaining_seconds()
+        if remaining is not None:
+            timeout = max(0.0, min(timeout, remaining))
+        set_deadline(timeout)
+        try:
+            if inspect.iscoroutinefunction(tool_func):
+                call = tool_func(**tool_input)
+            else:
+                loop = asyncio.get_running_loop()
+                call = loop.run_in_executor(executor, run_with_context(functools.partial(tool_func, **tool_input)))
+            result = await asyncio.wait_for(call, timeout=timeout)
+            return {
+                "toolName": tool_name,
+                "statusCode": 200,
+                "result": result,
+                "elapsedMs": round((time.perf_counter() - start) * 1000, 1)
+            }
+        except asyncio.TimeoutError:
+            logger.warning("Tool %s timed out after %ss", tool_name, timeout)
+            return {
+                "toolName": tool_name,
+                "statusCode": 504,
+                "error": f"Tool timed out after {timeout}s"
+            }
+        except Exception as e:
+            logger.exception("Tool %s failed: %s", tool_name, e)
+            return {
+                "toolName": tool_name,
+                "statusCode": 500,
+                "error": f"Tool execution failed: {str(e)}"
+            }
+
+
+async def dispatch(tools: dict, invocations: list, default_timeout: float = 30,
+                   tool_timeouts: dict = None, max_concurrency: int = 8) -> list:
+    """
+    Run tool invocations concurrently and return their results in request order.
+    A tool that times out is reported as such; its worker thread is left to finish
+    in the background because Python threads cannot be cancelled.
+    """
+    tool_timeouts = tool_timeouts or {}
+    max_concurrency = max(1, max_concurrency)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="tool")
+
+    try:
+        return await asyncio.gather(*[
+            run_invocation(
+                tools,
+                invocation,
+                semaphore,
+                executor,
+                tool_timeouts.get(invocation.get("toolName"), default_timeout)
+            )
+            for invocation in invocations
+        ])
+    finally:
+        executor.shutdown(wait=False)
+
+
+def dispatch_sync(tools: dict, invocations: list, **kwargs) -> list:
+    """
+    Blocking wrapper around dispatch() for synchronous handlers. asyncio.run() cannot
+    start inside a running event loop, so when called from one (a sync handler invoked
+    from async code) the dispatch gets its own loop on a worker thread; waiting on a
+    future scheduled onto the caller's loop would block the loop it needs.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(dispatch(tools, invocations, **kwargs))
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="dispatch") as pool:
+        return pool.submit(run_with_context(asyncio.run), dispatch(tools, invocations, **kwargs)).result()
@@ -0,0 +1,268 @@
+"""
+Collision-free, time-ordered IDs for escalations, PNRs and other records.
+Snowflake layout: clock ticks since EPOCH, then the node, then a per-tick sequence.
+"""
+import hashlib
+import os
+import random
+import threading
+import time
+from lib.log import get_logger
+
+logger = get_logger('ids')
+
+# 2025-01-01T00:00:00Z; 40 bits of milliseconds from here last until 2059
+EPOCH_MS = 1_735_689_600_000
+
+# Crockford base32: no I, L, O or U, so codes read back unambiguously
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
+# Nodes are 16 bits wide: enough to give every instance its own ID_NODE, and to make
+# randomly drawn nodes of independent hosts unlikely to meet
+NODE_BITS = 16
+
+# Record IDs: 40-bit milliseconds (until 2059) | 16-bit node | 8-bit sequence (256 per ms
+# per node). A burst may run up to a second ahead of the clock before next_id() waits.
+ID_LAYOUT = {'time_bits': 40, 'node_bits': NODE_BITS, 'sequence_bits': 8, 'tick_ms': 1, 'max_lookahead': 1000}
+ID_CHARS = 13
+
+# PNRs are 10 characters (50 bits): 22-bit seconds | 16-bit node | 12-bit sequence
+# (4096 per second per node). The second counter wraps after ~48 days, so, like
+# airline record locators, a PNR is unique among those issued in the last 48 days,
+# not forever. Bursts may run at most a minute ahead of the clock, then wait, so
+# borrowed ticks can never catch up with the wrap.
+PNR_LAYOUT = {'time_bits': 22, 'node_bits': NODE_BITS, 'sequence_bits': 12, 'tick_ms': 1000, 'max_lookahead': 60}
+PNR_CHARS = 10
+
+
+class IdGenerator:
+    """
+    Packs (tick, node, sequence) into one integer.
+
+    IDs from one generator never repeat and strictly increase. When a tick's
+    sequence runs out, or the clock steps backwards, the generator borrows the
+    next tick; once it is max_lookahead ticks ahead of the clock it sleeps until
+    the clock catches up instead, so the time field can never run into its wrap.
+    Distinct nodes can never produce the same ID.
+    """
+
+    def __init__(self, node: int, time_bits: int = 41, node_bits: int = 10, sequence_bits: int = 12,
+                 tick_ms: int = 1, max_lookahead: int = 1000, clock=time.time_ns):
+        if not 0 <= node < 1 << node_bits:
+            raise ValueError(f"node must be in [0, {1 << node_bits}), got {node}")
+        self.node = node
+        self.tick_ms = tick_ms
+        self._clock = clock
+        self._epoch_ns = EPOCH_MS * 1_000_000
+        self._tick_ns = tick_ms * 1_000_000
+        self._time_mask = (1 << time_bits) - 1
+        self._time_shift = node_bits + sequence_bits
+        self._node_bits = node << sequence_bits
+        self._sequence_bits = sequence_bits
+        self._max_sequence = (1 << sequence_bits) - 1
+        self._max_lookahead = max_lookahead
+        self._lock = threading.Lock()
+        self._tick = -1
+        self._sequence = 0
+
+    def next_id(self) -> int:
+        while True:
+            now = self._now()
+            with self._lock:
+                value = self._advance(now)
+            if value is not None:
+                return value
+            self._wait()
+
+    def take(self, count: int) -> list:
+        """
+        count increasing IDs, taken in as few lock acquisitions as the lookahead allows,
+        e.g. one per passenger of a manifest
+        """
+        ids = []
+        while True:
+            now = self._now()
+            with self._lock:
+                while len(ids) < count:
+                    value = self._advance(now)
+                    if value is None:
+                        break
+                    ids.append(value)
+            if len(ids) == count:
+                return ids
+            self._wait()
+
+    def _now(self) -> int:
+        return (self._clock() - self._epoch_ns) // self._tick_ns
+
+    def _advance(self, now: int):
+        """
+        The next ID, or None when the lookahead is used up; called under the lock
+        """
+        if now > self._tick:
+            self._tick, self._sequence = now, 0
+        elif self._sequence < self._max_sequence:
+            self._sequence += 1
+        elif self._tick + 1 - now <= self._max_lookahead:
+            self._tick, self._sequence = self._tick + 1, 0
+        else:
+            return None
+        return ((self._tick & self._time_mask) << self._time_shift) | self._node_bits | self._sequence
+
+    def _wait(self):
+        """
+        Sleep until the clock reaches the tick that brings the last borrowed one back within the lookahead
+        """
+        resume = (self._tick + 1 - self._max_lookahead) * self._tick_ns + self._epoch_ns
+        time.sleep(max(resume - self._clock(), 0) / 1e9)
+
+    def unpack(self, value: int) -> tuple:
+        """
+        (milliseconds since the Unix epoch, node, sequence) of an ID from this layout
+        """
+        tick = value >> self._time_shift
+        node = (value >> self._sequence_bits) & ((1 << (self._time_shift - self._sequence_bits)) - 1)
+        return EPOCH_MS + tick * self.tick_ms, node, value & self._max_sequence
+
+
+def encode(value: int, chars: int) -> str:
+    """
+    Fixed-width Crockford base32; fixed width keeps string order equal to numeric order
+    """
+    out = []
+    for _ in range(chars):
+        out.append(ALPHABET[value & 31])
+        value >>= 5
+    return ''.join(reversed(out))
+
+
+def scramble(value: int, bits: int = 30, rounds: int = 4) -> int:
+    """
+    Bijective Feistel permutation of a bits-wide value: consecutive PNRs look
+    unrelated, yet distinct inputs still give distinct codes
+    """
+    half = bits // 2
+    mask = (1 << half) - 1
+    left, right = value >> half, value & mask
+    for key in range(1, rounds + 1):
+        left, right = right, left ^ (((right * 0x9E3779B1 + key * 0x7F4A7C15) >> 7) & mask)
+    return (left << half) | right
+
+
+# Node slots claimed on this host: one lock file per slot, held for the life of the process
+_entropy = random.SystemRandom()
+_node = None
+_slot_fds = []
+_generators = {}
+_lock = threading.Lock()
+
+
+def claim_node(directory: str, node_bits: int = NODE_BITS, attempts: int = 64):
+    """
+    A random node slot not held by another process on this host, or None.
+    Slots are drawn from OS entropy rather than counted up from 0: directory is
+    local to the host (each Lambda / AgentCore microVM has its own /tmp), so the
+    lock only separates processes sharing it, and lowest-first would hand every
+    host node 0. The slot is an exclusive flock on a file in directory; the kernel
+    releases it when the process exits.
+    """
+    try:
+        import fcntl
+    except ImportError:  # POSIX only
+        return None
+
+    os.makedirs(directory, exist_ok=True)
+    for _ in range(attempts):
+        node = _entropy.randrange(1 << node_bits)
+        fd = os.open(os.path.join(directory, f"{node}.lock"), os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            continue
+        _slot_fds.append(fd)
+        return node
+    return None
+
+
+def node_id() -> int:
+    """
+    This process's node: ID_NODE when set (one per instance guarantees uniqueness),
+    else a random slot, unique among the processes on this host
+    """
+    global _node
+    if _node is None:
+        with _lock:
+            if _node is None:
+                from config import ID_NODE, ID_NODE_DIR, ID_NODE_REQUIRED
+                node = ID_NODE
+                if node is None and ID_NODE_REQUIRED:
+                    raise RuntimeError("ID_NODE is required (ID_NODE_REQUIRED is set) but not configured")
+                if node is None:
+                    node = claim_node(ID_NODE_DIR, NODE_BITS)
+                if node is None:
+                    node = _entropy.randrange(1 << NODE_BITS)
+                    logger.warning("No ID node slot available; using random node %d", node)
+                else:
+                    logger.info("ID node %d", node)
+                _node = node
+    return _node
+
+
+def _generator(name: str, layout: dict) -> IdGenerator:
+    generator = _generators.get(name)
+    if generator is None:
+        node = node_id()
+        with _lock:
+            generator = _generators.get(name)
+            if generator is None:
+                # Folding a node into range would share it with another process: refuse instead
+                if node >= 1 << layout['node_bits']:
+                    raise ValueError(f"ID node {node} does not fit the {name} layout; "
+                                     f"ID_NODE must be in [0, {1 << layout['node_bits']})")
+                generator = _generators[name] = IdGenerator(node, **layout)
+    return generator
+
+
+def next_id() -> int:
+    """
+    A new 64-bit record ID
+    """
+    return _generator('id', ID_LAYOUT).next_id()
+
+
+def new_id(prefix: str) -> str:
+    """
+    A new record ID rendered as PREFIX-<13 base32 characters>, e.g. ESC-0G9YQ3K2D0004
+    """
+    return f"{prefix}-{encode(next_id(), ID_CHARS)}"
+
+
+def new_pnr() -> str:
+    """
+    A new PNR-shaped booking reference, e.g. PNR-K7Q2XM4B9D
+    """
+    value = _generator('pnr', PNR_LAYOUT).next_id()
+    return f"PNR-{encode(scramble(value, PNR_CHARS * 5), PNR_CHARS)}"
+
+
+def derived_pnr(key: str) -> str:
+    """
+    A PNR-shaped reference that is a function of key: the same request always gets the same one
+    """
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    return f"PNR-{encode(int.from_bytes(digest, 'big'), PNR_CHARS)}"
+
+
+def _reset_after_fork():
+    # A forked child shares the parent's slot lock and sequence; it claims its own
+    global _node
+    for fd in _slot_fds:
+        os.close(fd)
+    _slot_fds.clear()
+    _generators.clear()
+    _node = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
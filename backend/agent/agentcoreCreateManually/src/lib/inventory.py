@@ -0,0 +1,437 @@
+"""
+Flight schedule inventory index for rebooking searches
+"""
+import csv
+import datetime
+import heapq
+import json
+import os
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from lib.codec import get_codec
+from lib.log import get_logger
+
+logger = get_logger('inventory')
+
+
+# Minimum connection time per hub, in minutes
+MIN_CONNECTION_MINUTES = {
+    'ORD': 50,
+    'ATL': 45,
+    'DFW': 45,
+    'LAX': 60,
+    'MUC': 35,
+    'LHR': 75,
+    'CDG': 60,
+}
+DEFAULT_MIN_CONNECTION_MINUTES = 60
+MAX_LAYOVER_MINUTES = 6 * 60
+
+# Onward flights kept per inbound leg in the connection table
+CONNECTIONS_PER_LEG = 2
+
+# Hubs whose connection tables are built when the index is loaded; others are built on first use
+CONNECTION_HUBS = tuple(MIN_CONNECTION_MINUTES)
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+# Connection table of a route without connections
+EMPTY_TABLE = (array('i'), array('i'), array('i'))
+
+# Saved .idx files: this line, a line of JSON (airports, flight numbers, sizes), then the
+# raw bytes of the columns and of the connection tables. Nothing in one is ever executed.
+IDX_MAGIC = b'FLIGHTIDX 1\n'
+IDX_COLUMNS = (('origin', 'H'), ('destination', 'H'), ('departure', 'i'), ('arrival', 'i'), ('seats', 'i'), ('fare', 'f'))
+
+
+def to_epoch_minutes(value) -> int:
+    """
+    Convert a datetime, ISO-8601 string or epoch-minute number to epoch minutes (UTC)
+    """
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        if value.isdigit():
+            return int(value)
+        value = datetime.datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return int((value - EPOCH).total_seconds() // 60)
+
+
+def from_epoch_minutes(minutes: int) -> datetime.datetime:
+    """
+    Convert epoch minutes back to a naive UTC datetime
+    """
+    return (EPOCH + datetime.timedelta(minutes=minutes)).replace(tzinfo=None)
+
+
+class FlightIndex:
+    """
+    Array-backed flight schedule index.
+
+    Flights are stored column-wise, sorted by (origin, destination, departure),
+    so each route is a contiguous slice searchable with bisect. One-stop
+    connections through CONNECTION_HUBS, respecting per-hub minimum connection
+    times, are tabulated for every origin/destination pair when the index is
+    built (and persisted by save()), so no query pays for building them.
+    """
+
+    def __init__(self, airports, flight_numbers, origin, destination, departure, arrival, seats, fare,
+                 hub_connections=None):
+        self.airports = airports
+        self.flight_numbers = flight_numbers
+        self.origin = origin
+        self.destination = destination
+        self.departure = departure
+        self.arrival = arrival
+        self.seats = seats
+        self.fare = fare
+
+        self._airport_ids = {code: i for i, code in enumerate(airports)}
+        self._routes = {}
+        self._connections = {}
+
+        start = 0
+        for i in range(1, len(departure) + 1):
+            if i == len(departure) or origin[i] != origin[start] or destination[i] != destination[start]:
+                if i > start:
+                    self._routes[(origin[start], destination[start])] = (start, i)
+                start = i
+
+        # (origin id, destination id) -> connection table through every available CONNECTION_HUB
+        self._hub_connections = hub_connections if hub_connections is not None else self._build_hub_connections()
+        self._hub_ids = {code: self._airport_ids[code] for code in CONNECTION_HUBS if code in self._airport_ids}
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Build an index from dicts with flight_number, origin, destination,
+        departure, arrival and optional seats_available / fare keys
+        """
+        rows = []
+        for record in records:
+            rows.append((
+                record['origin'].upper(),
+                record['destination'].upper(),
+                to_epoch_minutes(record['departure']),
+                to_epoch_minutes(record['arrival']),
+                record['flight_number'],
+                int(record.get('seats_available', 0) or 0),
+                float(record.get('fare', 0) or 0)
+            ))
+        rows.sort()
+
+        airports = sorted({row[0] for row in rows} | {row[1] for row in rows})
+        airport_ids = {code: i for i, code in enumerate(airports)}
+
+        return cls(
+            airports,
+            [row[4] for row in rows],
+            array('H', (airport_ids[row[0]] for row in rows)),
+            array('H', (airport_ids[row[1]] for row in rows)),
+            array('i', (row[2] for row in rows)),
+            array('i', (row[3] for row in rows)),
+            array('i', (row[5] for row in rows)),
+            array('f', (row[6] for row in rows))
+        )
+
+    @classmethod
+    def from_file(cls, path: str):
+        """
+        Load a schedule from .csv, .json, .parquet or a saved .idx index
+        """
+        ext = os.path.splitext(path)[1].lower()
+
+        if ext == '.idx':
+            return cls._load_idx(path)
+        if ext == '.csv':
+            with open(path, newline='', encoding='utf-8') as f:
+                return cls.from_records(csv.DictReader(f))
+        if ext == '.json':
+            with open(path, encoding='utf-8') as f:
+                return cls.from_records(json.load(f))
+        if ext == '.parquet':
+            import pyarrow.parquet as pq  # optional dependency
+            return cls.from_records(pq.read_table(path).to_pylist())
+
+        raise ValueError(f"Unsupported schedule format: {path}")
+
+    def save(self, path: str):
+        """
+        Persist the index, connection tables included, in a compact binary form for fast cold starts
+        """
+        routes = sorted(self._hub_connections.items())
+        tables = (array('i'), array('i'), array('i'))
+        for _, table in routes:
+            for merged, column in zip(tables, table):
+                merged.extend(column)
+        header = {
+            'byteorder': sys.byteorder,
+            'airports': self.airports,
+            'flight_numbers': self.flight_numbers,
+            'connections': [[o, d, len(table[0])] for (o, d), table in routes]
+        }
+        with open(path, 'wb') as f:
+            f.write(IDX_MAGIC)
+            f.write(get_codec().dumps_bytes(header) + b'\n')
+            for name, _ in IDX_COLUMNS:
+                getattr(self, name).tofile(f)
+            for column in tables:
+                column.tofile(f)
+
+    @classmethod
+    def _load_idx(cls, path: str):
+        with open(path, 'rb') as f:
+            if f.readline() != IDX_MAGIC:
+                raise ValueError(f"Not a saved flight index: {path}")
+            header = get_codec().loads(f.readline())
+            data = memoryview(f.read())
+
+        swap = header['byteorder'] != sys.byteorder
+        offset = 0
+
+        def take(typecode, count):
+            nonlocal offset
+            column = array(typecode)
+            end = offset + count * column.itemsize
+            if end > len(data):
+                raise ValueError(f"Truncated flight index: {path}")
+            column.frombytes(data[offset:end])
+            if swap:
+                column.byteswap()
+            offset = end
+            return column
+
+        rows = len(header['flight_numbers'])
+        columns = [take(typecode, rows) for _, typecode in IDX_COLUMNS]
+        routes = header['connections']
+        total = sum(count for _, _, count in routes)
+        merged = [take('i', total) for _ in range(3)]
+        if offset != len(data):
+            raise ValueError(f"Unexpected data after the flight index: {path}")
+
+        hub_connections, start = {}, 0
+        for o, d, count in routes:
+            hub_connections[(o, d)] = tuple(column[start:start + count] for column in merged)
+            start += count
+        return cls(header['airports'], header['flight_numbers'], *columns, hub_connections)
+
+    def __len__(self):
+        return len(self.departure)
+
+    def direct(self, origin: str, destination: str, earliest: int, latest: int) -> range:
+        """
+        Indices of direct flights departing within [earliest, latest] epoch minutes
+        """
+        route = self._route(origin, destination)
+        if route is None:
+            return range(0)
+        lo, hi = route
+        return range(
+            bisect_left(self.departure, earliest, lo, hi),
+            bisect_right(self.departure, latest, lo, hi)
+        )
+
+    def connections(self, origin: str, destination: str, hubs) -> tuple:
+        """
+        One-stop connection table for a route: parallel arrays of
+        (first-leg departure, first-leg index, second-leg index), sorted by departure
+        """
+        key = (origin, destination, tuple(hubs))
+        table = self._connections.get(key)
+        if table is None:
+            table = self._connections[key] = self._hub_table(origin, destination, hubs)
+        return table
+
+    def _hub_table(self, origin, destination, hubs):
+        """
+        The prebuilt table, or the rows of it through the requested hubs;
+        hubs outside CONNECTION_HUBS fall back to building a table for the route
+        """
+        if any(hub not in CONNECTION_HUBS for hub in hubs):
+            return self._build_connections(origin, destination, hubs)
+        o, d = self._airport_ids.get(origin), self._airport_ids.get(destination)
+        table = self._hub_connections.get((o, d), EMPTY_TABLE)
+        # The origin and destination are never a connection's hub, so they may be counted as allowed
+        allowed = {self._hub_ids[hub] for hub in hubs if hub in self._hub_ids}
+        if allowed.issuperset(self._hub_ids.values()) or not table[0]:
+            return table
+        departures, first, second = table
+        rows = [n for n in range(len(departures)) if self.origin[second[n]] in allowed]
+        return (
+            array('i', (departures[n] for n in rows)),
+            array('i', (first[n] for n in rows)),
+            array('i', (second[n] for n in rows))
+        )
+
+    def search(self, origin: str, destination: str, earliest: int, latest: int, hubs=()) -> list:
+        """
+        Itineraries (tuples of flight indices) departing within the window with seats on every leg
+        """
+        seats = self.seats
+        itineraries = [(i,) for i in self.direct(origin, destination, earliest, latest) if seats[i] > 0]
+
+        if hubs:
+            departures, first, second = self.connections(origin, destination, hubs)
+            for n in range(bisect_left(departures, earliest), bisect_right(departures, latest)):
+                i, j = first[n], second[n]
+                if seats[i] > 0 and seats[j] > 0:
+                    itineraries.append((i, j))
+
+        return itineraries
+
+    def best(self, origin: str, destination: str, earliest: int, latest: int, k: int,
+             hubs=(), accept=None) -> list:
+        """
+        The k itineraries with seats that arrive earliest (fewer legs first on ties),
+        optionally filtered by an accept(legs) predicate; k=None returns every one
+        in the window, in the same order.
+
+        Candidates are scanned in departure order with a bounded heap; a scan stops as
+        soon as a departure is later than the k-th best arrival, since no later
+        itinerary can arrive before it.
+        """
+        if k is None:
+            k = float('inf')
+        elif k <= 0:
+            return []
+        seats, arrival = self.seats, self.arrival
+        # Min-heap on negated keys keeps the worst of the current top k at heap[0];
+        # seq keeps entries comparable and favours earlier candidates on ties
+        heap = []
+        seq = 0
+
+        def offer(legs):
+            nonlocal seq
+            key = (-arrival[legs[-1]], -len(legs), -seq)
+            seq += 1
+            if len(heap) < k:
+                heapq.heappush(heap, (key, legs))
+            elif key > heap[0][0]:
+                heapq.heapreplace(heap, (key, legs))
+
+        for i in self.direct(origin, destination, earliest, latest):
+            if len(heap) == k and self.departure[i] > -heap[0][0][0]:
+                break
+            if seats[i] > 0 and (accept is None or accept((i,))):
+                offer((i,))
+
+        if hubs:
+            departures, first, second = self.connections(origin, destination, hubs)
+            for n in range(bisect_left(departures, earliest), bisect_right(departures, latest)):
+                if len(heap) == k and departures[n] > -heap[0][0][0]:
+                    break
+                legs = (first[n], second[n])
+                if seats[legs[0]] > 0 and seats[legs[1]] > 0 and (accept is None or accept(legs)):
+                    offer(legs)
+
+        return [legs for _, legs in sorted(heap, reverse=True)]
+
+    def airport_code(self, airport_id: int) -> str:
+        return self.airports[airport_id]
+
+    def _route(self, origin, destination):
+        o = self._airport_ids.get(origin)
+        d = self._airport_ids.get(destination)
+        if o is None or d is None:
+            return None
+        return self._routes.get((o, d))
+
+    def _build_hub_connections(self) -> dict:
+        """
+        Connection tables of every route through CONNECTION_HUBS, keyed by airport ids;
+        the same rows _build_connections would produce per route
+        """
+        departure, arrival = self.departure, self.arrival
+        hubs = {self._airport_ids[code]: code for code in CONNECTION_HUBS if code in self._airport_ids}
+        inbound, outbound = {}, {}
+        for (o, d), span in self._routes.items():
+            if d in hubs:
+                inbound.setdefault(d, []).append((o, span))
+            if o in hubs:
+                outbound.setdefault(o, []).append((d, span))
+
+        pairs = {}
+        for hub, code in hubs.items():
+            mct = MIN_CONNECTION_MINUTES.get(code, DEFAULT_MIN_CONNECTION_MINUTES)
+            for o, inbound_span in inbound.get(hub, ()):
+                for d, (lo, hi) in outbound.get(hub, ()):
+                    if d == o:
+                        continue
+                    route = pairs.setdefault((o, d), [])
+                    for i in range(*inbound_span):
+                        ready = arrival[i] + mct
+                        j = bisect_left(departure, ready, lo, hi)
+                        last = min(hi, j + CONNECTIONS_PER_LEG)
+                        while j < last and departure[j] - arrival[i] <= MAX_LAYOVER_MINUTES:
+                            route.append((departure[i], i, j))
+                            j += 1
+
+        tables = {}
+        for key, route in pairs.items():
+            route.sort()
+            tables[key] = (
+                array('i', (p[0] for p in route)),
+                array('i', (p[1] for p in route)),
+                array('i', (p[2] for p in route))
+            )
+        return tables
+
+    def _build_connections(self, origin, destination, hubs):
+        pairs = []
+        departure, arrival = self.departure, self.arrival
+
+        for hub in hubs:
+            if hub in (origin, destination):
+                continue
+            inbound = self._route(origin, hub)
+            outbound = self._route(hub, destination)
+            if inbound is None or outbound is None:
+                continue
+
+            mct = MIN_CONNECTION_MINUTES.get(hub, DEFAULT_MIN_CONNECTION_MINUTES)
+            lo, hi = outbound
+            for i in range(*inbound):
+                ready = arrival[i] + mct
+                j = bisect_left(departure, ready, lo, hi)
+                last = min(hi, j + CONNECTIONS_PER_LEG)
+                while j < last and departure[j] - arrival[i] <= MAX_LAYOVER_MINUTES:
+                    pairs.append((departure[i], i, j))
+                    j += 1
+
+        pairs.sort()
+        return (
+            array('i', (p[0] for p in pairs)),
+            array('i', (p[1] for p in pairs)),
+            array('i', (p[2] for p in pairs))
+        )
+
+
+_flight_index = None
+_flight_index_loaded = False
+
+
+def get_flight_index():
+    """
+    Shared schedule index, loaded on first use; None when no schedule is configured
+    """
+    global _flight_index, _flight_index_loaded
+    if not _flight_index_loaded:
+        from config import FLIGHT_SCHEDULE_PATH
+        if FLIGHT_SCHEDULE_PATH and os.path.exists(FLIGHT_SCHEDULE_PATH):
+            logger.info("Loading flight schedule from %s", FLIGHT_SCHEDULE_PATH)
+            _flight_index = FlightIndex.from_file(FLIGHT_SCHEDULE_PATH)
+            logger.info("Indexed %d flights", len(_flight_index))
+        _flight_index_loaded = True
+    return _flight_index
+
+
+def set_flight_index(index):
+    """
+    Replace the shared index (tests, benchmarks, schedule reloads)
+    """
+    global _flight_index, _flight_index_loaded
+    _flight_index = index
+    _flight_index_loaded = True
@@ -0,0 +1,174 @@
+"""
+Structured, low-overhead logging for the agent runtime
+"""
+import atexit
+import hashlib
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+
+from lib.request_context import current_request_id
+
+
+ROOT_LOGGER = 'agent'
+
+# Fields of LogRecord that are not user-supplied extras
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+_redact_enabled = True
+
+
+class LazyJson:
+    """
+    Defers json.dumps until a handler actually formats the record
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return json.dumps(self.value, default=str)
+
+
+class Redacted:
+    """
+    Stands in for passenger free text: logs length and a short digest, never the content
+    """
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+    def __str__(self):
+        text = self.text if isinstance(self.text, str) else str(self.text)
+        digest = hashlib.sha1(text.encode('utf-8')).hexdigest()[:8]
+        return f"<redacted len={len(text)} sha1={digest}>"
+
+
+def redact(text):
+    """
+    Wrap passenger text for logging; passes through when redaction is disabled
+    """
+    return Redacted(text) if _redact_enabled else text
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line, with any `extra=` fields merged in
+    """
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # Records from the queue handler carry the traceback already formatted
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class PayloadSampler(logging.Filter):
+    """
+    Lets through only a fraction of records marked with extra={'payload': True}
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if getattr(record, 'payload', False):
+            return self.rate >= 1 or random.random() < self.rate
+        return True
+
+
+class _PreformattedQueueHandler(logging.handlers.QueueHandler):
+    """
+    Resolves the message on the calling thread, so mutable arguments are captured
+    as they were, and leaves JSON encoding and I/O to the listener thread.
+    """
+
+    def prepare(self, record):
+        request_id = current_request_id()
+        if request_id is not None:
+            record.request_id = request_id
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(level: str = 'INFO', payload_sample_rate: float = 0.01, redact_text: bool = True,
+                      stream=None):
+    """
+    Route agent logs through a queue to a background JSON writer.
+    Safe to call more than once; later calls reconfigure.
+    """
+    global _listener, _redact_enabled
+    _redact_enabled = redact_text
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.setLevel(level)
+    logger.propagate = False
+
+    if _listener is not None:
+        _listener.stop()
+    for existing in list(logger.handlers):
+        logger.removeHandler(existing)
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter())
+
+    records = queue.SimpleQueue()
+    queue_handler = _PreformattedQueueHandler(records)
+    queue_handler.addFilter(PayloadSampler(payload_sample_rate))
+    logger.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=False)
+    _listener.start()
+    return logger
+
+
+def flush_logging():
+    """
+    Drain queued records (call before the process is frozen or exits)
+    """
+    if _listener is not None:
+        _listener.stop()
+        _listener.start()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Logger under the agent hierarchy, e.g. get_logger('bedrock') -> 'agent.bedrock'
+    """
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def log_payload(logger: logging.Logger, message: str, payload):
+    """
+    Sampled DEBUG log of a (possibly large) payload; serialized only if emitted
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s: %s", message, LazyJson(payload), extra={'payload': True})
+
+
+@atexit.register
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
@@ -0,0 +1,339 @@
+"""
+Latency and throughput instrumentation for tools and AWS calls
+"""
+import functools
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from lib.log import get_logger
+
+logger = get_logger('metrics')
+
+# Histogram bucket upper bounds in milliseconds: 0.1 ms .. ~150 s, 25% apart
+BUCKET_BOUNDS_MS = [round(0.1 * 1.25 ** i, 4) for i in range(64)]
+
+_enabled = False
+_namespace = 'FlightDisruptionAgent'
+_flush_interval = 60.0
+_last_flush = time.monotonic()
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram; percentiles are interpolated within a bucket.
+    Totals cover the life of the process; drain() also yields what was recorded
+    since its previous call, for metrics published per interval.
+    """
+    __slots__ = ('counts', 'count', 'total', 'minimum', 'maximum', 'errors', 'lock',
+                 'drained', 'interval_minimum', 'interval_maximum')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.minimum = float('inf')
+        self.maximum = 0.0
+        self.errors = 0
+        self.lock = threading.Lock()
+        # counts, count, total and errors as of the last drain()
+        self.drained = (list(self.counts), 0, 0.0, 0)
+        self.interval_minimum = float('inf')
+        self.interval_maximum = 0.0
+
+    def record(self, elapsed_ms: float, error: bool = False):
+        bucket = bisect_left(BUCKET_BOUNDS_MS, elapsed_ms)
+        with self.lock:
+            self.counts[bucket] += 1
+            self.count += 1
+            self.total += elapsed_ms
+            if elapsed_ms < self.minimum:
+                self.minimum = elapsed_ms
+            if elapsed_ms > self.maximum:
+                self.maximum = elapsed_ms
+            if elapsed_ms < self.interval_minimum:
+                self.interval_minimum = elapsed_ms
+            if elapsed_ms > self.interval_maximum:
+                self.interval_maximum = elapsed_ms
+            if error:
+                self.errors += 1
+
+    def percentile(self, q: float) -> float:
+        return _percentile(self.counts, self.count, self.minimum, self.maximum, q)
+
+    def summary(self) -> dict:
+        with self.lock:
+            return _summary(self.counts, self.count, self.total, self.errors, self.minimum, self.maximum)
+
+    def drain(self) -> dict:
+        """
+        Summary of the calls recorded since the previous drain(), and start a new interval
+        """
+        with self.lock:
+            counts, count, total, errors = self.drained
+            interval = _summary([n - before for n, before in zip(self.counts, counts)], self.count - count,
+                                self.total - total, self.errors - errors, self.interval_minimum, self.interval_maximum)
+            self.drained = (list(self.counts), self.count, self.total, self.errors)
+            self.interval_minimum = float('inf')
+            self.interval_maximum = 0.0
+            return interval
+
+
+def _percentile(counts: list, count: int, minimum: float, maximum: float, q: float) -> float:
+    if not count:
+        return 0.0
+    rank = q * count
+    seen = 0
+    for bucket, n in enumerate(counts):
+        if n and seen + n >= rank:
+            lower = BUCKET_BOUNDS_MS[bucket - 1] if bucket else 0.0
+            upper = BUCKET_BOUNDS_MS[bucket] if bucket < len(BUCKET_BOUNDS_MS) else maximum
+            value = lower + (upper - lower) * (rank - seen) / n
+            return min(max(value, minimum), maximum)
+        seen += n
+    return maximum
+
+
+def _summary(counts: list, count: int, total: float, errors: int, minimum: float, maximum: float) -> dict:
+    return {
+        'count': count,
+        'errors': errors,
+        'p50': round(_percentile(counts, count, minimum, maximum, 0.50), 3),
+        'p95': round(_percentile(counts, count, minimum, maximum, 0.95), 3),
+        'p99': round(_percentile(counts, count, minimum, maximum, 0.99), 3),
+        'max': round(maximum, 3),
+        'avg': round(total / count, 3) if count else 0.0,
+    }
+
+
+_histograms = {}
+_counters = {}
+# Counter values as of the last EMF documents
+_drained_counters = {}
+_registry_lock = threading.Lock()
+
+
+def configure_metrics(enabled: bool, namespace: str = None, flush_interval: float = None):
+    """
+    Turn instrumentation on or off. Functions decorated while disabled stay unwrapped.
+    """
+    global _enabled, _namespace, _flush_interval
+    _enabled = enabled
+    if namespace:
+        _namespace = namespace
+    if flush_interval is not None:
+        _flush_interval = flush_interval
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def histogram(name: str) -> Histogram:
+    hist = _histograms.get(name)
+    if hist is None:
+        with _registry_lock:
+            hist = _histograms.setdefault(name, Histogram())
+    return hist
+
+
+def record(name: str, elapsed_ms: float, error: bool = False):
+    """
+    Record one timed call
+    """
+    if _enabled:
+        histogram(name).record(elapsed_ms, error)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("span %s %.2f ms", name, elapsed_ms,
+                         extra={'span': name, 'elapsed_ms': round(elapsed_ms, 3), 'error': error})
+
+
+def increment(name: str, value: int = 1):
+    """
+    Bump a counter (cache hits, fallbacks, ...)
+    """
+    if _enabled:
+        with _registry_lock:
+            _counters[name] = _counters.get(name, 0) + value
+
+
+def timed(name: str, error_result=None):
+    """
+    Decorator timing every call. A call is an error if it raises, or if
+    error_result(result) is true (tools report failure in their result).
+    Returns the function unchanged when metrics are disabled.
+    """
+    def decorator(func):
+        if not _enabled:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                record(name, (time.perf_counter() - start) * 1000, True)
+                raise
+            record(name, (time.perf_counter() - start) * 1000,
+                   bool(error_result and error_result(result)))
+            return result
+        return wrapper
+    return decorator
+
+
+def tool_failed(result) -> bool:
+    return isinstance(result, dict) and result.get('success') is False
+
+
+class _InstrumentedClient:
+    """
+    Proxy timing every operation of a boto3 client as '<service>.<operation>'
+    """
+
+    def __init__(self, service, client):
+        self._service = service
+        self._client = client
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith('_') or name in ('meta', 'exceptions') or not callable(attr):
+            return attr
+        wrapped = timed(f"aws.{self._service}.{name}")(attr)
+        setattr(self, name, wrapped)
+        return wrapped
+
+
+def instrument_client(service: str, client):
+    """
+    Wrap a client so its calls are timed; the client itself when disabled
+    """
+    return _InstrumentedClient(service, client) if _enabled else client
+
+
+def snapshot() -> dict:
+    """
+    Current histograms and counters, totals since the process started
+    """
+    with _registry_lock:
+        names = list(_histograms.items())
+        counters = dict(_counters)
+    return {
+        'histograms': {name: hist.summary() for name, hist in names},
+        'counters': counters,
+    }
+
+
+def reset():
+    with _registry_lock:
+        _histograms.clear()
+        _counters.clear()
+        _drained_counters.clear()
+
+
+def drain() -> dict:
+    """
+    Histograms and counters of the interval since the previous drain(); histograms
+    without calls in it are left out. snapshot() and prometheus_text() keep reporting totals.
+    """
+    with _registry_lock:
+        names = list(_histograms.items())
+        counters = {name: value - _drained_counters.get(name, 0) for name, value in _counters.items()}
+        _drained_counters.update(_counters)
+    histograms = {}
+    for name, hist in names:
+        summary = hist.drain()
+        if summary['count']:
+            histograms[name] = summary
+    return {'histograms': histograms, 'counters': counters}
+
+
+def emf_lines() -> list:
+    """
+    CloudWatch Embedded Metric Format documents, one per histogram plus one for counters.
+    CloudWatch sums the values it receives, so each call reports only what happened
+    since the previous one (see drain()).
+    """
+    data = drain()
+    timestamp = int(time.time() * 1000)
+    lines = []
+
+    for name, summary in data['histograms'].items():
+        lines.append(json.dumps({
+            '_aws': {
+                'Timestamp': timestamp,
+                'CloudWatchMetrics': [{
+                    'Namespace': _namespace,
+                    'Dimensions': [['Operation']],
+                    'Metrics': [
+                        {'Name': 'LatencyP50', 'Unit': 'Milliseconds'},
+                        {'Name': 'LatencyP95', 'Unit': 'Milliseconds'},
+                        {'Name': 'LatencyP99', 'Unit': 'Milliseconds'},
+                        {'Name': 'Calls', 'Unit': 'Count'},
+                        {'Name': 'Errors', 'Unit': 'Count'},
+                    ]
+                }]
+            },
+            'Operation': name,
+            'LatencyP50': summary['p50'],
+            'LatencyP95': summary['p95'],
+            'LatencyP99': summary['p99'],
+            'Calls': summary['count'],
+            'Errors': summary['errors'],
+        }))
+
+    if data['counters']:
+        lines.append(json.dumps(dict({
+            '_aws': {
+                'Timestamp': timestamp,
+                'CloudWatchMetrics': [{
+                    'Namespace': _namespace,
+                    'Dimensions': [[]],
+                    'Metrics': [{'Name': name, 'Unit': 'Count'} for name in data['counters']]
+                }]
+            }
+        }, **data['counters'])))
+
+    return lines
+
+
+def prometheus_text() -> str:
+    """
+    Prometheus text exposition format
+    """
+    data = snapshot()
+    out = []
+
+    if data['histograms']:
+        out.append('# TYPE agent_latency_ms summary')
+        for name, summary in data['histograms'].items():
+            for q in ('p50', 'p95', 'p99'):
+                out.append(f'agent_latency_ms{{operation="{name}",quantile="0.{q[1:]}"}} {summary[q]}')
+            out.append(f'agent_latency_ms_count{{operation="{name}"}} {summary["count"]}')
+        out.append('# TYPE agent_errors_total counter')
+        for name, summary in data['histograms'].items():
+            out.append(f'agent_errors_total{{operation="{name}"}} {summary["errors"]}')
+
+    if data['counters']:
+        out.append('# TYPE agent_events_total counter')
+        for name, value in data['counters'].items():
+            out.append(f'agent_events_total{{event="{name}"}} {value}')
+
+    return '\n'.join(out) + '\n'
+
+
+def maybe_flush():
+    """
+    Write EMF lines to stdout (picked up from the runtime's logs) at most once per flush interval
+    """
+    global _last_flush
+    if not _enabled:
+        return
+    now = time.monotonic()
+    if now - _last_flush < _flush_interval:
+        return
+    _last_flush = now
+    for line in emf_lines():
+        print(line, flush=True)
@@ -0,0 +1,407 @@
+"""
+Column-oriented rebooking option sets.
+Options are kept as typed arrays and interned strings; the option dict / JSON
+shape returned to the agent is only produced at the response boundary.
+"""
+import collections
+import datetime
+import itertools
+import operator
+import os
+from array import array
+
+# Every option is bookable when offered
+AVAILABILITY = 'confirmed'
+
+# Keys of an option dict, in order
+FIELDS = ('optionId', 'routing', 'departure', 'arrival', 'duration', 'stops', 'flights', 'class', 'cost',
+          'availability', 'compatibility', 'confidence')
+
+# HH:MM for every minute of the day
+CLOCK = [f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(24 * 60)]
+
+LETTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+# A..ZZ, enough for any single response; longer labels are built from these
+LABELS = list(LETTERS) + [a + b for a in LETTERS for b in LETTERS]
+
+
+def flight_instance(number: str, departure: int) -> str:
+    """
+    Key of one scheduled departure of a flight number: 'UA123@2026-01-05T14:05' (UTC,
+    departure in epoch minutes). Seat inventory is kept per instance, since a flight
+    number repeats every day.
+    """
+    return f"{number}@{(EPOCH + datetime.timedelta(minutes=departure)):%Y-%m-%dT%H:%M}"
+
+
+def parse_flight_instance(key: str) -> tuple:
+    """
+    (flight number, departure in epoch minutes) of a flight instance key, or (key, None)
+    when it carries no departure
+    """
+    number, _, departure = key.partition('@')
+    if not departure:
+        return key, None
+    try:
+        when = datetime.datetime.strptime(departure, '%Y-%m-%dT%H:%M')
+    except ValueError:
+        return key, None
+    return number, int((when - EPOCH).total_seconds() // 60)
+
+
+def option_label(i: int) -> str:
+    """
+    Spreadsheet-style option IDs: A..Z, AA, AB, ...
+    """
+    if i < len(LABELS):
+        return LABELS[i]
+    return option_label(i // 26 - 1) + LETTERS[i % 26]
+
+
+def labels_upto(count: int) -> list:
+    """
+    The first count option IDs, in order
+    """
+    if count <= len(LABELS):
+        return LABELS
+    labels = list(LABELS)
+    for width in itertools.count(3):
+        labels.extend(itertools.islice(map(''.join, itertools.product(LETTERS, repeat=width)), count - len(labels)))
+        if len(labels) >= count:
+            return labels
+
+
+def hundredths(value: float) -> int:
+    """
+    A score rounded to 2 decimals, stored as an integer (0.93 -> 93)
+    """
+    return int(round(round(value, 2) * 100))
+
+
+class OptionSet:
+    """
+    Rebooking options stored column-wise.
+
+    Times are epoch minutes, scores are hundredths, and flight numbers, stations
+    and cabin classes are indices into one interned string table; each option's
+    flights, their departures and its stations are slices of flat arrays. Indexing or iterating yields
+    the usual option dicts, built on demand; to_dicts() builds them all at once,
+    and to_json_bytes() writes the JSON array straight from the columns.
+    """
+
+    __slots__ = ('labels', 'departure', 'arrival', 'cost', 'compatibility', 'confidence', 'cabin',
+                 'leg_end', 'flights', 'leg_departure', 'stations', 'strings', '_string_ids', '_routings')
+
+    def __init__(self):
+        self.labels = array('I')
+        self.departure = array('i')
+        self.arrival = array('i')
+        self.cost = array('i')
+        self.compatibility = array('H')
+        self.confidence = array('H')
+        self.cabin = array('I')
+        # Option i's flights are flights[leg_end[i - 1]:leg_end[i]]; it has one more station than legs
+        self.leg_end = array('I')
+        self.flights = array('I')
+        # Departure of each flight (leg), parallel to flights
+        self.leg_departure = array('i')
+        self.stations = array('I')
+        self.strings = []
+        self._string_ids = {}
+        self._routings = {}
+
+    def intern(self, value: str) -> int:
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+    def append(self, label: int, departure: int, arrival: int, stations: list, flights: list,
+               cabin: str, cost: int, compatibility: float, confidence: float, leg_departures: list = None):
+        """
+        Add one option; times in epoch minutes, stations from origin to destination.
+        leg_departures are the departures of each flight (default: all at departure).
+        """
+        intern = self.intern
+        self.labels.append(label)
+        self.departure.append(departure)
+        self.arrival.append(arrival)
+        self.cost.append(cost)
+        self.compatibility.append(hundredths(compatibility))
+        self.confidence.append(hundredths(confidence))
+        self.cabin.append(intern(cabin))
+        self.flights.extend(intern(flight) for flight in flights)
+        self.leg_departure.extend(leg_departures or [departure] * len(flights))
+        self.stations.extend(intern(station) for station in stations)
+        self.leg_end.append(len(self.flights))
+
+    def add_itinerary(self, index, label: int, legs: tuple, cabin: str, cost: int, earliest: int):
+        """
+        Add a scheduled itinerary (FlightIndex rows) as an option
+        """
+        first, last = legs[0], legs[-1]
+        stops = len(legs) - 1
+        # Later departures and extra stops lower compatibility
+        wait_hours = (index.departure[first] - earliest) / 60
+        compatibility = max(0.7, 0.98 - 0.02 * wait_hours - 0.08 * stops)
+        seats = min(index.seats[leg] for leg in legs)
+        self.append(
+            label, index.departure[first], index.arrival[last],
+            [index.airports[index.origin[leg]] for leg in legs] + [index.airports[index.destination[last]]],
+            [index.flight_numbers[leg] for leg in legs],
+            cabin, cost, compatibility, min(0.95, 0.8 + 0.01 * seats),
+            [index.departure[leg] for leg in legs]
+        )
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __repr__(self):
+        return f"OptionSet({len(self)} options)"
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.option(n) for n in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('option index out of range')
+        return self.option(i)
+
+    def __iter__(self):
+        return (self.option(i) for i in range(len(self)))
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def _legs(self, i: int) -> tuple:
+        start = self.leg_end[i - 1] if i else 0
+        return start, self.leg_end[i]
+
+    def option_id(self, i: int) -> str:
+        return option_label(self.labels[i])
+
+    def stops(self, i: int) -> int:
+        start, end = self._legs(i)
+        return end - start - 1
+
+    def flight_numbers(self, i: int) -> list:
+        start, end = self._legs(i)
+        return [self.strings[f] for f in self.flights[start:end]]
+
+    def flight_instances(self, i: int) -> list:
+        """
+        Flight instance keys of option i's flights, as seat inventory counts them
+        """
+        start, end = self._legs(i)
+        return [flight_instance(self.strings[f], d) for f, d in zip(self.flights[start:end], self.leg_departure[start:end])]
+
+    def routing(self, i: int) -> str:
+        start, end = self._legs(i)
+        # Option i's stations follow those of the i options before it, one extra each
+        stations = self.stations[start + i:end + i + 1]
+        return self._routing(tuple(stations))
+
+    def _routing(self, stations: tuple) -> str:
+        routing = self._routings.get(stations)
+        if routing is None:
+            codes = [self.strings[s] for s in stations]
+            routing = f"{codes[0]}→{codes[-1]} (direct)" if len(codes) == 2 else '→'.join(codes)
+            self._routings[stations] = routing
+        return routing
+
+    def option(self, i: int) -> dict:
+        """
+        Option i in the option dict shape
+        """
+        departure, arrival = self.departure[i], self.arrival[i]
+        return {
+            'optionId': self.option_id(i),
+            'routing': self.routing(i),
+            'departure': CLOCK[departure % 1440],
+            'arrival': CLOCK[arrival % 1440],
+            'duration': duration(arrival - departure),
+            'stops': self.stops(i),
+            'flights': self.flight_numbers(i),
+            'class': self.strings[self.cabin[i]],
+            'cost': self.cost[i],
+            'availability': AVAILABILITY,
+            'compatibility': self.compatibility[i] / 100,
+            'confidence': self.confidence[i] / 100
+        }
+
+    def to_dicts(self) -> list:
+        """
+        All options in the option dict shape. Each field is rendered for all options
+        at once from lookup tables; only routings and flight lists need a per-option step.
+        """
+        if not len(self):
+            return []
+        strings, stations, flights = self.strings, self.stations, self.flights
+        scores = {h: h / 100 for h in {*self.compatibility, *self.confidence}}
+        elapsed = [a - d for a, d in zip(self.arrival, self.departure)]
+        durations = {minutes: duration(minutes) for minutes in set(elapsed)}
+        starts = [0, *self.leg_end]
+        routings, flight_lists = [], []
+        for i, (start, end) in enumerate(zip(starts, self.leg_end)):
+            routings.append(self._routing(tuple(stations[start + i:end + i + 1])))
+            flight_lists.append([strings[f] for f in flights[start:end]])
+        labels = labels_upto(max(self.labels) + 1)
+        return [
+            {
+                'optionId': labels[label],
+                'routing': routing,
+                'departure': CLOCK[departure % 1440],
+                'arrival': CLOCK[arrival % 1440],
+                'duration': durations[minutes],
+                'stops': len(legs) - 1,
+                'flights': legs,
+                'class': strings[cabin],
+                'cost': cost,
+                'availability': AVAILABILITY,
+                'compatibility': scores[compatibility],
+                'confidence': scores[confidence]
+            }
+            for label, routing, departure, arrival, minutes, legs, cabin, cost, compatibility, confidence in zip(
+                self.labels, routings, self.departure, self.arrival, elapsed, flight_lists,
+                self.cabin, self.cost, self.compatibility, self.confidence
+            )
+        ]
+
+    def sort_by_compatibility(self):
+        """
+        Reorder options from most to least compatible (stable)
+        """
+        # A reverse sort keeps equal scores in their original order
+        order = sorted(range(len(self)), key=self.compatibility.__getitem__, reverse=True)
+        if all(i == n for n, i in enumerate(order)):
+            return
+        for name in ('labels', 'departure', 'arrival', 'cost', 'compatibility', 'confidence', 'cabin'):
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode, map(column.__getitem__, order)))
+        starts = array('I', [0])
+        starts.extend(self.leg_end)
+        flights, leg_departure, stations, leg_end = array('I'), array('i'), array('I'), array('I')
+        for i in order:
+            start, end = starts[i], starts[i + 1]
+            flights.extend(self.flights[start:end])
+            leg_departure.extend(self.leg_departure[start:end])
+            stations.extend(self.stations[start + i:end + i + 1])
+            leg_end.append(len(flights))
+        self.flights, self.leg_departure, self.stations, self.leg_end = flights, leg_departure, stations, leg_end
+
+
+    def to_json_bytes(self, codec) -> bytes:
+        """
+        The options as a UTF-8 JSON array, identical to codec.dumps_bytes(self.to_dicts()).
+
+        No dicts are built. Every distinct value (clock time, duration, score, string)
+        is encoded once by the codec, each column maps to its encoded pieces, and
+        the pieces fill a row template. Flight lists and routings are joined for all
+        options at once, with NUL marking where each option starts (encoded JSON
+        never contains one), and split apart.
+        """
+        if not len(self):
+            return b'[]'
+        encode = codec.dumps_bytes
+        # The codec's separators, e.g. ',' and ':' (orjson) or ', ' and ': ' (json)
+        probe = encode({'k': [0, 0]})
+        colon, comma = probe[4:probe.index(b'[')], probe[probe.index(b'0') + 1:probe.rindex(b'0')]
+        values = {'optionId': b'"%s"', 'flights': b'[%s]', 'availability': encode(AVAILABILITY).replace(b'%', b'%%')}
+        row = b'{' + comma.join(encode(name) + colon + values.get(name, b'%s') for name in FIELDS) + b'}'
+
+        # Every string in one call: between encoded strings the separator only occurs unescaped
+        quoted = [b'"' + q + b'"' for q in encode(self.strings)[2:-2].split(b'"' + comma + b'"')]
+        starts = array('I', [0])
+        starts.extend(self.leg_end[:-1])
+        legs = list(map(operator.sub, self.leg_end, starts))
+
+        marks = [comma] * len(self.flights)
+        _assign(marks, starts, itertools.repeat(b'\0'))
+        flight_lists = b''.join(map(operator.add, marks, map(quoted.__getitem__, self.flights))).split(b'\0')[1:]
+
+        # Option i's stations are stations[start + i:end + i + 1]; each routing is closed
+        # where the next one starts
+        names = [q[1:-1] for q in quoted]
+        ends = {n: (b' (direct)"' if n == 1 else b'"') + b'\0"' for n in set(legs)}
+        marks = [encode('→')[1:-1]] * len(self.stations)
+        _assign(marks, map(operator.add, starts, range(len(self))), itertools.chain([b'\0"'], map(ends.__getitem__, legs)))
+        routings = b''.join(map(operator.add, marks, map(names.__getitem__, self.stations))) + ends[legs[-1]]
+        routings = routings.split(b'\0')[1:-1]
+
+        # Option labels are plain letters: nothing to escape
+        labels = labels_upto(max(self.labels) + 1)
+        clock = {m: encode(CLOCK[m % 1440]) for m in {*self.departure, *self.arrival}}
+        elapsed = list(map(operator.sub, self.arrival, self.departure))
+        durations = {m: encode(duration(m)) for m in set(elapsed)}
+        stops = {n: encode(n - 1) for n in set(legs)}
+        costs = {c: encode(c) for c in set(self.cost)}
+        scores = {h: encode(h / 100) for h in {*self.compatibility, *self.confidence}}
+        rows = map(row.__mod__, zip(
+            map(str.encode, map(labels.__getitem__, self.labels)),
+            routings,
+            map(clock.__getitem__, self.departure),
+            map(clock.__getitem__, self.arrival),
+            map(durations.__getitem__, elapsed),
+            map(stops.__getitem__, legs),
+            flight_lists,
+            map(quoted.__getitem__, self.cabin),
+            map(costs.__getitem__, self.cost),
+            map(scores.__getitem__, self.compatibility),
+            map(scores.__getitem__, self.confidence)
+        ))
+        return b''.join((b'[', comma.join(rows), b']'))
+
+
+def _assign(items: list, positions, values):
+    """
+    items[p] = v for each position and value, looped in C
+    """
+    collections.deque(map(items.__setitem__, positions, values), maxlen=0)
+
+
+_durations = {}
+
+
+def duration(minutes: int) -> str:
+    """
+    str(timedelta) of a whole number of minutes ('2:05:00', '1 day, 0:30:00'), memoized
+    """
+    text = _durations.get(minutes)
+    if text is None:
+        text = _durations[minutes] = str(datetime.timedelta(minutes=minutes))
+    return text
+
+
+def dumps(value) -> str:
+    """
+    JSON for tool results with the configured codec. OptionSets inside are written by
+    to_json_bytes(): the codec encodes a placeholder string for each, which is then replaced.
+    """
+    from lib.codec import get_codec
+    codec = get_codec()
+    option_sets = []
+    nonce = None
+
+    def default(obj):
+        nonlocal nonce
+        if isinstance(obj, OptionSet):
+            nonce = nonce or os.urandom(8).hex()
+            option_sets.append(obj)
+            return f"\0{nonce}:{len(option_sets) - 1}\0"
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    data = codec.dumps_bytes(value, default=default)
+    for n, option_set in enumerate(option_sets):
+        data = data.replace(codec.dumps_bytes(f"\0{nonce}:{n}\0"), option_set.to_json_bytes(codec), 1)
+    return data.decode('utf-8')
+
+
+def encode_option_set(obj):
+    if isinstance(obj, OptionSet):
+        return obj.to_dicts()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
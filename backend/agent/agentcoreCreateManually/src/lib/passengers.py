@@ -3,26 +3,57 @@ Passenger and flight utilities
 """
 import random
 import datetime
+from lib.constraints import CABIN_RANK, parse_constraints
+from lib.inventory import get_flight_index, to_epoch_minutes
+from lib.log import get_logger
+from lib.options import OptionSet
+
+logger = get_logger('passengers')
 
 
 AIRLINES = ['UA', 'LH', 'BA', 'AF', 'DL']
 HUBS = ['ORD', 'ATL', 'DFW', 'LAX', 'MUC', 'LHR', 'CDG']
 
+# Cabin classes offered per loyalty tier, most likely first
+TIER_CABIN_CLASSES = {
+    'Platinum': ['Business', 'Business', 'First'],
+    'Gold': ['Premium Economy', 'Business'],
+}
+DEFAULT_CABIN_CLASSES = ['Economy', 'Premium Economy']
+
+# Tiers rebooked free of charge, and seat allocation order (lower goes first)
+COMPLIMENTARY_TIERS = ['Platinum', 'Gold']
+TIER_PRIORITY = {'Platinum': 0, 'Gold': 1}
+DEFAULT_TIER_PRIORITY = 2
+
+# Rebooking search window after the earliest possible departure
+SEARCH_WINDOW_HOURS = 24
 
-def generate_flight_options(origin: str, destination: str, tier: str, count: int = 5, constraints: list = None) -> list:
+
+def generate_flight_options(origin: str, destination: str, tier: str, count: int = 5, constraints: list = None,
+                            departure_after: datetime.datetime = None) -> OptionSet:
     """
-    Generate mock flight rebooking options
+    Generate flight rebooking options from the schedule index,
+    or mock options when no schedule is configured.
+    Options violating the constraints are never returned.
     """
-    print(f"[PASSENGERS] Generating {count} options for {origin}->{destination}, tier={tier}")
+    logger.info("Generating %d options for %s->%s, tier=%s, constraints=%s", count, origin, destination, tier, constraints)
+    
+    index = get_flight_index()
+    if index is not None:
+        return search_flight_options(index, origin, destination, tier, count, departure_after, constraints)
     
-    options = []
+    options = OptionSet()
     base_time = datetime.datetime.now() + datetime.timedelta(hours=2)
+    parsed = parse_constraints(constraints, to_epoch_minutes(base_time), destination)
+    cabin_classes = [c for c in TIER_CABIN_CLASSES.get(tier, DEFAULT_CABIN_CLASSES) if CABIN_RANK[c] >= parsed.min_cabin]
+    if not cabin_classes:
+        return options
+    connection_hubs = [h for h in parsed.hubs(HUBS) if h not in [origin, destination]]
     
     for i in range(count):
-        option_id = chr(65 + i)  # A, B, C, D...
-        
         # Determine if direct or connecting
-        is_direct = i < 2 or random.random() < 0.4
+        is_direct = i < 2 or random.random() < 0.4 or not connection_hubs
         
         if is_direct:
             # Direct flight
@@ -31,12 +62,14 @@ def generate_flight_options(origin: str, destination: str, tier: str, count: int
             duration = datetime.timedelta(hours=random.randint(6, 10))
             arrive_time = depart_time + duration
             
-            routing = f"{origin}→{destination} (direct)"
+            stations = [origin, destination]
             stops = 0
             flights = [flight_num]
+            leg_departures = [to_epoch_minutes(depart_time)]
+            hubs, layovers = (), ()
         else:
             # Connecting flight
-            hub = random.choice([h for h in HUBS if h not in [origin, destination]])
+            hub = random.choice(connection_hubs)
             flight1 = f"{random.choice(AIRLINES)}{random.randint(1000, 9999)}"
             flight2 = f"{random.choice(AIRLINES)}{random.randint(1000, 9999)}"
             
@@ -46,42 +79,68 @@ def generate_flight_options(origin: str, destination: str, tier: str, count: int
             leg2_duration = datetime.timedelta(hours=random.randint(3, 6))
             arrive_time = depart_time + leg1_duration + layover + leg2_duration
             
-            routing = f"{origin}→{hub}→{destination}"
+            stations = [origin, hub, destination]
             stops = 1
             flights = [flight1, flight2]
+            leg_departures = [to_epoch_minutes(depart_time), to_epoch_minutes(depart_time + leg1_duration + layover)]
+            hubs, layovers = (hub,), (layover.total_seconds() // 60,)
         
-        # Determine class based on tier
-        if tier == 'Platinum':
-            cabin_class = random.choice(['Business', 'Business', 'First'])
-        elif tier == 'Gold':
-            cabin_class = random.choice(['Premium Economy', 'Business'])
-        else:
-            cabin_class = random.choice(['Economy', 'Premium Economy'])
+        if not parsed.allows(stops, to_epoch_minutes(arrive_time), hubs, layovers):
+            continue
+        
+        # Determine class based on tier and cabin minimum
+        cabin_class = random.choice(cabin_classes)
         
         # Pricing
-        base_cost = 0 if tier in ['Platinum', 'Gold'] else random.randint(0, 300)
+        base_cost = 0 if tier in COMPLIMENTARY_TIERS else random.randint(0, 300)
         
         # Compatibility score
         compatibility = round(random.uniform(0.7, 0.98), 2)
         
-        option = {
-            'optionId': option_id,
-            'routing': routing,
-            'departure': depart_time.strftime('%H:%M'),
-            'arrival': arrive_time.strftime('%H:%M'),
-            'duration': str(arrive_time - depart_time).split('.')[0],
-            'stops': stops,
-            'flights': flights,
-            'class': cabin_class,
-            'cost': base_cost,
-            'availability': 'confirmed',
-            'compatibility': compatibility,
-            'confidence': round(random.uniform(0.8, 0.95), 2)
-        }
-        
-        options.append(option)
+        # Option IDs run A, B, C, D... in generation order
+        options.append(
+            len(options), to_epoch_minutes(depart_time), to_epoch_minutes(arrive_time), stations, flights,
+            cabin_class, base_cost, compatibility, round(random.uniform(0.8, 0.95), 2), leg_departures
+        )
     
     # Sort by compatibility
-    options.sort(key=lambda x: x['compatibility'], reverse=True)
+    options.sort_by_compatibility()
+    
+    return options
+
+
+def search_flight_options(index, origin: str, destination: str, tier: str, count: int = 5,
+                          departure_after: datetime.datetime = None, constraints: list = None) -> OptionSet:
+    """
+    Build rebooking options from scheduled flights with available seats.
+    Constraints prune the search (departure window, hubs) or filter candidates
+    as they are scanned, so only the best `count` itineraries are ever kept.
+    """
+    earliest = to_epoch_minutes(departure_after or datetime.datetime.utcnow())
+    parsed = parse_constraints(constraints, earliest, destination)
+    cabin = parsed.cabin(TIER_CABIN_CLASSES.get(tier, DEFAULT_CABIN_CLASSES))
+    if cabin is None:
+        return OptionSet()
+    # A flight departing after the arrival deadline cannot arrive before it
+    latest = min(earliest + SEARCH_WINDOW_HOURS * 60, parsed.deadline)
+    
+    # Earliest arrival first, then fewest legs
+    itineraries = index.best(origin, destination, earliest, latest, count,
+                             parsed.hubs(HUBS), parsed.predicate(index))
+    
+    options = OptionSet()
+    for i, legs in enumerate(itineraries):
+        options.add_itinerary(index, i, legs, cabin, itinerary_cost(index, legs, tier), earliest)
+    
+    options.sort_by_compatibility()
     
     return options
+
+
+def itinerary_cost(index, legs: tuple, tier: str) -> int:
+    """
+    Fare of a scheduled itinerary for a loyalty tier
+    """
+    if tier in COMPLIMENTARY_TIERS:
+        return 0
+    return int(round(sum(index.fare[leg] for leg in legs)))
@@ -0,0 +1,375 @@
+"""
+In-process language identification and lexicon sentiment for passenger messages.
+Confident cases are answered locally; only ambiguous text goes to Comprehend, with
+the detected language instead of an assumed 'en'.
+"""
+import math
+import re
+from dataclasses import dataclass
+
+# Languages Comprehend DetectSentiment accepts; others are translated to English first
+COMPREHEND_SENTIMENT_LANGUAGES = {'en', 'es', 'fr', 'de', 'it', 'pt', 'ar', 'hi', 'ja', 'ko', 'zh', 'zh-TW'}
+
+# Training text for the character n-gram model: airline service sentences and each
+# language's most frequent words
+LANGUAGE_SAMPLES = {
+    'en': (
+        "My flight was cancelled and nobody told me what to do. I need to get home tonight. "
+        "Can you book me on the next flight to New York? The gate agent said there are no seats left. "
+        "Thank you so much for your help, that works for me. I have been waiting at the airport for hours. "
+        "Where is my luggage? I would like a refund for the ticket. Is there a hotel voucher for the night? "
+        "We are travelling with two children and this is the worst experience we have ever had. "
+        "Please let me know when the new departure time is confirmed. What about my connecting flight? "
+        "The staff were very friendly and the rebooking was quick. I want to speak to a manager now. "
+        "Could you check whether there is a seat in business class? It should have been on time. "
+        "the and you that was for are with his they this have from one had word but not what all were when "
+        "your can said there use each which she how their will other about out many then them these some "
+        "would make like into time has look two more see number could people than first been call who its now "
+        "find long down day did get come made may part please"
+    ),
+    'de': (
+        "Mein Flug wurde gestrichen und niemand hat mir gesagt, was ich tun soll. Ich muss heute Abend nach Hause. "
+        "Können Sie mich auf den nächsten Flug nach Frankfurt buchen? Am Gate gibt es keine freien Plätze mehr. "
+        "Vielen Dank für Ihre Hilfe, das passt mir sehr gut. Ich warte schon seit Stunden am Flughafen. "
+        "Wo ist mein Gepäck? Ich möchte eine Erstattung für das Ticket. Gibt es einen Hotelgutschein für die Nacht? "
+        "Wir reisen mit zwei Kindern und das ist die schlimmste Erfahrung, die wir je hatten. "
+        "Bitte sagen Sie mir, wann die neue Abflugzeit bestätigt ist. Was ist mit meinem Anschlussflug? "
+        "Das Personal war sehr freundlich und die Umbuchung ging schnell. Ich will sofort mit einem "
+        "Vorgesetzten sprechen. "
+        "Könnten Sie prüfen, ob noch ein Platz in der Business Class frei ist? Der Flug sollte pünktlich sein. "
+        "der die und in den von zu das mit sich des auf für ist im dem nicht ein eine als auch es an werden "
+        "aus er hat dass sie nach wird bei einer um am sind noch wie einem über einen so zum war haben nur "
+        "oder aber vor zur bis mehr durch man sein wurde sei bitte"
+    ),
+    'es': (
+        "Mi vuelo fue cancelado y nadie me dijo qué hacer. Necesito llegar a casa esta noche. "
+        "¿Puede reservarme en el próximo vuelo a Madrid? En la puerta dicen que no quedan asientos. "
+        "Muchas gracias por su ayuda, eso me viene muy bien. Llevo horas esperando en el aeropuerto. "
+        "¿Dónde está mi equipaje? Quiero un reembolso del billete. ¿Hay un bono de hotel para la noche? "
+        "Viajamos con dos niños y es la peor experiencia que hemos tenido nunca. "
+        "Por favor avíseme cuando la nueva hora de salida esté confirmada. ¿Qué pasa con mi vuelo de conexión? "
+        "El personal fue muy amable y el cambio de reserva fue rápido. Quiero hablar con un supervisor ahora mismo. "
+        "¿Podría comprobar si hay un asiento en clase business? El vuelo debería haber salido a tiempo. "
+        "de la que el en y a los se del las un por con no una su para es al lo como más pero sus le ya o este "
+        "sí porque esta entre cuando muy sin sobre también me hasta hay donde quien desde todo nos durante "
+        "todos uno les ni contra otros ese eso ante ellos favor"
+    ),
+    'fr': (
+        "Mon vol a été annulé et personne ne m'a dit quoi faire. Je dois rentrer chez moi ce soir. "
+        "Pouvez-vous me réserver sur le prochain vol pour Paris? À la porte on dit qu'il n'y a plus de places. "
+        "Merci beaucoup pour votre aide, cela me convient très bien. J'attends à l'aéroport depuis des heures. "
+        "Où sont mes bagages? Je voudrais un remboursement du billet. Y a-t-il un bon d'hôtel pour la nuit? "
+        "Nous voyageons avec deux enfants et c'est la pire expérience que nous ayons jamais vécue. "
+        "Merci de me prévenir quand la nouvelle heure de départ sera confirmée. Et ma correspondance? "
+        "Le personnel était très aimable et le changement de réservation a été rapide. Je veux parler à un "
+        "responsable. "
+        "Pourriez-vous vérifier s'il reste une place en classe affaires? Le vol aurait dû partir à l'heure. "
+        "de la le et les des en un du une que est pour qui dans par plus pas au sur ne se ce il sont avec ils "
+        "elle mais ou comme nous vous leur aussi tout bien très plaît"
+    ),
+    'it': (
+        "Il mio volo è stato cancellato e nessuno mi ha detto cosa fare. Devo tornare a casa stasera. "
+        "Può prenotarmi sul prossimo volo per Roma? Al gate dicono che non ci sono più posti. "
+        "Grazie mille per il vostro aiuto, per me va benissimo. Aspetto in aeroporto da ore. "
+        "Dov'è il mio bagaglio? Vorrei un rimborso del biglietto. C'è un buono per l'albergo per la notte? "
+        "Viaggiamo con due bambini ed è la peggiore esperienza che abbiamo mai avuto. "
+        "Per favore mi faccia sapere quando il nuovo orario di partenza sarà confermato. E il mio volo di coincidenza? "
+        "Il personale è stato molto gentile e il cambio di prenotazione è stato veloce. Voglio parlare subito "
+        "con un responsabile. "
+        "Potrebbe controllare se c'è un posto in business class? Il volo doveva partire in orario. "
+        "di e il la che in a per un è non una sono del con da si le al lo della mi ma come anche più ci se "
+        "gli io questo ho ha nel tutto molto favore"
+    ),
+    'pt': (
+        "O meu voo foi cancelado e ninguém me disse o que fazer. Preciso de chegar a casa esta noite. "
+        "Pode reservar-me no próximo voo para Lisboa? No portão dizem que não há mais lugares. "
+        "Muito obrigado pela sua ajuda, isso funciona para mim. Estou à espera no aeroporto há horas. "
+        "Onde está a minha bagagem? Quero um reembolso do bilhete. Existe um voucher de hotel para a noite? "
+        "Viajamos com duas crianças e esta é a pior experiência que já tivemos. "
+        "Por favor avise-me quando o novo horário de partida estiver confirmado. E o meu voo de ligação? "
+        "Os funcionários foram muito simpáticos e a remarcação foi rápida. Quero falar com um gerente agora. "
+        "Pode verificar se há um lugar na classe executiva? O voo devia ter saído a horas. Não é possível, "
+        "você não ajudou. "
+        "de a o que e do da em um para é com não uma os no se na por mais as dos como mas foi ao ele das tem "
+        "à seu sua ou ser quando muito há nos já está eu também só pelo pela até isso favor"
+    ),
+    'nl': (
+        "Mijn vlucht is geannuleerd en niemand heeft me verteld wat ik moet doen. Ik moet vanavond naar huis. "
+        "Kunt u mij op de volgende vlucht naar Amsterdam boeken? Bij de gate zeggen ze dat er geen plaatsen meer zijn. "
+        "Heel erg bedankt voor uw hulp, dat past mij goed. Ik wacht al uren op het vliegveld. "
+        "Waar is mijn bagage? Ik wil graag een terugbetaling van het ticket. Is er een hotelvoucher voor de nacht? "
+        "We reizen met twee kinderen en dit is de slechtste ervaring die we ooit hebben gehad. "
+        "Laat me alstublieft weten wanneer de nieuwe vertrektijd bevestigd is. En mijn aansluitende vlucht? "
+        "Het personeel was heel vriendelijk en het omboeken ging snel. Ik wil nu een leidinggevende spreken. "
+        "Kunt u kijken of er nog een plaats in de business class is? De vlucht had op tijd moeten vertrekken. "
+        "de en van ik te dat die in een hij het niet zijn is was op aan met als voor had er maar om hem dan "
+        "zou of wat mijn men dit zo door over ze zich bij ook tot je mij uit der daar haar naar heb hoe heeft "
+        "hebben deze u want nog zal me zij nu ge geen omdat iets worden toch al waren veel meer doen toen "
+        "moet ben zonder kan hun dus alles onder ja eens hier wie werd altijd doch wordt wezen kunnen ons "
+        "zelf tegen na reeds wil kon niets uw iemand geweest andere alstublieft"
+    ),
+}
+
+# Unicode scripts that identify a language on their own
+SCRIPTS = (
+    ('ko', re.compile(r'[가-힯ᄀ-ᇿ]')),
+    ('ja', re.compile(r'[぀-ヿ]')),
+    ('zh', re.compile(r'[一-鿿]')),
+    ('ar', re.compile(r'[؀-ۿ]')),
+    ('hi', re.compile(r'[ऀ-ॿ]')),
+)
+
+WORD = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+
+# Words with a sentiment weight, per language. A negator or intensifier anywhere in the
+# text ("thanks a lot for nothing", "I love how nobody answers") makes it ambiguous, and
+# positive words only count when no negative or ironic cue is present ("great job losing
+# my bag", "fine. whatever."); short texts made only of neutral words are acknowledgements.
+LEXICONS = {
+    'en': {
+        'positive': {'thanks': 2, 'thank': 2, 'great': 2, 'perfect': 2, 'excellent': 2, 'wonderful': 2,
+                     'amazing': 2, 'helpful': 2, 'appreciate': 2, 'love': 2, 'awesome': 2, 'fantastic': 2,
+                     'good': 1, 'nice': 1, 'happy': 1, 'glad': 1, 'friendly': 1, 'quick': 1, 'works': 1, 'fine': 1},
+        'negative': {'terrible': 2, 'horrible': 2, 'awful': 2, 'worst': 2, 'unacceptable': 2, 'ridiculous': 2,
+                     'furious': 2, 'angry': 2, 'disgusting': 2, 'useless': 2, 'hate': 2, 'outrageous': 2,
+                     'incompetent': 2, 'disappointed': 2, 'bad': 1, 'rude': 1, 'upset': 1, 'annoyed': 1,
+                     'frustrated': 1, 'missed': 1, 'lost': 1, 'losing': 1, 'lose': 1, 'stuck': 1, 'poor': 1},
+        'negators': {'not', "don't", "didn't", "isn't", "wasn't", "can't", 'no', 'nothing', "won't", 'never',
+                     'nobody', 'none', 'nowhere', 'cannot', "doesn't", "aren't", "haven't", "couldn't"},
+        'intensifiers': {'so', 'very', 'really', 'too', 'lot', 'totally', 'absolutely', 'completely', 'extremely',
+                         'oh', 'such', 'sooo'},
+        'irony': {'again', 'another', 'yet', 'just', 'always', 'whatever', 'job', 'cancelled', 'delayed',
+                  'waiting', 'hours'},
+        'neutral': {'ok', 'okay', 'k', 'yes', 'no', 'sure', 'alright', 'understood', 'noted', 'got', 'it'},
+    },
+    'de': {
+        'positive': {'danke': 2, 'dank': 2, 'toll': 2, 'perfekt': 2, 'super': 2, 'ausgezeichnet': 2, 'wunderbar': 2,
+                     'hilfreich': 2, 'prima': 2, 'gut': 1, 'schön': 1, 'freundlich': 1, 'schnell': 1, 'froh': 1},
+        'negative': {'schrecklich': 2, 'furchtbar': 2, 'schlimmste': 2, 'inakzeptabel': 2, 'unverschämt': 2,
+                     'wütend': 2, 'katastrophe': 2, 'lächerlich': 2, 'enttäuscht': 2, 'schlecht': 1,
+                     'unfreundlich': 1, 'verärgert': 1, 'verpasst': 1, 'verloren': 1},
+        'negators': {'nicht', 'kein', 'keine', 'nie', 'niemand', 'nichts'},
+        'intensifiers': {'sehr', 'so', 'echt', 'wirklich', 'total', 'absolut', 'völlig', 'ach'},
+        'irony': {'wieder', 'schon', 'noch', 'immer', 'gestrichen', 'verspätet', 'stunden'},
+        'neutral': {'ok', 'okay', 'ja', 'nein', 'gut', 'verstanden', 'alles', 'klar', 'einverstanden'},
+    },
+    'es': {
+        'positive': {'gracias': 2, 'genial': 2, 'perfecto': 2, 'excelente': 2, 'maravilloso': 2, 'estupendo': 2,
+                     'encantado': 2, 'bien': 1, 'bueno': 1, 'amable': 1, 'rápido': 1, 'contento': 1},
+        'negative': {'terrible': 2, 'horrible': 2, 'peor': 2, 'inaceptable': 2, 'vergüenza': 2, 'furioso': 2,
+                     'ridículo': 2, 'indignante': 2, 'decepcionado': 2, 'malo': 1, 'mal': 1, 'enfadado': 1,
+                     'perdí': 1, 'perdido': 1},
+        'negators': {'no', 'nunca', 'nadie', 'nada', 'ni'},
+        'intensifiers': {'muy', 'tan', 'realmente', 'totalmente', 'absolutamente', 'demasiado', 'súper'},
+        'irony': {'otra', 'otro', 'vez', 'claro', 'siempre', 'cancelado', 'retrasado', 'horas'},
+        'neutral': {'ok', 'vale', 'sí', 'si', 'no', 'de', 'acuerdo', 'entendido'},
+    },
+    'fr': {
+        'positive': {'merci': 2, 'parfait': 2, 'excellent': 2, 'génial': 2, 'formidable': 2, 'super': 2,
+                     'merveilleux': 2, 'bien': 1, 'bon': 1, 'aimable': 1, 'rapide': 1, 'content': 1},
+        'negative': {'terrible': 2, 'horrible': 2, 'pire': 2, 'inacceptable': 2, 'honte': 2, 'furieux': 2,
+                     'ridicule': 2, 'scandaleux': 2, 'déçu': 2, 'nul': 2, 'mauvais': 1, 'énervé': 1, 'raté': 1,
+                     'perdu': 1},
+        'negators': {'pas', 'jamais', 'personne', 'rien', 'ne', "n'"},
+        'intensifiers': {'très', 'tellement', 'vraiment', 'totalement', 'absolument', 'trop'},
+        'irony': {'encore', 'évidemment', 'toujours', 'annulé', 'retardé', 'heures'},
+        'neutral': {'ok', "d'accord", 'oui', 'non', 'compris', 'entendu'},
+    },
+    'it': {
+        'positive': {'grazie': 2, 'perfetto': 2, 'ottimo': 2, 'fantastico': 2, 'eccellente': 2, 'gentilissimi': 2,
+                     'bene': 1, 'buono': 1, 'gentile': 1, 'veloce': 1, 'contento': 1, 'benissimo': 2},
+        'negative': {'terribile': 2, 'orribile': 2, 'peggiore': 2, 'inaccettabile': 2, 'vergogna': 2,
+                     'furioso': 2, 'ridicolo': 2, 'deluso': 2, 'pessimo': 2, 'male': 1, 'arrabbiato': 1,
+                     'perso': 1},
+        'negators': {'non', 'mai', 'nessuno', 'niente', 'né'},
+        'intensifiers': {'molto', 'così', 'davvero', 'proprio', 'totalmente', 'assolutamente', 'troppo'},
+        'irony': {'ancora', 'altro', 'altra', 'certo', 'sempre', 'cancellato', 'ritardo', 'ore'},
+        'neutral': {'ok', 'va', 'bene', 'sì', 'si', 'no', 'capito', "d'accordo"},
+    },
+    'pt': {
+        'positive': {'obrigado': 2, 'obrigada': 2, 'perfeito': 2, 'excelente': 2, 'ótimo': 2, 'maravilhoso': 2,
+                     'fantástico': 2, 'bom': 1, 'bem': 1, 'simpático': 1, 'rápido': 1, 'contente': 1},
+        'negative': {'terrível': 2, 'horrível': 2, 'pior': 2, 'inaceitável': 2, 'vergonha': 2, 'furioso': 2,
+                     'ridículo': 2, 'decepcionado': 2, 'péssimo': 2, 'mau': 1, 'irritado': 1, 'perdi': 1,
+                     'perdido': 1},
+        'negators': {'não', 'nunca', 'ninguém', 'nada', 'nem'},
+        'intensifiers': {'muito', 'tão', 'realmente', 'totalmente', 'absolutamente', 'demais'},
+        'irony': {'outra', 'outro', 'vez', 'claro', 'sempre', 'cancelado', 'atrasado', 'horas'},
+        'neutral': {'ok', 'sim', 'não', 'certo', 'entendido', 'combinado'},
+    },
+    'nl': {
+        'positive': {'bedankt': 2, 'dank': 2, 'perfect': 2, 'geweldig': 2, 'uitstekend': 2, 'fantastisch': 2,
+                     'super': 2, 'goed': 1, 'fijn': 1, 'vriendelijk': 1, 'snel': 1, 'blij': 1},
+        'negative': {'verschrikkelijk': 2, 'vreselijk': 2, 'slechtste': 2, 'onacceptabel': 2, 'schandalig': 2,
+                     'woedend': 2, 'belachelijk': 2, 'teleurgesteld': 2, 'slecht': 1, 'boos': 1, 'gemist': 1,
+                     'kwijt': 1},
+        'negators': {'niet', 'geen', 'nooit', 'niemand', 'niets'},
+        'intensifiers': {'heel', 'zo', 'erg', 'echt', 'totaal', 'absoluut', 'enorm'},
+        'irony': {'alweer', 'weer', 'nog', 'altijd', 'tuurlijk', 'geannuleerd', 'vertraagd', 'uren'},
+        'neutral': {'ok', 'oké', 'ja', 'nee', 'prima', 'begrepen'},
+    },
+}
+
+# Summed word weight needed to decide without Comprehend. Text with words of both
+# polarities ("thanks, but this is terrible") is always left to Comprehend.
+MIN_SENTIMENT_WEIGHT = 2
+
+# Punctuation that makes positive words read as ironic: ellipses, scare quotes, /s
+IRONY_MARKS = re.compile(r'\.\.\.|…|["“”«»]|/s\b')
+
+# Added once for '!' in text that is already negative
+EXCLAMATION_WEIGHT = 1
+
+
+@dataclass(slots=True)
+class Preclassification:
+    language: str
+    language_confidence: float
+    sentiment: dict = None
+
+    @property
+    def comprehend_language(self) -> str:
+        return comprehend_language(self.language)
+
+
+def comprehend_language(language: str) -> str:
+    """
+    LanguageCode to send Comprehend for a language ('pt-BR' -> 'pt'), or None when
+    Comprehend does not analyze it and the text must be translated first
+    """
+    if language in COMPREHEND_SENTIMENT_LANGUAGES:
+        return language
+    base = language.split('-')[0] if language else None
+    return base if base in COMPREHEND_SENTIMENT_LANGUAGES else None
+
+
+class LanguageIdentifier:
+    """
+    Naive Bayes over character 1-3 grams of space-padded words, trained on
+    LANGUAGE_SAMPLES. Non-Latin scripts are recognized by their characters alone.
+    """
+
+    def __init__(self, samples: dict = None, order: int = 3):
+        self.order = order
+        self._log_probs = {}
+        self._unseen = {}
+        vocabulary = set()
+        counts = {}
+        for language, text in (samples or LANGUAGE_SAMPLES).items():
+            grams = {}
+            for gram in self._grams(text):
+                grams[gram] = grams.get(gram, 0) + 1
+            counts[language] = grams
+            vocabulary.update(grams)
+        for language, grams in counts.items():
+            total = sum(grams.values()) + len(vocabulary)
+            self._log_probs[language] = {gram: math.log((count + 1) / total) for gram, count in grams.items()}
+            self._unseen[language] = math.log(1 / total)
+
+    def _grams(self, text: str):
+        for word in WORD.findall(text.lower()):
+            padded = f" {word} "
+            for n in range(1, self.order + 1):
+                for i in range(len(padded) - n + 1):
+                    yield padded[i:i + n]
+
+    def identify(self, text: str) -> tuple:
+        """
+        (language, confidence 0-1); (None, 0.0) when there is nothing to go on
+        """
+        for language, pattern in SCRIPTS:
+            if pattern.search(text):
+                return language, 1.0
+        grams = list(self._grams(text))
+        if not grams:
+            return None, 0.0
+        scores = {
+            language: sum(log_probs.get(gram, self._unseen[language]) for gram in grams)
+            for language, log_probs in self._log_probs.items()
+        }
+        # Each character is counted in up to `order` overlapping grams; scaling by it
+        # keeps the correlated evidence from making every guess look certain
+        best = max(scores, key=scores.get)
+        top = scores[best]
+        weights = {language: math.exp((score - top) / self.order) for language, score in scores.items()}
+        return best, weights[best] / sum(weights.values())
+
+
+def lexicon_sentiment(text: str, language: str) -> dict:
+    """
+    Sentiment from the language's lexicon when it is clear-cut, else None: negation or
+    emphasis anywhere, mixed polarity and positive text with any ironic cue go to Comprehend.
+    Short acknowledgements ("ok", "merci") are decided from their words alone.
+    """
+    lexicon = LEXICONS.get(language) or LEXICONS.get(language.split('-')[0])
+    if lexicon is None:
+        return None
+    words = WORD.findall(text.lower())
+    if not words:
+        return None
+    if len(words) <= 3 and all(word in lexicon['neutral'] for word in words):
+        # Acknowledgements, including ones built from positive words ("va bene", "alles gut")
+        return _scores('NEUTRAL', 2)
+    if not lexicon['negators'].isdisjoint(words) or not lexicon['intensifiers'].isdisjoint(words):
+        # A negator or intensifier can flip or sharpen any word of the sentence, wherever it is
+        return None
+
+    positive = sum(lexicon['positive'].get(word, 0) for word in words)
+    negative = sum(lexicon['negative'].get(word, 0) for word in words)
+    if negative and '!' in text:
+        negative += EXCLAMATION_WEIGHT
+    if positive and negative:
+        return None
+    if positive and (IRONY_MARKS.search(text) or not lexicon['irony'].isdisjoint(words)):
+        # "Great, cancelled again", "Fine. Whatever.": positive words with a negative cue may be sarcastic
+        return None
+    if positive >= MIN_SENTIMENT_WEIGHT or (positive and len(words) <= 3):
+        return _scores('POSITIVE', positive)
+    if negative >= MIN_SENTIMENT_WEIGHT:
+        return _scores('NEGATIVE', negative)
+    return None
+
+
+def lexicon_language(text: str) -> str:
+    """
+    The language whose lexicon knows the most words of text, or None without a single winner
+    """
+    words = set(WORD.findall(text.lower()))
+    matches = sorted((
+        (len(words & (lexicon['positive'].keys() | lexicon['negative'].keys() | lexicon['neutral'])), language)
+        for language, lexicon in LEXICONS.items()
+    ), reverse=True)
+    (best, language), (second, _) = matches[0], matches[1]
+    return language if best > second else None
+
+
+def _scores(sentiment: str, weight: float) -> dict:
+    """
+    Comprehend-shaped scores for a local decision; stronger evidence, higher score
+    """
+    strength = 0.6 + 0.1 * min(weight, 3.5)
+    rest = round((1 - strength) / 3, 4)
+    scores = {'positive': rest, 'negative': rest, 'neutral': rest, 'mixed': rest}
+    scores[sentiment.lower()] = round(strength, 4)
+    return {'sentiment': sentiment, 'scores': scores}
+
+
+_identifier = None
+
+
+def get_identifier() -> LanguageIdentifier:
+    global _identifier
+    if _identifier is None:
+        _identifier = LanguageIdentifier()
+    return _identifier
+
+
+def preclassify(text: str, min_language_confidence: float = 0.8, default_language: str = 'en') -> Preclassification:
+    """
+    Language of text (default_language when unsure) and its sentiment when the lexicon is confident
+    """
+    language, confidence = get_identifier().identify(text)
+    if language is None or confidence < min_language_confidence:
+        # Too short to tell from characters ("Gracias"); a word only one lexicon knows decides it
+        language = lexicon_language(text) or default_language
+    return Preclassification(language, round(confidence, 3), lexicon_sentiment(text, language))
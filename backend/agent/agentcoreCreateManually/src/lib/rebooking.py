@@ -0,0 +1,170 @@
+"""
+Bulk rebooking of a disrupted flight manifest against shared seat inventory
+"""
+import datetime
+
+from lib.booking import BookingError
+from lib.constraints import UNCONSTRAINED, parse_constraints
+from lib.inventory import to_epoch_minutes
+from lib.log import get_logger
+from lib.passengers import (
+    HUBS, SEARCH_WINDOW_HOURS, TIER_CABIN_CLASSES, DEFAULT_CABIN_CLASSES, COMPLIMENTARY_TIERS,
+    TIER_PRIORITY, DEFAULT_TIER_PRIORITY, itinerary_cost
+)
+from lib.options import OptionSet
+
+try:
+    import numpy as np
+except ImportError:  # pure-Python scoring fallback
+    np = None
+
+logger = get_logger('rebooking')
+
+
+def rebook_manifest(index, origin: str, destination: str, passengers: list, constraints: list = None,
+                    departure_after: datetime.datetime = None, engine=None) -> dict:
+    """
+    Allocate seats on candidate itineraries for every passenger in one pass.
+
+    Passengers are served in tier priority order (Platinum, Gold, others; manifest
+    order within a tier). Each takes their best-scoring compatible itinerary that
+    still has a seat on every leg; seats are shared across itineraries using the same flight.
+    A passenger whose tier offers no cabin meeting their min_cabin_* constraint is not placed.
+
+    With a BookingEngine, seat counts come from its inventory and every assignment
+    holds its seats there (hold_id in the assignment), so confirm_booking can honour it.
+    Without one, seats are only counted against the schedule.
+    """
+    logger.info("Bulk rebooking %d passengers %s->%s", len(passengers), origin, destination)
+
+    earliest = to_epoch_minutes(departure_after or datetime.datetime.utcnow())
+    # Manifest-wide constraints prune the candidate search itself. Every itinerary in
+    # the window is a candidate: any cap on their number also caps the seats to share out.
+    shared = parse_constraints(constraints, earliest, destination)
+    latest = min(earliest + SEARCH_WINDOW_HOURS * 60, shared.deadline)
+    itineraries = index.best(origin, destination, earliest, latest, None,
+                             shared.hubs(HUBS), shared.predicate(index))
+
+    options = OptionSet()
+    cabin = DEFAULT_CABIN_CLASSES[0]
+    for i, legs in enumerate(itineraries):
+        options.add_itinerary(index, i, legs, cabin, itinerary_cost(index, legs, None), earliest)
+
+    parsed = [parse_constraints((constraints or []) + (p.get('constraints') or []), earliest, destination)
+              for p in passengers]
+    profiles = [(c.deadline, c.max_stops) for c in parsed]
+    rankings = _rank_options(index, itineraries, options, profiles)
+    rankings = [_filter_ranking(index, itineraries, ranked, c) for ranked, c in zip(rankings, parsed)]
+
+    remaining = {}
+    for o, legs in enumerate(itineraries):
+        instances = options.flight_instances(o) if engine is not None else legs
+        for leg, instance in zip(legs, instances):
+            if leg not in remaining:
+                remaining[leg] = engine.available(instance) if engine is not None else index.seats[leg]
+
+    order = sorted(range(len(passengers)),
+                   key=lambda p: (TIER_PRIORITY.get(passengers[p].get('tier'), DEFAULT_TIER_PRIORITY), p))
+
+    assignments, unplaced = [], []
+    for p in order:
+        passenger = passengers[p]
+        passenger_id = passenger.get('passenger_id')
+        tier = passenger.get('tier')
+        cabin = parsed[p].cabin(TIER_CABIN_CLASSES.get(tier, DEFAULT_CABIN_CLASSES))
+        if cabin is None:
+            unplaced.append({'passenger_id': passenger_id, 'tier': tier,
+                             'reason': 'No cabin offered to this tier meets the cabin minimum'})
+            continue
+        ranked = rankings[p]
+        if not ranked:
+            unplaced.append({'passenger_id': passenger_id, 'tier': tier,
+                             'reason': 'No itinerary satisfies constraints'})
+            continue
+
+        for o in ranked:
+            legs = itineraries[o]
+            if not all(remaining[leg] > 0 for leg in legs):
+                continue
+            flights = options.flight_instances(o)
+            assignment = {
+                'passenger_id': passenger_id,
+                'tier': tier,
+                'optionId': options.option_id(o),
+                'flights': flights,
+                'class': cabin,
+                'cost': 0 if tier in COMPLIMENTARY_TIERS else options.cost[o]
+            }
+            if engine is not None:
+                try:
+                    hold = engine.hold(passenger_id, flights)
+                except BookingError as e:
+                    # A leg sold out elsewhere since the counts were read, or the hold lost to contention
+                    if e.code == 'SOLD_OUT':
+                        for leg, instance in zip(legs, flights):
+                            if instance in e.flights:
+                                remaining[leg] = 0
+                    continue
+                assignment['hold_id'] = hold['hold_id']
+                assignment['hold_expires_at'] = hold['expires_at']
+            for leg in legs:
+                remaining[leg] -= 1
+            assignments.append(assignment)
+            break
+        else:
+            unplaced.append({'passenger_id': passenger_id, 'tier': tier,
+                             'reason': 'No seats left on compatible itineraries'})
+
+    logger.info("Placed %d, unplaced %d", len(assignments), len(unplaced))
+
+    return {
+        'options': options,
+        'assignments': assignments,
+        'unplaced': unplaced,
+        'ignored_constraints': list(dict.fromkeys(token for c in parsed for token in c.ignored))
+    }
+
+
+def _filter_ranking(index, itineraries, ranked, constraints) -> list:
+    """
+    Drop ranked options through avoided hubs or over the layover limit
+    """
+    if not constraints.avoid_hubs and constraints.max_layover == UNCONSTRAINED:
+        return ranked
+    accept = constraints.predicate(index)
+    return [o for o in ranked if accept(itineraries[o])]
+
+
+def _rank_options(index, itineraries, options, profiles) -> list:
+    """
+    Per passenger, compatible option indices from best to worst score
+    """
+    if not itineraries:
+        return [[] for _ in profiles]
+
+    arrivals = [index.arrival[legs[-1]] for legs in itineraries]
+    stops = [len(legs) - 1 for legs in itineraries]
+    base = [score / 100 for score in options.compatibility]
+
+    if np is not None:
+        # passenger x option compatibility matrix, infeasible pairs masked out
+        deadline = np.array([profile[0] for profile in profiles], dtype=float)[:, None]
+        max_stops = np.array([profile[1] for profile in profiles], dtype=float)[:, None]
+        feasible = (np.array(arrivals)[None, :] <= deadline) & (np.array(stops)[None, :] <= max_stops)
+        scores = np.where(feasible, np.array(base)[None, :], -np.inf)
+        order = np.argsort(-scores, axis=1, kind='stable')
+        counts = feasible.sum(axis=1)
+        return [order[p, :counts[p]].tolist() for p in range(len(profiles))]
+
+    # Passengers sharing a constraint profile share one ranking
+    by_score = sorted(range(len(options)), key=lambda o: -base[o])
+    cache = {}
+    rankings = []
+    for profile in profiles:
+        ranked = cache.get(profile)
+        if ranked is None:
+            deadline, limit = profile
+            ranked = [o for o in by_score if arrivals[o] <= deadline and stops[o] <= limit]
+            cache[profile] = ranked
+        rankings.append(ranked)
+    return rankings
@@ -0,0 +1,87 @@
+"""
+Per-request context shared by logging and metrics
+"""
+import contextvars
+import time
+
+request_id = contextvars.ContextVar('request_id', default=None)
+
+# time.monotonic() by which the caller needs an answer, or None for no deadline
+deadline = contextvars.ContextVar('deadline', default=None)
+
+# Conversation session state (lib.sessions.SessionState) of the current invocation, if any
+session = contextvars.ContextVar('session', default=None)
+
+# True while a single-flight leader runs: its one backend request answers several
+# callers, so lib.resilience never duplicates it with a hedge
+coalesced = contextvars.ContextVar('coalesced', default=False)
+
+
+def start_request(event: dict = None, context=None) -> str:
+    """
+    Bind the request ID for the current invocation: the caller's requestId
+    if it sent one (the API proxy does), else the runtime's, else a new UUID
+    """
+    value = (event or {}).get('requestId') or getattr(context, 'aws_request_id', None)
+    if not value:
+        import uuid  # rarely needed; keeps it off the import path
+        value = str(uuid.uuid4())
+    request_id.set(value)
+    deadline.set(_request_deadline(event or {}, context))
+    return value
+
+
+def _request_deadline(event: dict, context):
+    """
+    The caller's budget (timeoutSeconds, forwarded by the API proxy) or the
+    runtime's remaining time, whichever ends first, less a margin for the response
+    """
+    budgets = []
+    if event.get('timeoutSeconds') is not None:
+        budgets.append(float(event['timeoutSeconds']))
+    remaining_ms = getattr(context, 'get_remaining_time_in_millis', None)
+    if callable(remaining_ms):
+        budgets.append(remaining_ms() / 1000)
+    if not budgets:
+        return None
+    from config import DEADLINE_MARGIN_SECONDS
+    return time.monotonic() + min(budgets) - DEADLINE_MARGIN_SECONDS
+
+
+def set_deadline(seconds: float):
+    """
+    Narrow the current deadline to at most seconds from now; returns the new deadline
+    """
+    value = time.monotonic() + seconds
+    current = deadline.get()
+    if current is not None and current < value:
+        value = current
+    deadline.set(value)
+    return value
+
+
+def remaining_seconds():
+    """
+    Seconds left before the current deadline (negative once past it), or None without one
+    """
+    value = deadline.get()
+    return None if value is None else value - time.monotonic()
+
+
+def current_request_id():
+    return request_id.get()
+
+
+def current_session():
+    return session.get()
+
+
+def run_with_context(func):
+    """
+    Wrap a callable so it runs in a copy of the caller's context (request ID)
+    when handed to a thread pool
+    """
+    context = contextvars.copy_context()
+    # A context can only be entered by one thread at a time; each call gets its own
+    # copy so the wrapper can be mapped over a pool
+    return lambda *args, **kwargs: context.copy().run(func, *args, **kwargs)
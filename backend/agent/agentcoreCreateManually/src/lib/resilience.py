@@ -0,0 +1,340 @@
+"""
+Resilience for AWS dependency calls: circuit breakers, hedged requests and request deadlines.
+Tools keep their own fallbacks; a call that fails fast here simply reaches them sooner.
+"""
+import collections
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from lib import metrics
+from lib.clients import MAX_POOL_CONNECTIONS, get_client
+from lib.log import get_logger
+from lib.request_context import coalesced, remaining_seconds, run_with_context
+
+logger = get_logger('resilience')
+
+# Errors caused by the request itself rather than the service; they never trip a circuit
+CLIENT_ERROR_CODES = {
+    'ValidationException', 'InvalidRequestException', 'TextSizeLimitExceededException',
+    'UnsupportedLanguagePairException', 'DetectedLanguageLowConfidenceException',
+    'UnsupportedLanguageException', 'AccessDeniedException', 'ResourceNotFoundException',
+}
+
+# Recent latencies kept per service for the hedge threshold, and how often it is recomputed
+LATENCY_WINDOW = 256
+THRESHOLD_REFRESH = 16
+MIN_LATENCY_SAMPLES = 20
+
+# Hedge tokens a quiet service can bank; bounds a burst of hedges after a lull
+MAX_HEDGE_TOKENS = 10
+
+# Services never hedged whatever HEDGE_PERCENTILES says: each request is a billed model
+# invocation, and a duplicate doubles the cost of exactly the slowest (largest) answers
+NEVER_HEDGED = {'bedrock-agent-runtime', 'bedrock-runtime'}
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    The service's circuit is open; the call was not attempted
+    """
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    The caller's deadline passed before the service answered
+    """
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed: calls pass. After failure_threshold consecutive failures it opens and
+    calls are rejected without reaching the service. reset_seconds later it goes
+    half-open and lets one probe through: success closes it, failure reopens it.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_seconds:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """
+        Whether a call may go to the service now
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self.reset_seconds:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("Circuit %s closed", self.name)
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or (self._state == self.CLOSED and self._failures >= self.failure_threshold):
+                logger.warning("Circuit %s opened after %d consecutive failures", self.name, self._failures)
+                metrics.increment(f"resilience.{self.name}.opened")
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._probing = False
+
+
+class LatencyTracker:
+    """
+    Percentile of a service's recent successful call latencies, refreshed every few samples
+    """
+
+    def __init__(self, quantile: float, window: int = LATENCY_WINDOW):
+        self.quantile = quantile
+        self._samples = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._since_refresh = 0
+        self.threshold = None
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self._since_refresh += 1
+            if self._since_refresh < THRESHOLD_REFRESH or len(self._samples) < MIN_LATENCY_SAMPLES:
+                return
+            self._since_refresh = 0
+            ordered = sorted(self._samples)
+        self.threshold = ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
+
+
+class Dependency:
+    """
+    Guarded calls to one service.
+
+    A call is rejected outright while the circuit is open or once the request
+    deadline has passed. Otherwise it runs on a shared worker pool; the caller
+    waits at most until the deadline, and when the call is slower than the
+    service's hedge percentile a second identical request is sent and whichever
+    answers first wins. Calls made by a single-flight leader are never hedged.
+    Abandoned attempts finish in the background (threads cannot be cancelled)
+    and are bounded by the client's own timeouts.
+
+    Running out of the caller's deadline says nothing about the service, so it
+    does not count against the circuit; the abandoned attempt's own outcome does,
+    once it finishes.
+    """
+
+    def __init__(self, name: str, breaker: CircuitBreaker = None, hedge_quantile: float = None,
+                 hedge_max_ratio: float = 0.1, executor: ThreadPoolExecutor = None):
+        self.name = name
+        self.breaker = breaker
+        self.latency = LatencyTracker(hedge_quantile) if hedge_quantile else None
+        self.hedge_max_ratio = hedge_max_ratio
+        self._executor = executor
+        self._lock = threading.Lock()
+        self._hedge_tokens = 1.0
+
+    def call(self, func, *args, **kwargs):
+        remaining = remaining_seconds()
+        if remaining is not None and remaining <= 0:
+            metrics.increment(f"resilience.{self.name}.deadline_exceeded")
+            raise DeadlineExceeded(f"No time left to call {self.name}")
+
+        if self.breaker is not None and not self.breaker.allow():
+            metrics.increment(f"resilience.{self.name}.short_circuited")
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+
+        hedge_after = None if coalesced.get() else self._hedge_delay()
+        try:
+            if remaining is None and hedge_after is None:
+                # Nothing to enforce: call inline without a thread hop
+                result = self._attempt(func, args, kwargs)
+            else:
+                result = self._guarded(func, args, kwargs, remaining, hedge_after)
+        except DeadlineExceeded:
+            # Recorded by _guarded's callback when the abandoned attempt completes
+            raise
+        except Exception as e:
+            self._record(not is_service_failure(e))
+            raise
+        self._record(True)
+        return result
+
+    def _guarded(self, func, args, kwargs, remaining, hedge_after):
+        start = time.monotonic()
+        deadline = None if remaining is None else start + remaining
+        attempt = run_with_context(self._attempt)
+        executor = self._executor or _shared_executor()
+        first = executor.submit(attempt, func, args, kwargs)
+        pending, error = {first}, None
+
+        while pending:
+            now = time.monotonic()
+            timeout = None if deadline is None else deadline - now
+            if hedge_after is not None:
+                until_hedge = max(0.0, start + hedge_after - now)
+                timeout = until_hedge if timeout is None else min(timeout, until_hedge)
+
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not first:
+                        metrics.increment(f"resilience.{self.name}.hedge_won")
+                    return future.result()
+                error = future.exception()
+            if not pending:
+                break
+
+            if hedge_after is not None and time.monotonic() >= start + hedge_after:
+                hedge_after = None
+                if self._take_hedge_token():
+                    metrics.increment(f"resilience.{self.name}.hedged")
+                    pending.add(executor.submit(attempt, func, args, kwargs))
+                continue
+
+            if deadline is not None and time.monotonic() >= deadline:
+                metrics.increment(f"resilience.{self.name}.deadline_exceeded")
+                # The service is judged on the first attempt's eventual outcome; this also
+                # settles a half-open probe so the circuit cannot stay stuck waiting on it
+                first.add_done_callback(self._record_outcome)
+                raise DeadlineExceeded(f"{self.name} did not answer within {remaining:.2f}s")
+
+        raise error
+
+    def _attempt(self, func, args, kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        if self.latency is not None:
+            self.latency.record(time.perf_counter() - start)
+        return result
+
+    def _hedge_delay(self):
+        if self.latency is None:
+            return None
+        with self._lock:
+            self._hedge_tokens = min(MAX_HEDGE_TOKENS, self._hedge_tokens + self.hedge_max_ratio)
+        return self.latency.threshold
+
+    def _take_hedge_token(self) -> bool:
+        with self._lock:
+            if self._hedge_tokens < 1:
+                return False
+            self._hedge_tokens -= 1
+            return True
+
+    def _record_outcome(self, future):
+        error = future.exception()
+        self._record(error is None or not is_service_failure(error))
+
+    def _record(self, success: bool):
+        if self.breaker is None:
+            return
+        if success:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+
+def is_service_failure(error: Exception) -> bool:
+    """
+    Whether an error says the service is unhealthy (throttling, 5xx, timeouts),
+    as opposed to a rejected request
+    """
+    code = (getattr(error, 'response', None) or {}).get('Error', {}).get('Code')
+    return code not in CLIENT_ERROR_CODES
+
+
+_dependencies = {}
+_executor = None
+_lock = threading.Lock()
+
+
+def _shared_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                # One thread per pooled connection, so hedges never queue behind each other
+                _executor = ThreadPoolExecutor(max_workers=MAX_POOL_CONNECTIONS, thread_name_prefix='aws')
+    return _executor
+
+
+def get_dependency(service: str) -> Dependency:
+    """
+    The shared guard for a service, configured from the settings on first use
+    """
+    dependency = _dependencies.get(service)
+    if dependency is None:
+        with _lock:
+            dependency = _dependencies.get(service)
+            if dependency is None:
+                dependency = _dependencies[service] = _create_dependency(service)
+    return dependency
+
+
+def _create_dependency(service: str) -> Dependency:
+    from config import USE_CIRCUIT_BREAKERS, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS
+    from config import USE_HEDGED_REQUESTS, HEDGE_PERCENTILES, HEDGE_MAX_RATIO
+
+    breaker = CircuitBreaker(service, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS) if USE_CIRCUIT_BREAKERS else None
+    percentile = HEDGE_PERCENTILES.get(service) if USE_HEDGED_REQUESTS and service not in NEVER_HEDGED else None
+    return Dependency(service, breaker, percentile / 100 if percentile else None, HEDGE_MAX_RATIO)
+
+
+def set_dependency(service: str, dependency: Dependency):
+    """
+    Replace the guard for a service (benchmarks, tests)
+    """
+    with _lock:
+        _dependencies[service] = dependency
+
+
+def reset_dependencies():
+    """
+    Forget circuit state and latency history (benchmarks, tests)
+    """
+    with _lock:
+        _dependencies.clear()
+
+
+def call_service(service: str, operation: str, **params):
+    """
+    Call a client operation through the service's guard, e.g.
+    call_service('comprehend', 'detect_sentiment', Text=text, LanguageCode='en')
+    """
+    return get_dependency(service).call(getattr(get_client(service), operation), **params)
+
+
+def circuit_states() -> dict:
+    """
+    Circuit state per service called so far
+    """
+    with _lock:
+        dependencies = list(_dependencies.items())
+    return {name: dependency.breaker.state for name, dependency in dependencies if dependency.breaker is not None}
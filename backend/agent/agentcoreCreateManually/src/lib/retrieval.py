@@ -0,0 +1,252 @@
+"""
+Local BM25 retrieval over the policy markdown documents.
+Answers confident policy questions in-process; low-confidence queries go to Bedrock.
+"""
+import math
+import os
+import re
+import threading
+from lib.cache import content_tokens, policy_namespace
+from lib.codec import get_codec
+from lib.log import get_logger
+
+logger = get_logger('retrieval')
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Heading tokens count this many times towards a chunk's term frequencies
+HEADING_WEIGHT = 2
+
+MAX_PASSAGE_CHARS = 600
+
+# Attributes a saved index holds; it is plain JSON, so loading one never runs code
+SAVED_FIELDS = ('chunks', 'fingerprint', 'postings', 'lengths', 'avg_length', 'idf', 'max_idf')
+
+HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+MARKUP_PATTERN = re.compile(r'\*\*|__|`')
+
+
+def chunk_markdown(text: str, path: str) -> list:
+    """
+    Split a markdown document into one chunk per heading section.
+    Each chunk carries its heading path, e.g. "FAQ > For Passengers > Q: ...".
+    """
+    chunks = []
+    headings = []
+    lines = []
+
+    def flush():
+        body = '\n'.join(lines).strip()
+        if body:
+            chunks.append({'path': path, 'heading': ' > '.join(h for _, h in headings), 'text': body})
+        lines.clear()
+
+    for line in text.splitlines():
+        match = HEADING_PATTERN.match(line)
+        if match:
+            flush()
+            level = len(match.group(1))
+            while headings and headings[-1][0] >= level:
+                headings.pop()
+            headings.append((level, MARKUP_PATTERN.sub('', match.group(2))))
+        elif line.strip() and not set(line.strip()) <= set('|-: '):
+            # Table separator rows carry no text
+            lines.append(MARKUP_PATTERN.sub('', line.rstrip()))
+    flush()
+    return chunks
+
+
+class LocalIndex:
+    """
+    Inverted BM25 index over heading-level chunks of the policy documents
+    """
+
+    def __init__(self, chunks: list, fingerprint: str = None):
+        self.chunks = chunks
+        self.fingerprint = fingerprint
+        self.postings = {}
+        self.lengths = []
+
+        for chunk_id, chunk in enumerate(chunks):
+            terms = content_tokens(chunk['text']) + content_tokens(chunk['heading']) * HEADING_WEIGHT
+            self.lengths.append(len(terms))
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((chunk_id, tf))
+
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        n = len(chunks)
+        self.idf = {term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for term, p in self.postings.items()}
+        # IDF of a term that appears nowhere; unknown query terms lower confidence
+        self.max_idf = math.log(1 + (n + 0.5) / 0.5)
+
+    @classmethod
+    def build(cls, docs_dir: str):
+        """
+        Index every .md file in a directory
+        """
+        chunks = []
+        for name in sorted(os.listdir(docs_dir)):
+            if name.endswith('.md'):
+                with open(os.path.join(docs_dir, name), encoding='utf-8') as f:
+                    chunks.extend(chunk_markdown(f.read(), name))
+        return cls(chunks, policy_namespace('local', docs_dir))
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Load an index saved with save()
+        """
+        with open(path, 'rb') as f:
+            saved = get_codec().loads(f.read())
+        missing = [name for name in SAVED_FIELDS if name not in saved]
+        if missing:
+            raise ValueError(f"Not a saved policy index, missing {', '.join(missing)}")
+        index = cls.__new__(cls)
+        for name in SAVED_FIELDS:
+            setattr(index, name, saved[name])
+        return index
+
+    def save(self, path: str):
+        """
+        Persist the index as JSON so cold starts skip chunking and tokenizing
+        """
+        with open(path, 'wb') as f:
+            f.write(get_codec().dumps_bytes({name: getattr(self, name) for name in SAVED_FIELDS}))
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def search(self, query: str, top_k: int = 3) -> list:
+        """
+        (chunk_id, score) pairs for the best matching chunks, best first
+        """
+        scores = {}
+        for term in set(content_tokens(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for chunk_id, tf in self.postings[term]:
+                norm = K1 * (1 - B + B * self.lengths[chunk_id] / self.avg_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+    def confidence(self, query: str, chunk_id: int) -> float:
+        """
+        IDF-weighted share of the query terms found in a chunk (0..1)
+        """
+        terms = set(content_tokens(query))
+        if not terms:
+            return 0.0
+        chunk = self.chunks[chunk_id]
+        chunk_terms = set(content_tokens(chunk['text'])) | set(content_tokens(chunk['heading']))
+        total = sum(self.idf.get(term, self.max_idf) for term in terms)
+        found = sum(self.idf[term] for term in terms if term in chunk_terms)
+        return found / total
+
+    def answer(self, query: str) -> dict:
+        """
+        Best passage for a query with its citation and confidence; None when nothing matches
+        """
+        results = self.search(query)
+        if not results:
+            return None
+
+        chunk_id, score = results[0]
+        chunk = self.chunks[chunk_id]
+        passage = extract_passage(chunk['text'], set(content_tokens(query)))
+        citations = [
+            {
+                'text': self.chunks[cid]['text'][:MAX_PASSAGE_CHARS],
+                'location': {'type': 'LOCAL', 'path': self.chunks[cid]['path'], 'heading': self.chunks[cid]['heading']}
+            }
+            for cid, _ in results
+        ]
+        return {
+            'answer': f"{chunk['heading']}\n{passage}" if chunk['heading'] else passage,
+            'citations': citations,
+            'confidence': round(self.confidence(query, chunk_id), 3),
+            'score': round(score, 3),
+        }
+
+
+def extract_passage(text: str, terms: set, max_chars: int = MAX_PASSAGE_CHARS) -> str:
+    """
+    The whole chunk when short, otherwise its best matching lines in document order
+    """
+    if len(text) <= max_chars:
+        return text
+
+    lines = text.splitlines()
+    ranked = sorted(range(len(lines)), key=lambda i: -len(terms.intersection(content_tokens(lines[i]))))
+    keep, size = set(), 0
+    for i in ranked:
+        if size + len(lines[i]) > max_chars and keep:
+            break
+        keep.add(i)
+        size += len(lines[i]) + 1
+    return '\n'.join(lines[i] for i in sorted(keep))
+
+
+_local_index = None
+_local_index_loaded = False
+_local_index_lock = threading.Lock()
+
+
+def get_local_index():
+    """
+    Shared index, loaded on first use. A persisted index is reused while its
+    fingerprint matches the documents, or as-is when the documents are not deployed.
+    None when neither documents nor a saved index are available.
+    """
+    global _local_index, _local_index_loaded
+    if _local_index_loaded:
+        return _local_index
+
+    with _local_index_lock:
+        if not _local_index_loaded:
+            from config import KNOWLEDGE_BASE_DOCS_DIR, LOCAL_INDEX_PATH
+            _local_index = _load_or_build(KNOWLEDGE_BASE_DOCS_DIR, LOCAL_INDEX_PATH)
+            _local_index_loaded = True
+    return _local_index
+
+
+def set_local_index(index):
+    """
+    Replace the shared index (tests, benchmarks, warm-up)
+    """
+    global _local_index, _local_index_loaded
+    _local_index = index
+    _local_index_loaded = True
+
+
+def _load_or_build(docs_dir: str, index_path: str):
+    have_docs = bool(docs_dir) and os.path.isdir(docs_dir)
+    fingerprint = policy_namespace('local', docs_dir) if have_docs else None
+
+    if index_path and os.path.exists(index_path):
+        try:
+            index = LocalIndex.load(index_path)
+            if not have_docs or index.fingerprint == fingerprint:
+                logger.info("Loaded policy index from %s (%d chunks)", index_path, len(index))
+                return index
+            logger.info("Policy documents changed, rebuilding index")
+        except Exception as e:
+            logger.warning("Could not load policy index %s: %s", index_path, e)
+
+    if not have_docs:
+        logger.info("No policy documents or saved index, local retrieval disabled")
+        return None
+
+    index = LocalIndex.build(docs_dir)
+    logger.info("Indexed %d policy chunks from %s", len(index), docs_dir)
+    if index_path:
+        try:
+            index.save(index_path)
+        except OSError as e:
+            logger.warning("Could not save policy index %s: %s", index_path, e)
+    return index
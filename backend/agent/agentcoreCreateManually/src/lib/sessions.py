@@ -0,0 +1,241 @@
+"""
+Multi-turn conversation sessions keyed by sessionId.
+Compact per-session state in an in-process LRU, written through to an optional persistent backend.
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from lib.log import get_logger
+from lib.options import OptionSet
+
+logger = get_logger('sessions')
+
+# Sentiment scores (positive - negative) kept per session
+SENTIMENT_HISTORY = 10
+
+# Tool results cached per session, and for how long
+MAX_CACHED_RESULTS = 16
+RESULT_TTL_SECONDS = 300
+
+# Tools whose results depend only on their input and may be reused within a session
+CACHEABLE_TOOLS = {'generate_rebooking_options', 'query_policy', 'analyze_passenger_sentiment', 'translate_message'}
+
+# Tool arguments filled in from the session's passenger when the caller leaves them out
+PASSENGER_FIELDS = ('passenger_id', 'tier', 'origin', 'destination')
+
+
+@dataclass(slots=True)
+class Passenger:
+    passenger_id: str = None
+    tier: str = None
+    origin: str = None
+    destination: str = None
+
+
+@dataclass(slots=True)
+class SessionState:
+    """
+    Everything the agent remembers between turns of one conversation
+    """
+    session_id: str
+    passenger: Passenger = field(default_factory=Passenger)
+    language: str = None
+    options: list = field(default_factory=list)
+    # optionId -> flight instance keys of the offered options, for seat holds and bookings
+    flight_instances: dict = field(default_factory=dict)
+    sentiment: list = field(default_factory=list)
+    results: dict = field(default_factory=dict)
+    turns: int = 0
+    updated_at: float = 0.0
+
+    def fill(self, params: tuple, tool_input: dict) -> dict:
+        """
+        Tool input with missing passenger fields taken from the session
+        """
+        missing = {name: getattr(self.passenger, name) for name in PASSENGER_FIELDS
+                   if name in params and name not in tool_input and getattr(self.passenger, name)}
+        return {**tool_input, **missing} if missing else tool_input
+
+    def cached(self, tool_name: str, tool_input: dict, now: float):
+        """
+        Result of an identical earlier call in this session, or None
+        """
+        if tool_name not in CACHEABLE_TOOLS:
+            return None
+        entry = self.results.get(result_key(tool_name, tool_input))
+        if entry is None or entry[0] < now:
+            return None
+        return entry[1]
+
+    def record(self, tool_name: str, tool_input: dict, result, now: float, cached: bool = False):
+        """
+        Fold a tool call into the session state; a cached result (reused from this
+        session) updates the state the same way but is not stored again
+        """
+        if not isinstance(result, dict) or result.get('success') is False:
+            return
+
+        if tool_name == 'generate_rebooking_options':
+            for name in PASSENGER_FIELDS:
+                if tool_input.get(name):
+                    setattr(self.passenger, name, tool_input[name])
+            self.options = result.get('options', [])
+            self.flight_instances = (
+                {self.options.option_id(i): self.options.flight_instances(i) for i in range(len(self.options))}
+                if isinstance(self.options, OptionSet) else {}
+            )
+        elif tool_name == 'analyze_passenger_sentiment':
+            scores = result.get('scores') or {}
+            self.sentiment.append(round(scores.get('positive', 0.0) - scores.get('negative', 0.0), 3))
+            del self.sentiment[:-SENTIMENT_HISTORY]
+        elif tool_name == 'translate_message':
+            self.language = tool_input.get('target_language') or self.language
+        elif tool_name in ('confirm_booking', 'create_escalation') and tool_input.get('passenger_id'):
+            self.passenger.passenger_id = tool_input['passenger_id']
+
+        if tool_name in CACHEABLE_TOOLS and not cached:
+            self.results[result_key(tool_name, tool_input)] = (now + RESULT_TTL_SECONDS, result)
+            while len(self.results) > MAX_CACHED_RESULTS:
+                del self.results[next(iter(self.results))]
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data['results'] = [[key, expires, result] for key, (expires, result) in self.results.items()]
+        return json.dumps(data, separators=(',', ':'), default=encode_value)
+
+    @classmethod
+    def from_json(cls, text: str):
+        data = json.loads(text)
+        data['passenger'] = Passenger(**data['passenger'])
+        data['results'] = {key: (expires, result) for key, expires, result in data['results']}
+        return cls(**data)
+
+
+def encode_value(value):
+    """
+    JSON fallback for session state: option sets are stored as option dicts
+    """
+    if isinstance(value, OptionSet):
+        return value.to_dicts()
+    return str(value)
+
+
+def result_key(tool_name: str, tool_input: dict) -> str:
+    return tool_name + json.dumps(tool_input, sort_keys=True, separators=(',', ':'), default=str)
+
+
+class SqliteSessionBackend:
+    """
+    Local stand-in for a DynamoDB sessions table: one row per session with an expiry.
+    Any object with the same load/save/delete methods can replace it.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # One write per turn; WAL without a sync per commit keeps that well under a millisecond
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, state TEXT, expires_at REAL)'
+        )
+        self._db.commit()
+
+    def load(self, session_id: str, now: float):
+        with self._lock:
+            row = self._db.execute(
+                'SELECT state FROM sessions WHERE session_id = ? AND expires_at > ?', (session_id, now)
+            ).fetchone()
+        return row[0] if row else None
+
+    def save(self, session_id: str, state: str, expires_at: float):
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)', (session_id, state, expires_at))
+            self._db.commit()
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._db.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+            self._db.commit()
+
+
+class SessionStore:
+    """
+    LRU of live sessions with TTL, backed by an optional persistent backend so a
+    conversation survives eviction, restarts and landing on another worker.
+    """
+
+    def __init__(self, max_sessions: int = 1000, ttl_seconds: float = 3600, backend=None, clock=time.time):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+        self._stats = {'memory_hits': 0, 'backend_hits': 0, 'created': 0, 'evictions': 0, 'expirations': 0}
+
+    def get(self, session_id: str) -> SessionState:
+        """
+        The session's state, loaded or created on first use
+        """
+        now = self._clock()
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is not None:
+                if state.updated_at + self.ttl_seconds > now:
+                    self._sessions.move_to_end(session_id)
+                    self._stats['memory_hits'] += 1
+                    return state
+                del self._sessions[session_id]
+                self._stats['expirations'] += 1
+
+        stored = self.backend.load(session_id, now) if self.backend is not None else None
+        if stored is not None:
+            state = SessionState.from_json(stored)
+            self._stats['backend_hits'] += 1
+        else:
+            state = SessionState(session_id, updated_at=now)
+            self._stats['created'] += 1
+
+        with self._lock:
+            self._remember(state)
+        return state
+
+    def save(self, state: SessionState):
+        """
+        Mark a turn complete and write the state through to the backend
+        """
+        state.turns += 1
+        state.updated_at = self._clock()
+        with self._lock:
+            self._remember(state)
+        if self.backend is not None:
+            try:
+                self.backend.save(state.session_id, state.to_json(), state.updated_at + self.ttl_seconds)
+            except Exception as e:
+                logger.warning("Could not persist session %s: %s", state.session_id, e)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+        if self.backend is not None:
+            self.backend.delete(session_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._sessions)
+        return stats
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _remember(self, state):
+        self._sessions[state.session_id] = state
+        self._sessions.move_to_end(state.session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self._stats['evictions'] += 1
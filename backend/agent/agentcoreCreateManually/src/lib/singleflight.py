@@ -0,0 +1,155 @@
+"""
+Single-flight request coalescing.
+Concurrent identical calls share one backend request; nothing is kept once it completes.
+"""
+import copy
+import functools
+import threading
+from lib import metrics
+from lib.log import get_logger
+from lib.request_context import coalesced, remaining_seconds, run_with_context
+from lib.resilience import DeadlineExceeded
+
+logger = get_logger('singleflight')
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'followers')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Deduplicates in-flight calls by key.
+
+    The first caller for a key (the leader) runs the function; callers arriving
+    while it runs (followers) wait and receive a copy of its result, or its
+    exception re-raised. Every caller of a shared call, the leader included, gets
+    its own copy. The key is forgotten as soon as the leader finishes, so a later
+    call always makes a fresh request.
+
+    A follower waits no longer than its own deadline. When the leader fails with
+    DeadlineExceeded (its budget, not the service) a follower with time left runs
+    the call again, leading it or joining a newer one.
+
+    do() serves threaded callers. do_async() serves coroutines: followers on the
+    same event loop await the leader's future instead of holding a thread, and the
+    leader itself goes through do() on a worker thread, so async and threaded
+    callers coalesce with each other.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._futures = {}
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Call func(*args, **kwargs), or wait for the identical call already in flight
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                else:
+                    call.followers += 1
+            if leader:
+                break
+
+            metrics.increment(f"singleflight.{self.name}.shared")
+            remaining = remaining_seconds()
+            if not call.done.wait(None if remaining is None else max(remaining, 0)):
+                metrics.increment(f"singleflight.{self.name}.deadline_exceeded")
+                raise DeadlineExceeded(f"{self.name}: shared call did not answer within {max(remaining, 0):.2f}s")
+            if isinstance(call.error, DeadlineExceeded) and _has_budget():
+                metrics.increment(f"singleflight.{self.name}.retried")
+                continue
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        token = coalesced.set(True)
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            coalesced.reset(token)
+            with self._lock:
+                del self._calls[key]
+            if call.followers:
+                logger.debug("%s: %d callers shared one request", self.name, call.followers + 1)
+            call.done.set()
+        # No follower can join once the key is gone; the ones that did copy call.result
+        return copy.deepcopy(call.result) if call.followers else call.result
+
+    async def do_async(self, key, func, *args, **kwargs):
+        """
+        Awaitable do(). func is either a coroutine function, awaited on this loop,
+        or a blocking function, run on the loop's default executor.
+        """
+        import asyncio  # only asyncio callers pay for importing it
+        loop = asyncio.get_running_loop()
+        slot = (loop, key)
+
+        while True:
+            entry = self._futures.get(slot)
+            if entry is None:
+                break
+            # [future, followers]
+            entry[1] += 1
+            metrics.increment(f"singleflight.{self.name}.shared")
+            remaining = remaining_seconds()
+            try:
+                result = await asyncio.wait_for(asyncio.shield(entry[0]), None if remaining is None else max(remaining, 0))
+            except DeadlineExceeded:
+                if not _has_budget():
+                    raise
+                metrics.increment(f"singleflight.{self.name}.retried")
+                continue
+            except asyncio.TimeoutError:
+                metrics.increment(f"singleflight.{self.name}.deadline_exceeded")
+                raise DeadlineExceeded(f"{self.name}: shared call did not answer within {max(remaining, 0):.2f}s")
+            return copy.deepcopy(result)
+
+        entry = self._futures[slot] = [loop.create_future(), 0]
+        future = entry[0]
+        token = coalesced.set(True)
+        try:
+            if asyncio.iscoroutinefunction(func):
+                result = await func(*args, **kwargs)
+            else:
+                result = await loop.run_in_executor(
+                    None, run_with_context(functools.partial(self.do, key, func, *args, **kwargs))
+                )
+            future.set_result(result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Followers retrieve the exception; mark it retrieved when there are none
+            future.exception()
+            raise
+        finally:
+            coalesced.reset(token)
+            del self._futures[slot]
+        return copy.deepcopy(result) if entry[1] else result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+def _has_budget() -> bool:
+    remaining = remaining_seconds()
+    return remaining is None or remaining > 0
@@ -1,20 +1,40 @@
 """
 AWS Translate utilities
 """
-import boto3
-from config import AWS_REGION
+import re
+from lib.log import get_logger, redact
+from lib.resilience import call_service
+from lib.singleflight import SingleFlight
+from config import USE_REQUEST_COALESCING
 
-translate_client = boto3.client('translate', region_name=AWS_REGION)
+logger = get_logger('translate')
+
+_in_flight = SingleFlight('translate.translate_text')
+
+# Amazon Translate accepts up to 10,000 bytes per request; keep headroom
+MAX_REQUEST_BYTES = 9000
+
+# Sentence and line boundaries; the separators are kept so text reassembles exactly
+SEGMENT_BOUNDARY = re.compile(r'(\s*\n\s*|(?<=[.!?])\s+)')
 
 
 def translate_text(text: str, source_language: str, target_language: str) -> dict:
     """
-    Translate text using AWS Translate
+    Translate text using AWS Translate.
+    Concurrent identical requests share one call.
     """
-    print(f"[TRANSLATE] {source_language} -> {target_language}: {text[:50]}...")
+    if USE_REQUEST_COALESCING:
+        return _in_flight.do((text, source_language, target_language), _translate_text,
+                             text, source_language, target_language)
+    return _translate_text(text, source_language, target_language)
+
+
+def _translate_text(text: str, source_language: str, target_language: str) -> dict:
+    logger.debug("%s -> %s: %s", source_language, target_language, redact(text))
     
     try:
-        response = translate_client.translate_text(
+        response = call_service(
+            'translate', 'translate_text',
             Text=text,
             SourceLanguageCode=source_language if source_language != 'auto' else 'auto',
             TargetLanguageCode=target_language
@@ -23,7 +43,7 @@ def translate_text(text: str, source_language: str, target_language: str) -> dic
         translated = response.get('TranslatedText', text)
         detected_source = response.get('SourceLanguageCode', source_language)
         
-        print(f"[TRANSLATE] Result: {translated[:50]}...")
+        logger.info("Translated %d chars %s -> %s", len(text), detected_source, target_language)
         
         return {
             'translated_text': translated,
@@ -32,5 +52,98 @@ def translate_text(text: str, source_language: str, target_language: str) -> dic
         }
     
     except Exception as e:
-        print(f"[TRANSLATE ERROR] {e}")
+        logger.error("Translation failed: %s", e)
         raise
+
+
+def split_segments(text: str) -> tuple:
+    """
+    Split text into sentence/line segments and the separators between them
+    """
+    parts = SEGMENT_BOUNDARY.split(text)
+    return parts[0::2], parts[1::2]
+
+
+def translate_with_memory(text: str, source_language: str, target_language: str, memory) -> dict:
+    """
+    Translate text segment by segment, reusing segments from the translation
+    memory and sending all remaining segments in as few calls as possible
+    """
+    segments, separators = split_segments(text)
+    translated = list(segments)
+    missing = {}
+    
+    for i, segment in enumerate(segments):
+        if not segment.strip():
+            continue
+        cached = memory.get(segment, source_language, target_language)
+        if cached is not None:
+            translated[i] = cached
+        else:
+            missing.setdefault(segment, []).append(i)
+    
+    detected_source = source_language
+    if missing:
+        results, detected_source = translate_batch(list(missing), source_language, target_language, memory)
+        memory.put_many(list(zip(missing, results)), source_language, target_language)
+        for segment, result in zip(missing, results):
+            for i in missing[segment]:
+                translated[i] = result
+    
+    reused = len(segments) - sum(len(positions) for positions in missing.values())
+    
+    pieces = [translated[0]]
+    for separator, segment in zip(separators, translated[1:]):
+        pieces.append(separator)
+        pieces.append(segment)
+    
+    logger.info("%d/%d segments from memory", reused, len(segments))
+    
+    return {
+        'translated_text': ''.join(pieces),
+        'source_language': detected_source,
+        'target_language': target_language,
+        'segments': len(segments),
+        'segments_from_memory': reused
+    }
+
+
+def translate_batch(segments: list, source_language: str, target_language: str, memory=None) -> tuple:
+    """
+    Translate many single-line segments with newline-joined requests under the
+    size limit. Returns (translations in input order, detected source language).
+    """
+    results = []
+    detected_source = source_language
+    
+    for group in _request_groups(segments):
+        response = translate_text('\n'.join(group), source_language, target_language)
+        if memory is not None:
+            memory.record_call(sum(len(s) for s in group))
+        detected_source = response['source_language']
+        lines = response['translated_text'].split('\n')
+        
+        if len(lines) != len(group):
+            # Line structure was not preserved; translate this group one segment at a time
+            lines = []
+            for segment in group:
+                lines.append(translate_text(segment, source_language, target_language)['translated_text'])
+                if memory is not None:
+                    memory.record_call(len(segment))
+        
+        results.extend(lines)
+    
+    return results, detected_source
+
+
+def _request_groups(segments: list):
+    group, size = [], 0
+    for segment in segments:
+        segment_size = len(segment.encode('utf-8')) + 1
+        if group and size + segment_size > MAX_REQUEST_BYTES:
+            yield group
+            group, size = [], 0
+        group.append(segment)
+        size += segment_size
+    if group:
+        yield group
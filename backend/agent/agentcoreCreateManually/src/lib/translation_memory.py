@@ -0,0 +1,103 @@
+"""
+Translation memory: reuse of previously translated segments
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def segment_key(text: str, source_language: str, target_language: str) -> str:
+    """
+    Store key for one segment in one language pair
+    """
+    digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+    return f"{source_language}:{target_language}:{digest}"
+
+
+class TranslationMemory:
+    """
+    Two-tier segment store: an in-process LRU backed by an optional SQLite file
+    that survives restarts and can be shared by workers on the same host.
+    """
+
+    def __init__(self, max_entries: int = 5000, db_path: str = None):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._stats = {'lookups': 0, 'memory_hits': 0, 'disk_hits': 0, 'misses': 0,
+                       'saved_characters': 0, 'translated_characters': 0, 'backend_calls': 0}
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS segments (key TEXT PRIMARY KEY, translated TEXT, created REAL)'
+            )
+            self._db.commit()
+
+    def get(self, text: str, source_language: str, target_language: str):
+        """
+        Cached translation of a segment, or None
+        """
+        key = segment_key(text, source_language, target_language)
+
+        with self._lock:
+            self._stats['lookups'] += 1
+            translated = self._entries.get(key)
+            if translated is not None:
+                self._entries.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                self._stats['saved_characters'] += len(text)
+                return translated
+
+            if self._db is not None:
+                row = self._db.execute('SELECT translated FROM segments WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    self._remember(key, row[0])
+                    self._stats['disk_hits'] += 1
+                    self._stats['saved_characters'] += len(text)
+                    return row[0]
+
+            self._stats['misses'] += 1
+            return None
+
+    def put_many(self, entries: list, source_language: str, target_language: str):
+        """
+        Store (text, translated) pairs for a language pair
+        """
+        rows = [(segment_key(text, source_language, target_language), translated, time.time())
+                for text, translated in entries]
+
+        with self._lock:
+            for key, translated, _created in rows:
+                self._remember(key, translated)
+            if self._db is not None:
+                self._db.executemany('INSERT OR REPLACE INTO segments VALUES (?, ?, ?)', rows)
+                self._db.commit()
+
+    def record_call(self, characters: int):
+        """
+        Count one backend Translate call and the characters it billed
+        """
+        with self._lock:
+            self._stats['backend_calls'] += 1
+            self._stats['translated_characters'] += characters
+
+    def stats(self) -> dict:
+        """
+        Hit rates and character savings
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        hits = stats['memory_hits'] + stats['disk_hits']
+        stats['hit_rate'] = round(hits / stats['lookups'], 4) if stats['lookups'] else 0.0
+        return stats
+
+    def _remember(self, key, translated):
+        self._entries[key] = translated
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
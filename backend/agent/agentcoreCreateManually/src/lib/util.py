@@ -1,22 +1,21 @@
 """
 General utility functions
 """
-import random
-import string
+from lib import ids
 
 
-def generate_pnr() -> str:
+def generate_pnr(idempotency_key: str = None) -> str:
     """
-    Generate a mock PNR (Passenger Name Record)
+    Generate a mock PNR (Passenger Name Record); unique among PNRs issued in the last 48 days.
+    With an idempotency key, the PNR is derived from it, so retries get the same one.
     """
-    letters = ''.join(random.choices(string.ascii_uppercase, k=3))
-    numbers = ''.join(random.choices(string.digits, k=3))
-    return f"PNR-{letters}{numbers}"
+    if idempotency_key:
+        return ids.derived_pnr(idempotency_key)
+    return ids.new_pnr()
 
 
 def generate_id(prefix: str = "ID") -> str:
     """
-    Generate a random ID with prefix
+    Generate a unique, time-ordered ID with prefix
     """
-    suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-    return f"{prefix}-{suffix}"
+    return ids.new_id(prefix)
@@ -2,32 +2,136 @@
 AgentCore Runtime Handler
 Implements inline tools for flight disruption management
 """
-import json
-import random
 import datetime
-from lib.bedrock import query_knowledge_base
-from lib.comprehend import analyze_sentiment
-from lib.translate import translate_text
-from lib.passengers import generate_flight_options
-from lib.util import generate_pnr
-from config import USE_BEDROCK, USE_KNOWLEDGE_BASE, KNOWLEDGE_BASE_ID, USE_COMPREHEND, USE_TRANSLATE
+import threading
+import time
+from lib.cache import AnswerCache, policy_namespace
+from lib.log import configure_logging, get_logger, log_payload, redact
+from lib.options import dumps
+from lib import metrics
+from lib import request_context
+from lib.request_context import start_request
+from config import USE_BEDROCK, USE_KNOWLEDGE_BASE, KNOWLEDGE_BASE_ID, KNOWLEDGE_BASE_DOCS_DIR, USE_COMPREHEND, USE_TRANSLATE
+from config import USE_POLICY_CACHE, POLICY_CACHE_MAX_ENTRIES, POLICY_CACHE_TTL_SECONDS, POLICY_CACHE_SIMILARITY
+from config import POLICY_NAMESPACE_RECHECK_SECONDS
+from config import USE_LOCAL_RETRIEVAL, LOCAL_RETRIEVAL_MIN_CONFIDENCE
+from config import REBOOKING_OPTION_COUNT
+from config import USE_BOOKING_INVENTORY, BOOKING_DB, SEAT_HOLD_TTL_SECONDS, DEFAULT_FLIGHT_SEATS
+from config import USE_ESCALATION_QUEUE, ESCALATION_AGING_POINTS_PER_MINUTE
+from config import USE_TRANSLATION_MEMORY, TRANSLATION_MEMORY_MAX_ENTRIES, TRANSLATION_MEMORY_DB
+from config import BROADCAST_MAX_CONCURRENCY
+from config import TOOL_TIMEOUT_SECONDS, TOOL_TIMEOUTS, MAX_TOOL_CONCURRENCY
+from config import USE_SESSIONS, SESSION_MAX_ENTRIES, SESSION_TTL_SECONDS, SESSION_DB
+from config import LOG_LEVEL, LOG_PAYLOAD_SAMPLE_RATE, LOG_REDACT_PASSENGER_TEXT
+from config import METRICS_ENABLED, METRICS_NAMESPACE, METRICS_FLUSH_INTERVAL_SECONDS
+from config import RESPONSE_COMPRESSION, COMPRESSION_MIN_BYTES, COMPRESSION_LEVEL
+
+# Tool modules (and the AWS clients behind them) are imported inside the tools
+# on first use, so a cold start only pays for what is invoked and disabled
+# features (e.g. Translate) are never imported at all.
+
+configure_logging(LOG_LEVEL, LOG_PAYLOAD_SAMPLE_RATE, LOG_REDACT_PASSENGER_TEXT)
+metrics.configure_metrics(METRICS_ENABLED, METRICS_NAMESPACE, METRICS_FLUSH_INTERVAL_SECONDS)
+logger = get_logger('tools')
+logger.info("Loaded configuration", extra={
+    "use_bedrock": USE_BEDROCK,
+    "use_knowledge_base": USE_KNOWLEDGE_BASE,
+    "knowledge_base_id": KNOWLEDGE_BASE_ID,
+    "use_policy_cache": USE_POLICY_CACHE,
+    "use_comprehend": USE_COMPREHEND,
+    "use_translate": USE_TRANSLATE
+})
+
+# Shared across invocations on a warm runtime
+policy_cache = AnswerCache(
+    max_entries=POLICY_CACHE_MAX_ENTRIES,
+    ttl_seconds=POLICY_CACHE_TTL_SECONDS,
+    similarity_threshold=POLICY_CACHE_SIMILARITY
+)
+translation_memory = None
+session_store = None
+_session_lock = threading.Lock()
+booking_engine = None
+_booking_lock = threading.Lock()
+escalation_queue = None
+_escalation_lock = threading.Lock()
+
+
+def get_session_store():
+    """
+    Shared conversation session store, created on the first event with a sessionId
+    """
+    global session_store
+    if session_store is None:
+        from lib.sessions import SessionStore, SqliteSessionBackend
+        session_store = SessionStore(
+            max_sessions=SESSION_MAX_ENTRIES,
+            ttl_seconds=SESSION_TTL_SECONDS,
+            backend=SqliteSessionBackend(SESSION_DB) if SESSION_DB else None
+        )
+    return session_store
+
+
+def get_translation_memory():
+    """
+    Shared translation memory, created on first translation; None when disabled
+    """
+    global translation_memory
+    if translation_memory is None and USE_TRANSLATION_MEMORY:
+        from lib.translation_memory import TranslationMemory
+        translation_memory = TranslationMemory(
+            max_entries=TRANSLATION_MEMORY_MAX_ENTRIES,
+            db_path=TRANSLATION_MEMORY_DB
+        )
+    return translation_memory
 
 
 def generate_rebooking_options(passenger_id: str, origin: str, destination: str, tier: str, constraints: list = None) -> dict:
     """
     Generate rebooking flight options for a disrupted passenger
     """
-    print(f"[TOOL] generate_rebooking_options called: {passenger_id}, {origin}->{destination}, tier={tier}")
+    logger.info("generate_rebooking_options called: %s, %s->%s, tier=%s", passenger_id, origin, destination, tier)
+    from lib.constraints import ignored_constraints
+    from lib.passengers import generate_flight_options
     
-    # Generate 4-6 flight options
-    num_options = random.randint(4, 6)
-    options = generate_flight_options(origin, destination, tier, num_options, constraints or [])
+    options = generate_flight_options(origin, destination, tier, REBOOKING_OPTION_COUNT, constraints or [])
     
     return {
         "success": True,
         "passenger_id": passenger_id,
         "options": options,
-        "count": len(options)
+        "count": len(options),
+        "ignored_constraints": ignored_constraints(constraints)
+    }
+
+
+def bulk_rebook_manifest(origin: str, destination: str, passengers: list, constraints: list = None) -> dict:
+    """
+    Rebook every passenger of a disrupted flight against shared seat inventory;
+    with booking inventory on, each assignment comes with a seat hold to confirm
+    """
+    logger.info("bulk_rebook_manifest called: %s->%s, %d passengers", origin, destination, len(passengers))
+    from lib.inventory import get_flight_index
+    
+    index = get_flight_index()
+    if index is None:
+        return {
+            "success": False,
+            "error": "Bulk rebooking requires a flight schedule; none is configured"
+        }
+    
+    from lib.rebooking import rebook_manifest
+    result = rebook_manifest(index, origin, destination, passengers, constraints or [],
+                             engine=get_booking_engine())
+    
+    return {
+        "success": True,
+        "options": result["options"],
+        "assignments": result["assignments"],
+        "unplaced": result["unplaced"],
+        "placed_count": len(result["assignments"]),
+        "unplaced_count": len(result["unplaced"]),
+        "ignored_constraints": result["ignored_constraints"]
     }
 
 
@@ -35,19 +139,45 @@ def query_policy(query: str) -> dict:
     """
     Query the airline policy knowledge base
     """
-    print(f"[TOOL] query_policy called: {query}")
-    
-    if USE_KNOWLEDGE_BASE and USE_BEDROCK:
+    logger.info("query_policy called: %s", redact(query))
+    knowledge_base_enabled = USE_KNOWLEDGE_BASE and USE_BEDROCK
+
+    if USE_LOCAL_RETRIEVAL:
+        local = local_policy_answer(query, LOCAL_RETRIEVAL_MIN_CONFIDENCE)
+        if local is not None:
+            return local
+
+    if knowledge_base_enabled:
+        namespace = policy_namespace(KNOWLEDGE_BASE_ID, KNOWLEDGE_BASE_DOCS_DIR, POLICY_NAMESPACE_RECHECK_SECONDS)
+        if USE_POLICY_CACHE:
+            cached = policy_cache.get(query, namespace)
+            if cached is not None:
+                metrics.increment("policy_cache.hit")
+                logger.info("Policy cache hit", extra={"cache": policy_cache.stats()})
+                return {
+                    "success": True,
+                    "query": query,
+                    "answer": cached["answer"],
+                    "citations": cached["citations"],
+                    "cached": True
+                }
+            metrics.increment("policy_cache.miss")
+
         try:
+            from lib.bedrock import query_knowledge_base
             result = query_knowledge_base(query, KNOWLEDGE_BASE_ID)
+            answer = result.get("answer", "")
+            citations = result.get("citations", [])
+            if USE_POLICY_CACHE and answer:
+                policy_cache.put(query, {"answer": answer, "citations": citations}, namespace)
             return {
                 "success": True,
                 "query": query,
-                "answer": result.get("answer", ""),
-                "citations": result.get("citations", [])
+                "answer": answer,
+                "citations": citations
             }
         except Exception as e:
-            print(f"[ERROR] Knowledge base query failed: {e}")
+            logger.error("Knowledge base query failed: %s", e)
             return {
                 "success": False,
                 "query": query,
@@ -64,23 +194,52 @@ def query_policy(query: str) -> dict:
         }
 
 
+def local_policy_answer(query: str, min_confidence: float):
+    """
+    Answer from the in-process policy index, or None when it is not confident enough
+    """
+    from lib.retrieval import get_local_index
+    index = get_local_index()
+    if index is None:
+        return None
+
+    result = index.answer(query)
+    if result is None or result["confidence"] < min_confidence:
+        metrics.increment("policy_local.miss")
+        return None
+
+    metrics.increment("policy_local.hit")
+    logger.info("Answered policy query locally", extra={"confidence": result["confidence"]})
+    return {
+        "success": True,
+        "query": query,
+        "answer": result["answer"],
+        "citations": result["citations"],
+        "confidence": result["confidence"],
+        "source": "local"
+    }
+
+
 def analyze_passenger_sentiment(text: str) -> dict:
     """
     Analyze sentiment of passenger message
     """
-    print(f"[TOOL] analyze_passenger_sentiment called: {text[:50]}...")
+    logger.info("analyze_passenger_sentiment called: %s", redact(text))
     
     if USE_COMPREHEND:
         try:
+            from lib.comprehend import analyze_sentiment
             result = analyze_sentiment(text)
             return {
                 "success": True,
                 "sentiment": result.get("sentiment", "NEUTRAL"),
                 "scores": result.get("scores", {}),
+                "language": result.get("language"),
+                "source": result.get("source"),
                 "text": text
             }
         except Exception as e:
-            print(f"[ERROR] Sentiment analysis failed: {e}")
+            logger.error("Sentiment analysis failed: %s", e)
             return {
                 "success": False,
                 "sentiment": "NEUTRAL",
@@ -96,15 +255,81 @@ def analyze_passenger_sentiment(text: str) -> dict:
         }
 
 
+def analyze_passenger_sentiment_batch(texts: list) -> dict:
+    """
+    Analyze sentiment of many passenger messages in one call
+    """
+    logger.info("analyze_passenger_sentiment_batch called: %d texts", len(texts))
+    
+    if USE_COMPREHEND:
+        try:
+            from lib.comprehend import analyze_sentiment_batch
+            batch = analyze_sentiment_batch(texts)
+        except Exception as e:
+            logger.error("Batch sentiment analysis failed: %s", e)
+            return {
+                "success": False,
+                "results": [],
+                "count": 0,
+                "error": str(e)
+            }
+        
+        results = []
+        for index, result in enumerate(batch):
+            if "error" in result:
+                results.append({
+                    "index": index,
+                    "success": False,
+                    "sentiment": "NEUTRAL",
+                    "error": result["error"]
+                })
+            else:
+                results.append({
+                    "index": index,
+                    "success": True,
+                    "sentiment": result.get("sentiment", "NEUTRAL"),
+                    "scores": result.get("scores", {}),
+                    "language": result.get("language"),
+                    "source": result.get("source")
+                })
+        
+        return {
+            "success": True,
+            "results": results,
+            "count": len(results),
+            "failed": sum(1 for r in results if not r["success"])
+        }
+    else:
+        # Fallback
+        return {
+            "success": True,
+            "results": [
+                {"index": index, "success": True, "sentiment": "NEUTRAL", "scores": {"neutral": 1.0}}
+                for index in range(len(texts))
+            ],
+            "count": len(texts),
+            "failed": 0,
+            "fallback": True
+        }
+
+
 def translate_message(text: str, target_language: str, source_language: str = "auto") -> dict:
     """
     Translate a message
     """
-    print(f"[TOOL] translate_message called: {source_language}->{target_language}")
+    logger.info("translate_message called: %s->%s", source_language, target_language)
     
     if USE_TRANSLATE:
         try:
-            result = translate_text(text, source_language, target_language)
+            from lib.translate import translate_text, translate_with_memory
+            memory = get_translation_memory()
+            if memory is not None:
+                result = translate_with_memory(text, source_language, target_language, memory)
+                metrics.increment("translation_memory.segments_reused", result["segments_from_memory"])
+                metrics.increment("translation_memory.segments", result["segments"])
+                logger.info("Translation memory", extra={"translation_memory": memory.stats()})
+            else:
+                result = translate_text(text, source_language, target_language)
             return {
                 "success": True,
                 "original": text,
@@ -113,7 +338,7 @@ def translate_message(text: str, target_language: str, source_language: str = "a
                 "target_language": target_language
             }
         except Exception as e:
-            print(f"[ERROR] Translation failed: {e}")
+            logger.error("Translation failed: %s", e)
             return {
                 "success": False,
                 "original": text,
@@ -130,59 +355,409 @@ def translate_message(text: str, target_language: str, source_language: str = "a
         }
 
 
-def confirm_booking(passenger_id: str, option_id: str) -> dict:
+def broadcast_notification(template: str, passengers: list, source_language: str = "en", fields: dict = None) -> dict:
     """
-    Confirm a rebooking selection
+    Send one message template to many passengers, each in their own language
     """
-    print(f"[TOOL] confirm_booking called: {passenger_id}, option={option_id}")
+    logger.info("broadcast_notification called: %d passengers", len(passengers))
+    from lib.broadcast import broadcast, fill
     
-    pnr = generate_pnr()
+    if USE_TRANSLATE:
+        from lib.translate import translate_text, translate_with_memory
+        memory = get_translation_memory()
+        
+        def translate(text, source, target):
+            if memory is not None:
+                return translate_with_memory(text, source, target, memory)["translated_text"]
+            return translate_text(text, source, target)["translated_text"]
+        
+        try:
+            result = broadcast(template, passengers, translate, source_language, fields, BROADCAST_MAX_CONCURRENCY)
+        except Exception as e:
+            logger.error("Broadcast failed: %s", e)
+            return {
+                "success": False,
+                "messages": [],
+                "count": 0,
+                "error": str(e)
+            }
+        metrics.increment("broadcast.messages", len(result["messages"]))
+        metrics.increment("broadcast.languages_translated", result["translated_languages"])
+        return {
+            "success": True,
+            "messages": result["messages"],
+            "count": len(result["messages"]),
+            "languages": result["languages"],
+            "failed_languages": result["failed"]
+        }
+    else:
+        # Fallback - untranslated messages
+        return {
+            "success": True,
+            "messages": [
+                {"passenger_id": p.get("passenger_id"), "language": source_language,
+                 "message": fill(template, {**(fields or {}), **p}), "translated": False}
+                for p in passengers
+            ],
+            "count": len(passengers),
+            "fallback": True
+        }
+
+
+def get_booking_engine():
+    """
+    Shared seat inventory, created on the first hold or confirmation; None when disabled
+    """
+    global booking_engine
+    if booking_engine is None and USE_BOOKING_INVENTORY:
+        with _booking_lock:
+            if booking_engine is None:
+                from lib.booking import BookingEngine, MemoryBookingStore, SqliteBookingStore, schedule_capacity
+                from lib.inventory import get_flight_index
+                index = get_flight_index()
+                booking_engine = BookingEngine(
+                    store=SqliteBookingStore(BOOKING_DB) if BOOKING_DB else MemoryBookingStore(),
+                    capacity=schedule_capacity(index, DEFAULT_FLIGHT_SEATS) if index is not None else None,
+                    hold_ttl=SEAT_HOLD_TTL_SECONDS,
+                    default_seats=DEFAULT_FLIGHT_SEATS
+                )
+    return booking_engine
+
+
+def option_flights(option_id: str) -> list:
+    """
+    Flight instances (e.g. "UA123@2026-01-05T14:05") of an option offered earlier in this session, or None
+    """
+    state = request_context.current_session()
+    if state is None:
+        return None
+    flights = state.flight_instances.get(option_id)
+    return list(flights) if flights else None
+
+
+def invalid_flights(passenger_id: str, option_id: str, flights: list) -> dict:
+    """
+    Failure result when flights are not all flight instances, or None
+    """
+    undated = [flight for flight in flights or [] if "@" not in flight]
+    if not undated:
+        return None
+    return {
+        "success": False,
+        "passenger_id": passenger_id,
+        "option_id": option_id,
+        "status": "INVALID_FLIGHTS",
+        "flights": undated,
+        "error": "Flights must name a departure, e.g. UA123@2026-01-05T14:05"
+    }
+
+
+def booking_failure(passenger_id: str, option_id: str, error) -> dict:
+    return {
+        "success": False,
+        "passenger_id": passenger_id,
+        "option_id": option_id,
+        "status": error.code,
+        "flights": error.flights,
+        "error": str(error)
+    }
+
+
+def hold_seats(passenger_id: str, option_id: str, flights: list = None) -> dict:
+    """
+    Hold a seat on every flight of a rebooking option while the passenger decides
+    """
+    logger.info("hold_seats called: %s, option=%s", passenger_id, option_id)
+    engine = get_booking_engine()
+    flights = flights or option_flights(option_id)
+    invalid = invalid_flights(passenger_id, option_id, flights)
+    if invalid:
+        return invalid
+    if engine is None or not flights:
+        return {
+            "success": False,
+            "passenger_id": passenger_id,
+            "option_id": option_id,
+            "error": "Seat holds need seat inventory and the option's flights"
+        }
+    
+    from lib.booking import BookingError
+    try:
+        hold = engine.hold(passenger_id, flights)
+    except BookingError as e:
+        return booking_failure(passenger_id, option_id, e)
     
     return {
         "success": True,
         "passenger_id": passenger_id,
         "option_id": option_id,
-        "pnr": pnr,
+        "status": "HELD",
+        **hold
+    }
+
+
+def confirm_booking(passenger_id: str, option_id: str, idempotency_key: str = None, hold_id: str = None,
+                    flights: list = None) -> dict:
+    """
+    Confirm a rebooking selection; retrying with the same idempotency key returns the original PNR
+    """
+    logger.info("confirm_booking called: %s, option=%s", passenger_id, option_id)
+    engine = get_booking_engine()
+    flights = flights or option_flights(option_id)
+    invalid = invalid_flights(passenger_id, option_id, flights)
+    if invalid:
+        return invalid
+    
+    # Without a caller key, a retry of the same selection must map to the same key
+    if not idempotency_key:
+        idempotency_key = "|".join([passenger_id, option_id, hold_id or ",".join(flights or [])])
+    
+    if engine is None or not (flights or hold_id):
+        # Nothing to check seats against (no inventory, or an option from outside this
+        # session); the PNR is derived from the idempotency key, so retries get the same one
+        from lib.util import generate_pnr
+        return {
+            "success": True,
+            "passenger_id": passenger_id,
+            "option_id": option_id,
+            "pnr": generate_pnr(idempotency_key),
+            "status": "CONFIRMED",
+            "confirmed_at": datetime.datetime.utcnow().isoformat(),
+            "idempotency_key": idempotency_key,
+            "inventory_checked": False
+        }
+    
+    from lib.booking import BookingError
+    try:
+        booking = engine.confirm(passenger_id, option_id, flights or [], idempotency_key, hold_id)
+    except BookingError as e:
+        return booking_failure(passenger_id, option_id, e)
+    
+    return {
+        "success": True,
+        "passenger_id": passenger_id,
+        "option_id": booking["option_id"],
+        "pnr": booking["pnr"],
         "status": "CONFIRMED",
-        "confirmed_at": datetime.datetime.utcnow().isoformat()
+        "confirmed_at": booking["confirmed_at"],
+        "flights": booking["flights"],
+        "idempotency_key": idempotency_key,
+        "replayed": booking.get("replayed", False),
+        "inventory_checked": True
     }
 
 
-def create_escalation(passenger_id: str, reason: str, priority: str = "NORMAL") -> dict:
+def get_escalation_queue():
     """
-    Create an escalation ticket
+    Shared queue of escalations waiting for a human agent; None when disabled
     """
-    print(f"[TOOL] create_escalation called: {passenger_id}, priority={priority}")
+    global escalation_queue
+    if escalation_queue is None and USE_ESCALATION_QUEUE:
+        with _escalation_lock:
+            if escalation_queue is None:
+                from lib.escalations import EscalationQueue
+                escalation_queue = EscalationQueue(aging_per_minute=ESCALATION_AGING_POINTS_PER_MINUTE)
+    return escalation_queue
+
+
+def create_escalation(passenger_id: str, reason: str, priority: str = "NORMAL", tier: str = None,
+                      sentiment_scores: dict = None, pool: str = None) -> dict:
+    """
+    Create an escalation ticket and queue it for a human agent, ahead of calmer and lower-tier passengers
+    """
+    logger.info("create_escalation called: %s, priority=%s", passenger_id, priority)
+    queue = get_escalation_queue()
     
-    escalation_id = f"ESC-{random.randint(10000, 99999)}"
+    if queue is None:
+        from lib.util import generate_id
+        return {
+            "success": True,
+            "escalation_id": generate_id("ESC"),
+            "passenger_id": passenger_id,
+            "reason": reason,
+            "priority": priority,
+            "status": "PENDING",
+            "created_at": datetime.datetime.utcnow().isoformat()
+        }
+    
+    from lib.escalations import DEFAULT_POOL, Escalation, distress
+    # Without explicit scores, the latest sentiment analyzed in this session
+    state = request_context.current_session()
+    latest = state.sentiment[-1] if state is not None and state.sentiment else None
+    level = distress(sentiment_scores, latest)
+    
+    pending = queue.pending(passenger_id)
+    if pending is not None:
+        # One ticket per passenger: a repeated escalation can only raise its priority
+        from lib.escalations import PRIORITY_POINTS
+        raise_priority = PRIORITY_POINTS.get(priority, 0) > PRIORITY_POINTS.get(pending.priority, 0)
+        score = queue.reprioritize(
+            pending.escalation_id,
+            priority=priority if raise_priority else None,
+            tier=tier,
+            distress=max(level, pending.distress)
+        )
+        escalation, updated = pending, True
+    else:
+        from lib.util import generate_id
+        escalation = Escalation(generate_id("ESC"), passenger_id, reason, priority, tier, level, pool or DEFAULT_POOL)
+        score = queue.push(escalation)
+        updated = False
     
     return {
         "success": True,
-        "escalation_id": escalation_id,
+        "escalation_id": escalation.escalation_id,
         "passenger_id": passenger_id,
-        "reason": reason,
-        "priority": priority,
+        "reason": escalation.reason,
+        "priority": escalation.priority,
+        "pool": escalation.pool,
+        "score": round(score, 1),
+        "queue_depth": len(queue),
+        "updated": updated,
         "status": "PENDING",
-        "created_at": datetime.datetime.utcnow().isoformat()
+        "created_at": datetime.datetime.utcfromtimestamp(escalation.enqueued_at).isoformat()
+    }
+
+
+def assign_escalations(agent_id: str, count: int = 1, pools: list = None) -> dict:
+    """
+    Hand the highest-priority waiting escalations to a human agent
+    """
+    logger.info("assign_escalations called: %s, count=%d, pools=%s", agent_id, count, pools)
+    queue = get_escalation_queue()
+    if queue is None:
+        return {
+            "success": False,
+            "error": "The escalation queue is disabled"
+        }
+    
+    batch = queue.pop_batch(max(0, count), pools)
+    return {
+        "success": True,
+        "agent_id": agent_id,
+        "escalations": [
+            {
+                "escalation_id": escalation.escalation_id,
+                "passenger_id": escalation.passenger_id,
+                "reason": escalation.reason,
+                "priority": escalation.priority,
+                "tier": escalation.tier,
+                "pool": escalation.pool,
+                "waited_seconds": round(waited, 1)
+            }
+            for escalation, waited in batch
+        ],
+        "queue": queue.stats()
     }
 
 
-# Tool registry for AgentCore
+def session_tool(name, func):
+    """
+    Wrap a tool so that, within a conversation session, it fills missing passenger
+    fields from the session, reuses identical earlier results and updates the session
+    """
+    params = func.__code__.co_varnames[:func.__code__.co_argcount]
+    
+    def wrapper(**tool_input):
+        state = request_context.current_session()
+        if state is None:
+            return func(**tool_input)
+        
+        now = time.time()
+        with _session_lock:
+            tool_input = state.fill(params, tool_input)
+            cached = state.cached(name, tool_input, now)
+            if cached is not None:
+                # A repeated call is still a turn: e.g. the sentiment trend gets its score
+                state.record(name, tool_input, cached, now, cached=True)
+        if cached is not None:
+            metrics.increment("session.tool_cache.hit")
+            return {**cached, "sessionCached": True}
+        
+        result = func(**tool_input)
+        with _session_lock:
+            state.record(name, tool_input, result, now)
+        return result
+    
+    wrapper.__name__ = func.__name__
+    wrapper.__doc__ = func.__doc__
+    return wrapper
+
+
+# Tool registry for AgentCore. Each tool reuses session state, then is timed
+# (timing is a no-op when metrics are disabled)
 TOOLS = {
-    "generate_rebooking_options": generate_rebooking_options,
-    "query_policy": query_policy,
-    "analyze_passenger_sentiment": analyze_passenger_sentiment,
-    "translate_message": translate_message,
-    "confirm_booking": confirm_booking,
-    "create_escalation": create_escalation,
+    name: metrics.timed(f"tool.{name}", metrics.tool_failed)(session_tool(name, func))
+    for name, func in {
+        "generate_rebooking_options": generate_rebooking_options,
+        "bulk_rebook_manifest": bulk_rebook_manifest,
+        "query_policy": query_policy,
+        "analyze_passenger_sentiment": analyze_passenger_sentiment,
+        "analyze_passenger_sentiment_batch": analyze_passenger_sentiment_batch,
+        "translate_message": translate_message,
+        "broadcast_notification": broadcast_notification,
+        "hold_seats": hold_seats,
+        "confirm_booking": confirm_booking,
+        "create_escalation": create_escalation,
+        "assign_escalations": assign_escalations,
+    }.items()
 }
 
 
+def open_session(event, context):
+    """
+    Bind the conversation session named by the event (or the runtime session), if any
+    """
+    session_id = event.get("sessionId") or getattr(context, "session_id", None)
+    if not USE_SESSIONS or not session_id or "metrics" in event:
+        return None
+    
+    state = get_session_store().get(session_id)
+    request_context.session.set(state)
+    return state
+
+
+def close_session(state):
+    if state is not None:
+        request_context.session.set(None)
+        get_session_store().save(state)
+
+
 def handler(event, context):
     """
     Main handler for AgentCore Runtime
     """
-    print(f"[HANDLER] Event: {json.dumps(event)}")
+    start_request(event, context)
+    log_payload(logger, "Event", event)
+    state = open_session(event, context)
+    
+    try:
+        return compress(event, handle_event(event))
+    finally:
+        close_session(state)
+        metrics.maybe_flush()
+
+
+def compress(event, response):
+    """
+    Compress a large response body for callers that accept it
+    """
+    if not RESPONSE_COMPRESSION:
+        return response
+    from lib.compression import compress_response, request_encoding
+    return compress_response(response, request_encoding(event), COMPRESSION_MIN_BYTES, COMPRESSION_LEVEL)
+
+
+def handle_event(event):
+    """
+    Route one event to metrics export, batched invocations or a single tool
+    """
+    if "metrics" in event:
+        return handle_metrics(event)
+    
+    # Batched invocations run concurrently
+    if "invocations" in event:
+        return handle_invocations(event)
     
     # Parse the event
     tool_name = event.get("toolName")
@@ -191,7 +766,7 @@ def handler(event, context):
     if not tool_name:
         return {
             "statusCode": 400,
-            "body": json.dumps({"error": "toolName is required"})
+            "body": dumps({"error": "toolName is required"})
         }
     
     # Get the tool function
@@ -200,23 +775,100 @@ def handler(event, context):
     if not tool_func:
         return {
             "statusCode": 404,
-            "body": json.dumps({"error": f"Tool not found: {tool_name}"})
+            "body": dumps({"error": f"Tool not found: {tool_name}"})
         }
     
-    # Execute the tool
+    # Execute the tool; its AWS calls give up when its timeout or the caller's deadline is reached
+    request_context.set_deadline(TOOL_TIMEOUTS.get(tool_name, TOOL_TIMEOUT_SECONDS))
     try:
         result = tool_func(**tool_input)
         return {
             "statusCode": 200,
-            "body": json.dumps(result)
+            "body": dumps(result)
         }
     except Exception as e:
-        print(f"[ERROR] Tool execution failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Tool execution failed: %s", e)
         return {
             "statusCode": 500,
-            "body": json.dumps({
+            "body": dumps({
                 "error": f"Tool execution failed: {str(e)}"
             })
         }
+
+
+def handle_invocations(event):
+    """
+    Run a list of tool invocations concurrently, returning results in request order
+    """
+    invocations = event.get("invocations")
+    
+    if not isinstance(invocations, list) or not invocations:
+        return {
+            "statusCode": 400,
+            "body": dumps({"error": "invocations must be a non-empty list"})
+        }
+    
+    from lib.executor import dispatch_sync
+    results = dispatch_sync(TOOLS, invocations, **_dispatch_options(event))
+    
+    return {
+        "statusCode": 200,
+        "body": dumps({"results": results})
+    }
+
+
+def handle_metrics(event):
+    """
+    Export collected metrics as Prometheus text, EMF lines or a JSON snapshot
+    """
+    fmt = event.get("metrics")
+    
+    if fmt == "prometheus":
+        return {"statusCode": 200, "headers": {"Content-Type": "text/plain; version=0.0.4"}, "body": metrics.prometheus_text()}
+    if fmt == "emf":
+        return {"statusCode": 200, "body": "\n".join(metrics.emf_lines())}
+    
+    snapshot = metrics.snapshot()
+    if escalation_queue is not None:
+        snapshot["escalations"] = escalation_queue.stats()
+    return {
+        "statusCode": 200,
+        "body": dumps(snapshot)
+    }
+
+
+async def handler_async(event, context):
+    """
+    Asyncio entry point for runtimes that already run an event loop
+    """
+    start_request(event, context)
+    log_payload(logger, "Event", event)
+    state = open_session(event, context)
+    invocations = event.get("invocations")
+    if invocations is None:
+        invocations = [{"toolName": event.get("toolName"), "toolInput": event.get("toolInput", {})}]
+    
+    from lib.executor import dispatch
+    try:
+        results = await dispatch(TOOLS, invocations, **_dispatch_options(event))
+    finally:
+        close_session(state)
+        metrics.maybe_flush()
+    
+    return compress(event, {
+        "statusCode": 200,
+        "body": dumps({"results": results})
+    })
+
+
+def _dispatch_options(event) -> dict:
+    """
+    Executor limits, optionally tightened by the event
+    """
+    default_timeout = min(event.get("timeoutSeconds", TOOL_TIMEOUT_SECONDS), TOOL_TIMEOUT_SECONDS)
+    
+    return {
+        "default_timeout": default_timeout,
+        "tool_timeouts": {name: min(timeout, default_timeout) for name, timeout in TOOL_TIMEOUTS.items()},
+        "max_concurrency": MAX_TOOL_CONCURRENCY
+    }
@@ -2,37 +2,273 @@
 API Gateway Proxy to AgentCore Runtime
 Thin Lambda function that forwards requests to the deployed AgentCore agent
 """
+import base64
+import codecs
+import contextvars
+import gzip
 import json
+import logging
+import random
 import uuid
-import boto3
+import threading
+import time
 import os
 
-# AgentCore client
-agentcore_client = boto3.client('bedrock-agentcore', region_name='us-east-1')
+try:
+    import orjson
+except ImportError:  # standard library fallback
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
 
 # Agent ARN (hardcoded for simplicity)
 AGENT_ARN = 'arn:aws:bedrock-agentcore:us-east-1:484907484851:runtime/agentcoreCreateManually_Agent-p7W7CaF67Z'
 
+# Lambda installs a root handler; fall back to stderr when run locally
+if not logging.getLogger().handlers:
+    logging.basicConfig()
+logger = logging.getLogger('api-proxy')
+logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO'))
+
+# Fraction of full request/response payload logs kept at DEBUG level
+PAYLOAD_SAMPLE_RATE = float(os.environ.get('LOG_PAYLOAD_SAMPLE_RATE', '0.01'))
+
+# CloudWatch Embedded Metric Format latency lines, one per request and AgentCore call
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'FlightDisruptionApiProxy')
+
+# Request ID of the current invocation; forwarded to the agent so logs and metrics correlate
+request_id_var = contextvars.ContextVar('request_id', default=None)
+
+# API Gateway abandons the integration after this long; what is left of it is
+# forwarded to the agent (timeoutSeconds) so its tools stop before the caller does
+API_TIMEOUT_SECONDS = float(os.environ.get('API_TIMEOUT_SECONDS', '29'))
+
+# time.monotonic() by which the current invocation must respond
+deadline_var = contextvars.ContextVar('deadline', default=None)
+
+# JSON codec: auto (orjson when installed), orjson or json
+JSON_CODEC = os.environ.get('JSON_CODEC', 'auto')
+USE_ORJSON = orjson is not None and JSON_CODEC in ('auto', 'orjson')
+
+# Response bodies of at least COMPRESSION_MIN_BYTES are compressed for clients sending
+# Accept-Encoding. Off by default: the base64 bodies only reach browsers intact once the
+# API's BinaryMediaTypes (template.yaml) cover the reply types, e.g. */*
+RESPONSE_COMPRESSION = os.environ.get('RESPONSE_COMPRESSION', 'false').lower() == 'true'
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+COMPRESSION_LEVEL = int(os.environ.get('COMPRESSION_LEVEL', '5'))
+
+# AgentCore runtime session IDs must be 33-256 characters; the web client's are shorter
+# (e.g. SES-k3j9x2a1), so those are extended with a UUID derived from them
+RUNTIME_SESSION_MIN_LENGTH = 33
+RUNTIME_SESSION_MAX_LENGTH = 256
+SESSION_NAMESPACE = uuid.UUID('6f1c2b0e-4d8a-5e3f-9b7c-2a1d0e9f8c7b')
+
+# Accept-Encoding of the current invocation
+accept_encoding_var = contextvars.ContextVar('accept_encoding', default=None)
+
+# AgentCore client, created on first use and shared across warm invocations
+_agentcore_client = None
+_client_lock = threading.Lock()
+
+
+def get_agentcore_client():
+    """Return the shared AgentCore client, creating it on first use"""
+    global _agentcore_client
+    if _agentcore_client is None:
+        with _client_lock:
+            if _agentcore_client is None:
+                import boto3
+                from botocore.config import Config
+                _agentcore_client = boto3.client(
+                    'bedrock-agentcore',
+                    region_name='us-east-1',
+                    config=Config(
+                        max_pool_connections=25,
+                        connect_timeout=3,
+                        read_timeout=29,  # stay inside the API Gateway integration timeout
+                        retries={'max_attempts': 2, 'mode': 'adaptive'}
+                    )
+                )
+    return _agentcore_client
+
+
+def set_agentcore_client(client):
+    """Inject an AgentCore client (stubs in tests and benchmarks)"""
+    global _agentcore_client
+    _agentcore_client = client
+
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key',
+    'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
+}
+
+SSE_HEADERS = {
+    'Content-Type': 'text/event-stream',
+    'Cache-Control': 'no-cache'
+}
+
+
+def json_dumps_bytes(value, default=None):
+    """Encode JSON with orjson when available; values it rejects fall back to json"""
+    if USE_ORJSON:
+        try:
+            return orjson.dumps(value, default=default, option=orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(value, default=default).encode('utf-8')
+
+
+def json_dumps(value, default=None):
+    if USE_ORJSON:
+        return json_dumps_bytes(value, default).decode('utf-8')
+    return json.dumps(value, default=default)
+
+
+def json_loads(data):
+    """Decode JSON from str or UTF-8 bytes"""
+    return orjson.loads(data) if USE_ORJSON else json.loads(data)
+
+
+def accepted_encoding(accept_encoding):
+    """Best encoding the client accepts ('br', 'gzip'), or None for identity"""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.lower().split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    wildcard = accepted.get('*', 0.0)
+    for encoding in (('br', 'gzip') if brotli is not None else ('gzip',)):
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def compress_response(response):
+    """Compress a large response body for a client that accepts it (base64, as API Gateway expects)"""
+    body = response['body']
+    encoding = accepted_encoding(accept_encoding_var.get())
+    if not RESPONSE_COMPRESSION or encoding is None or len(body) < COMPRESSION_MIN_BYTES:
+        return response
+    
+    data = body.encode('utf-8') if isinstance(body, str) else body
+    if encoding == 'br':
+        compressed = brotli.compress(data, quality=COMPRESSION_LEVEL)
+    else:
+        compressed = gzip.compress(data, compresslevel=COMPRESSION_LEVEL, mtime=0)
+    if len(compressed) >= len(data):
+        return response
+    return {
+        **response,
+        'headers': {**response['headers'], 'Content-Encoding': encoding, 'Vary': 'Accept-Encoding'},
+        'body': base64.b64encode(compressed).decode('ascii'),
+        'isBase64Encoded': True
+    }
+
+
+def header(event, name):
+    """A request header, whatever its case"""
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+class LazyJson:
+    """Defers JSON encoding until the log record is actually formatted"""
+    __slots__ = ('value',)
+    
+    def __init__(self, value):
+        self.value = value
+    
+    def __str__(self):
+        return json_dumps(self.value, default=str)
+
+
+def log_payload(message, payload, redact_keys=()):
+    """Sampled DEBUG log of a payload, with passenger text fields redacted"""
+    if logger.isEnabledFor(logging.DEBUG) and random.random() < PAYLOAD_SAMPLE_RATE:
+        if redact_keys and isinstance(payload, dict):
+            payload = {key: (f"<redacted len={len(str(value))}>" if key in redact_keys else value)
+                       for key, value in payload.items()}
+        logger.debug("%s: %s", message, LazyJson(payload))
+
+
+def emit_metric(operation, elapsed_ms, error=False):
+    """Write one EMF latency record to stdout, tagged with the request ID"""
+    if not METRICS_ENABLED:
+        return
+    print(json_dumps({
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [['Operation']],
+                'Metrics': [
+                    {'Name': 'Latency', 'Unit': 'Milliseconds'},
+                    {'Name': 'Errors', 'Unit': 'Count'}
+                ]
+            }]
+        },
+        'Operation': operation,
+        'Latency': round(elapsed_ms, 3),
+        'Errors': int(error),
+        'RequestId': request_id_var.get()
+    }), flush=True)
+
 
 def respond(status_code, body):
     """Build API Gateway response with CORS headers"""
-    return {
+    headers = {'Content-Type': 'application/json', **CORS_HEADERS}
+    request_id = request_id_var.get()
+    if request_id:
+        headers['X-Request-Id'] = request_id
+    return compress_response({
         'statusCode': status_code,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key',
-            'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
-        },
-        'body': json.dumps(body)
-    }
+        'headers': headers,
+        'body': json_dumps(body)
+    })
 
 
 def handler(event, context):
     """
     Main Lambda handler - routes requests to AgentCore Runtime
     """
-    print(f"Event: {json.dumps(event)}")
+    request_id = (event.get('requestContext') or {}).get('requestId') or str(uuid.uuid4())
+    request_id_var.set(request_id)
+    deadline_var.set(time.monotonic() + request_budget(context))
+    accept_encoding_var.set(header(event, 'accept-encoding'))
+    
+    start = time.perf_counter()
+    response = route(event)
+    emit_metric(f"{event.get('httpMethod', 'GET')} {event.get('path', '')}",
+                (time.perf_counter() - start) * 1000, response['statusCode'] >= 500)
+    return response
+
+
+def request_budget(context):
+    """Seconds this invocation has: the API Gateway timeout or the Lambda time left, if shorter"""
+    remaining_ms = getattr(context, 'get_remaining_time_in_millis', None)
+    if callable(remaining_ms):
+        return min(API_TIMEOUT_SECONDS, remaining_ms() / 1000)
+    return API_TIMEOUT_SECONDS
+
+
+def route(event):
+    """Dispatch an API Gateway event to the matching route"""
+    log_payload("Event", event, redact_keys=('body',))
     
     # Handle CORS preflight
     if event.get('httpMethod') == 'OPTIONS':
@@ -40,19 +276,23 @@ def handler(event, context):
     
     # Parse request
     try:
-        body = json.loads(event.get('body', '{}'))
+        body = json_loads(event.get('body') or '{}')
     except json.JSONDecodeError:
         return respond(400, {'error': 'Invalid JSON'})
+    if not isinstance(body, dict):
+        return respond(400, {'error': 'Request body must be a JSON object'})
     
     path = event.get('path', '')
     method = event.get('httpMethod', 'GET')
     
-    print(f"Request: {method} {path}")
-    print(f"Body: {json.dumps(body)}")
+    logger.info("Request: %s %s request_id=%s", method, path, request_id_var.get())
+    log_payload("Body", body, redact_keys=('message',))
     
     # Route to appropriate handler
     if path in ['/chat', '/chatv2'] and method == 'POST':
         return handle_chat(body)
+    elif path in ['/chat/stream', '/chatv2/stream'] and method == 'POST':
+        return handle_chat_stream(body)
     elif path in ['/health', '/chatv2/health'] and method == 'GET':
         return respond(200, {'status': 'healthy', 'agent': 'agentcore-runtime'})
     else:
@@ -64,69 +304,238 @@ def handle_chat(body):
     Handle chat requests by invoking AgentCore Runtime
     """
     try:
-        # Extract parameters
         message = body.get('message', '')
-        # session_id = body.get('sessionId', str(uuid.uuid4()))
-        context = body.get('context', {})
         
         if not message:
             return respond(400, {'error': 'Message is required'})
         
-        # Build payload for AgentCore
-        payload = {
-            'message': message,
-            # 'sessionId': session_id,
-            'context': context
-        }
-        
-        # print(f"Invoking AgentCore with session: {session_id}")
-        
-        # Invoke AgentCore Runtime
-        response = agentcore_client.invoke_agent_runtime(
-            agentRuntimeArn=AGENT_ARN,
-            # runtimeSessionId=session_id,
-            payload=json.dumps(payload).encode('utf-8'),
-            qualifier='DEFAULT'
-        )
+        session_id = session_id_for(body)
+        response = invoke_agent(body, session_id)
         
         # Parse response
-        content = []
+        parser = AgentResponseParser(response.get('contentType', ''))
         for chunk in response.get('response', []):
-            content.append(chunk.decode('utf-8'))
-        
-        result = json.loads(''.join(content))
-        
-        print(f"AgentCore response: {json.dumps(result)}")
+            parser.feed(chunk)
+        result = parser.close()
         
-        # Extract text from response
-        response_text = result.get('response', '')
-        
-        # Handle different response formats
-        if isinstance(response_text, dict):
-            # Response is a dict with role/content structure
-            if 'content' in response_text and isinstance(response_text['content'], list):
-                # Extract text from content array
-                text_parts = [item.get('text', '') for item in response_text['content'] if 'text' in item]
-                response_text = ' '.join(text_parts)
-            elif 'text' in response_text:
-                response_text = response_text['text']
+        log_payload("AgentCore response", result, redact_keys=('response',))
         
         # Return formatted response matching frontend expectations
-        return respond(200, {
-            'assistant': response_text,
-            # 'sessionId': session_id,
-            'timestamp': result.get('timestamp'),
-            'source': result.get('source', 'agentcore-runtime'),
-            'citations': [],  # TODO: Extract citations if available
-            'piiDetected': False  # TODO: Add PII detection
-        })
+        return respond(200, chat_reply(result, session_id))
     
     except Exception as e:
-        print(f"Error invoking AgentCore: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error invoking AgentCore: %s", e)
         
         return respond(500, {
             'error': 'Failed to invoke agent',
             'message': str(e)
         })
+
+
+def handle_chat_stream(body):
+    """
+    Streaming variant of handle_chat for API Gateway. API Gateway buffers the
+    body, so the events arrive together here; hosts that support streaming
+    (Lambda Web Adapter, stream_server.py) should iterate stream_chat() instead.
+    """
+    if not body.get('message'):
+        return respond(400, {'error': 'Message is required'})
+    
+    return compress_response({
+        'statusCode': 200,
+        'headers': {**SSE_HEADERS, **CORS_HEADERS},
+        'body': ''.join(stream_chat(body))
+    })
+
+
+def stream_chat(body):
+    """
+    Invoke AgentCore and yield Server-Sent Events as chunks arrive:
+    'delta' events carry text as soon as it is available, a final 'done'
+    event carries the same payload handle_chat returns.
+    """
+    message = body.get('message', '')
+    
+    if not message:
+        yield sse_event('error', {'error': 'Message is required'})
+        return
+    
+    session_id = session_id_for(body)
+    try:
+        response = invoke_agent(body, session_id)
+        parser = AgentResponseParser(response.get('contentType', ''))
+        for chunk in response.get('response', []):
+            delta = parser.feed(chunk)
+            if delta:
+                yield sse_event('delta', {'text': delta})
+        result = parser.close()
+    except Exception as e:
+        logger.exception("Error streaming from AgentCore: %s", e)
+        yield sse_event('error', {'error': 'Failed to invoke agent', 'message': str(e)})
+        return
+    
+    yield sse_event('done', chat_reply(result, session_id))
+
+
+def session_id_for(body):
+    """Conversation session ID sent by the frontend, or a new one for a first message"""
+    return body.get('sessionId') or str(uuid.uuid4())
+
+
+def runtime_session_id(session_id):
+    """
+    AgentCore runtime session ID for a client session ID. Compliant IDs pass through;
+    others map to a stable one, so every turn of a conversation reaches the same session.
+    """
+    if RUNTIME_SESSION_MIN_LENGTH <= len(session_id) <= RUNTIME_SESSION_MAX_LENGTH:
+        return session_id
+    derived = str(uuid.uuid5(SESSION_NAMESPACE, session_id))
+    if len(session_id) > RUNTIME_SESSION_MAX_LENGTH:
+        return derived
+    return f"{session_id}-{derived}"
+
+
+def invoke_agent(body, session_id):
+    """
+    Call AgentCore Runtime with the chat payload; returns the raw streaming response.
+    Turns sharing a session ID reach the same runtime session and agent-side state.
+    """
+    session_id = runtime_session_id(session_id)
+    payload = {
+        'message': body.get('message', ''),
+        'sessionId': session_id,
+        'context': body.get('context', {}),
+        'requestId': request_id_var.get()
+    }
+    deadline = deadline_var.get()
+    if deadline is not None:
+        payload['timeoutSeconds'] = round(max(0.0, deadline - time.monotonic()), 3)
+    
+    logger.info("Invoking AgentCore with session: %s", session_id)
+    
+    # Measures until the response stream opens; body chunks are consumed by the caller
+    start = time.perf_counter()
+    try:
+        response = get_agentcore_client().invoke_agent_runtime(
+            agentRuntimeArn=AGENT_ARN,
+            runtimeSessionId=session_id,
+            payload=json_dumps_bytes(payload),
+            qualifier='DEFAULT'
+        )
+    except Exception:
+        emit_metric('invoke_agent_runtime', (time.perf_counter() - start) * 1000, True)
+        raise
+    emit_metric('invoke_agent_runtime', (time.perf_counter() - start) * 1000)
+    return response
+
+
+def chat_reply(result, session_id=None):
+    """Build the frontend chat payload from a parsed AgentCore result"""
+    return {
+        'assistant': extract_response_text(result),
+        'sessionId': session_id,
+        'timestamp': result.get('timestamp'),
+        'source': result.get('source', 'agentcore-runtime'),
+        'citations': result.get('citations', []),
+        'piiDetected': False  # TODO: Add PII detection
+    }
+
+
+def extract_response_text(result):
+    """Flatten the different AgentCore response formats to plain text"""
+    response_text = result.get('response', '')
+    
+    if isinstance(response_text, dict):
+        # Response is a dict with role/content structure
+        if 'content' in response_text and isinstance(response_text['content'], list):
+            # Extract text from content array
+            text_parts = [item.get('text', '') for item in response_text['content'] if 'text' in item]
+            response_text = ' '.join(text_parts)
+        elif 'text' in response_text:
+            response_text = response_text['text']
+    
+    return response_text
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json_dumps(data)}\n\n"
+
+
+class AgentResponseParser:
+    """
+    Incremental parser for AgentCore response chunks.
+    
+    Event-stream responses are split into 'data:' lines as bytes arrive, so
+    text deltas can be forwarded immediately; multi-byte UTF-8 characters split
+    across chunk boundaries are handled by an incremental decoder. Plain JSON
+    responses are kept as raw bytes and parsed once at close().
+    """
+    
+    def __init__(self, content_type=''):
+        self.streaming = 'text/event-stream' in (content_type or '')
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._raw = []
+        self._pending = ''
+        self._text = []
+        self._citations = []
+        self._final = None
+    
+    def feed(self, chunk):
+        """Consume one chunk; returns any newly available response text"""
+        if not self.streaming:
+            self._raw.append(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            return ''
+        
+        text = self._decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        self._pending += text
+        lines = self._pending.split('\n')
+        self._pending = lines.pop()
+        return ''.join(self._consume_line(line) for line in lines)
+    
+    def close(self):
+        """Finish parsing and return the result dict"""
+        if not self.streaming:
+            raw = b''.join(self._raw)
+            return json_loads(raw) if raw.strip() else {}
+        
+        self._pending += self._decoder.decode(b'', final=True)
+        if self._pending:
+            self._consume_line(self._pending)
+            self._pending = ''
+        
+        result = dict(self._final or {})
+        if self._text and not result.get('response'):
+            result['response'] = ''.join(self._text)
+        if self._citations and 'citations' not in result:
+            result['citations'] = self._citations
+        return result
+    
+    def _consume_line(self, line):
+        line = line.rstrip('\r')
+        if not line.startswith('data:'):
+            return ''
+        data = line[5:].strip()
+        if not data:
+            return ''
+        try:
+            event = json_loads(data)
+        except json.JSONDecodeError:
+            self._text.append(data)
+            return data
+        
+        if not isinstance(event, dict):
+            text = str(event)
+            self._text.append(text)
+            return text
+        
+        self._citations.extend(event.get('citations', []))
+        if 'response' in event:
+            # Complete result object
+            self._final = event
+            return '' if self._text else extract_response_text(event)
+        
+        text = event.get('delta') or event.get('text') or ''
+        if text:
+            self._text.append(text)
+        return text
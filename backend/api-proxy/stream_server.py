@@ -0,0 +1,66 @@
+"""
+Local streaming host for the chat proxy
+Serves POST /chat/stream as chunked Server-Sent Events so deltas reach the
+browser as AgentCore produces them (API Gateway REST APIs buffer responses).
+
+Usage:
+    python stream_server.py [--port 3001]
+"""
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from handler import CORS_HEADERS, SSE_HEADERS, stream_chat
+
+
+class StreamHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_OPTIONS(self):
+        self.send_response(200)
+        for name, value in CORS_HEADERS.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        if self.path not in ('/chat/stream', '/chatv2/stream'):
+            self.send_error(404)
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except json.JSONDecodeError:
+            self.send_error(400, 'Invalid JSON')
+            return
+        if not isinstance(body, dict):
+            self.send_error(400, 'Request body must be a JSON object')
+            return
+
+        self.send_response(200)
+        for name, value in {**SSE_HEADERS, **CORS_HEADERS}.items():
+            self.send_header(name, value)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        for event in stream_chat(body):
+            data = event.encode('utf-8')
+            self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local streaming chat proxy')
+    parser.add_argument('--port', type=int, default=3001)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), StreamHandler)
+    print(f"Streaming chat proxy at http://127.0.0.1:{args.port}/chat/stream")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
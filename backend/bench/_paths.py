@@ -0,0 +1,13 @@
+"""
+Put the agent runtime and API proxy sources on sys.path for benchmarks
+"""
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AGENT_SRC_DIR = os.path.join(BACKEND_DIR, 'agent', 'agentcoreCreateManually', 'src')
+API_PROXY_DIR = os.path.join(BACKEND_DIR, 'api-proxy')
+
+for path in (AGENT_SRC_DIR, API_PROXY_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
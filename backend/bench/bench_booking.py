@@ -0,0 +1,192 @@
+"""
+Benchmark: seat holds and idempotent confirm_booking under contention.
+Many passengers race for a few flights, half holding seats before confirming and
+some retrying their confirmation, across threads (in-memory store) and processes
+(shared SQLite store). Reports confirmations per second and optimistic-concurrency
+conflicts, and checks that no flight is oversold, every retry got its original PNR
+and lapsed holds give their seats back.
+
+Usage:
+    python bench_booking.py [--passengers 4000] [--flights 20] [--seats 100] [--threads 8] [--processes 4]
+"""
+import argparse
+import collections
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import _paths  # noqa: F401
+
+os.environ.setdefault('LOG_LEVEL', 'CRITICAL')
+os.environ.setdefault('METRICS_FLUSH_INTERVAL_SECONDS', '3600')
+
+from lib import metrics  # noqa: E402
+from lib.booking import BOOKINGS, INVENTORY, BookingEngine, BookingError, MemoryBookingStore, SqliteBookingStore  # noqa: E402
+from lib.log import configure_logging  # noqa: E402
+
+# Share of passengers who hold seats before confirming, and who retry their confirmation
+HOLD_RATE = 0.5
+RETRY_RATE = 0.1
+
+
+def workload(passengers: int, flights: int, seed: int = 3) -> list:
+    """
+    (passenger, flights, holds first, retries) per passenger; a third connect over two flights
+    """
+    rng = random.Random(seed)
+    names = [f"XX{n:04d}" for n in range(flights)]
+    result = []
+    for n in range(passengers):
+        legs = rng.sample(names, 2) if rng.random() < 1 / 3 else [rng.choice(names)]
+        result.append((f"PAX{n:06d}", legs, rng.random() < HOLD_RATE, rng.random() < RETRY_RATE))
+    return result
+
+
+def book(engine: BookingEngine, passenger: tuple) -> tuple:
+    """
+    One passenger's hold (maybe), confirmation and retry (maybe): (outcome, replay matched)
+    """
+    passenger_id, flights, holds, retries = passenger
+    key = f"{passenger_id}|A"
+    try:
+        hold_id = engine.hold(passenger_id, flights)['hold_id'] if holds else None
+        booking = engine.confirm(passenger_id, 'A', flights, key, hold_id)
+    except BookingError as e:
+        return e.code, None
+    if not retries:
+        return 'CONFIRMED', None
+    replay = engine.confirm(passenger_id, 'A', flights, key, hold_id)
+    return 'CONFIRMED', replay['pnr'] == booking['pnr'] and replay.get('replayed', False)
+
+
+def conflicts() -> int:
+    return metrics.snapshot()['counters'].get('booking.conflicts', 0)
+
+
+def run_slice(path: str, seats: int, passengers: list) -> tuple:
+    """
+    Process worker: book a slice of passengers against the shared SQLite store
+    """
+    configure_logging('CRITICAL')
+    metrics.configure_metrics(True)
+    engine = BookingEngine(SqliteBookingStore(path), default_seats=seats)
+    outcomes = [book(engine, passenger) for passenger in passengers]
+    return outcomes, conflicts()
+
+
+def summarize(name: str, elapsed: float, outcomes: list, conflict_count: int, booked: dict, available: dict, seats: int):
+    codes = collections.Counter(code for code, _ in outcomes)
+    replays = [matched for _, matched in outcomes if matched is not None]
+    oversold = sum(max(0, count - seats) for count in booked.values())
+    consistent = all(booked.get(flight, 0) + available[flight] == seats for flight in available)
+    print(f"  {name:24}{codes['CONFIRMED'] / elapsed:10.0f}{codes['CONFIRMED']:10d}{codes['SOLD_OUT']:10d}"
+          f"{codes['CONTENTION']:10d}{conflict_count:11d}{oversold:10d}"
+          f"{'yes' if consistent else 'NO':>12}{sum(replays):>6d}/{len(replays):<6d}")
+
+
+def seats_booked(bookings) -> dict:
+    booked = collections.Counter()
+    for booking in bookings:
+        booked.update(dict.fromkeys(booking['flights'], 1))
+    return booked
+
+
+def threaded(passengers: list, seats: int, threads: int):
+    store = MemoryBookingStore()
+    engine = BookingEngine(store, default_seats=seats)
+    metrics.reset()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        outcomes = list(pool.map(lambda passenger: book(engine, passenger), passengers))
+    elapsed = time.perf_counter() - start
+
+    items = store._items
+    booked = seats_booked(item for (table, _), item in items.items() if table == BOOKINGS)
+    available = {key: item['available'] for (table, key), item in items.items() if table == INVENTORY}
+    summarize(f"threads x{threads} (memory)", elapsed, outcomes, conflicts(), booked, available, seats)
+
+
+def processes(passengers: list, seats: int, count: int):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bookings.db')
+        SqliteBookingStore(path)
+        context = multiprocessing.get_context('spawn')
+        slices = [passengers[n::count] for n in range(count)]
+        with ProcessPoolExecutor(max_workers=count, mp_context=context) as pool:
+            pool.submit(configure_logging, 'CRITICAL').result()  # start workers before timing
+            start = time.perf_counter()
+            results = list(pool.map(run_slice, [path] * count, [seats] * count, slices))
+            elapsed = time.perf_counter() - start
+
+        db = sqlite3.connect(path)
+        rows = db.execute('SELECT tbl, key, value FROM items WHERE tbl IN (?, ?)', (BOOKINGS, INVENTORY)).fetchall()
+        db.close()
+    booked = seats_booked(json.loads(value) for table, _, value in rows if table == BOOKINGS)
+    available = {key: json.loads(value)['available'] for table, key, value in rows if table == INVENTORY}
+    outcomes = [outcome for slice_outcomes, _ in results for outcome in slice_outcomes]
+    summarize(f"processes x{count} (SQLite)", elapsed, outcomes, sum(count for _, count in results),
+              booked, available, seats)
+
+
+def expiry(seats: int):
+    """
+    Abandoned holds fill a flight; once they lapse, confirmations get the seats back
+    """
+    now = [1000.0]
+    engine = BookingEngine(default_seats=seats, hold_ttl=600, clock=lambda: now[0])
+    for n in range(seats):
+        engine.hold(f"GONE{n}", ['XX0001'])
+    try:
+        engine.confirm('LATE0', 'A', ['XX0001'], 'LATE0|A')
+        before = 'confirmed'
+    except BookingError as e:
+        before = e.code
+    now[0] += 601
+    confirmed = 0
+    for n in range(seats + 1):
+        try:
+            engine.confirm(f"LATE{n}", 'A', ['XX0001'], f"LATE{n}|A")
+            confirmed += 1
+        except BookingError:
+            pass
+    print(f"\n{seats} abandoned holds on a {seats}-seat flight: next confirm {before}; after the "
+          f"{engine.hold_ttl:.0f}s TTL {confirmed}/{seats + 1} confirms succeed, {engine.available('XX0001')} seats left")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--passengers', type=int, default=4000)
+    parser.add_argument('--flights', type=int, default=20)
+    parser.add_argument('--seats', type=int, default=100, help='seats per flight')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--processes', type=int, default=4)
+    args = parser.parse_args()
+
+    configure_logging('CRITICAL')
+    metrics.configure_metrics(True)
+    passengers = workload(args.passengers, args.flights)
+    demand = sum(len(flights) for _, flights, _, _ in passengers)
+    print(f"{args.passengers} passengers, {demand} seat requests for {args.flights} flights x {args.seats} seats "
+          f"({demand / (args.flights * args.seats):.1f}x oversubscribed); "
+          f"{HOLD_RATE:.0%} hold first, {RETRY_RATE:.0%} retry confirm")
+    print(f"  {'':24}{'conf/s':>10}{'confirmed':>10}{'sold out':>10}{'gave up':>10}{'conflicts':>11}"
+          f"{'oversold':>10}{'consistent':>12}{'same PNR':>13}")
+
+    # Before: every confirm_booking mints a PNR, whatever is left on the flight
+    booked = seats_booked({'flights': flights} for _, flights, _, _ in passengers)
+    oversold = sum(max(0, count - args.seats) for count in booked.values())
+    print(f"  {'no inventory (before)':24}{'':>10}{len(passengers):10d}{0:10d}{0:10d}{0:11d}{oversold:10d}"
+          f"{'-':>12}{'new PNR':>13}")
+
+    threaded(passengers, args.seats, args.threads)
+    processes(passengers, args.seats, args.processes)
+    expiry(args.seats)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark: broadcasting one disruption notice to a manifest, per-passenger translate_message vs. broadcast_notification.
+The broadcast translates each distinct language once and fills passenger fields afterwards.
+
+Usage:
+    python bench_broadcast.py [--passengers 1000] [--languages 10] [--latency 0.05]
+"""
+import argparse
+import json
+import random
+import time
+
+import _paths  # noqa: F401
+from stubs import StubTranslate
+
+import main as agent
+from lib.broadcast import fill
+from lib.clients import set_client
+from lib.log import configure_logging
+
+LANGUAGES = ['en', 'de', 'es', 'fr', 'it', 'ja', 'pt-BR', 'zh', 'ko', 'nl', 'ar', 'hi']
+TEMPLATE = ("Dear {first_name}, flight {flight_number} to {destination} has been cancelled. "
+            "You have been rebooked on {new_flight}, departing {departure} from gate {gate}.\n"
+            "Your booking reference is {pnr}. We apologise for the disruption.")
+
+
+class MarkerDroppingTranslate(StubTranslate):
+    """
+    Translate stand-in that mangles placeholder markers, forcing the fallback path
+    """
+
+    def translate_text(self, Text, SourceLanguageCode, TargetLanguageCode):
+        response = super().translate_text(Text, SourceLanguageCode, TargetLanguageCode)
+        response['TranslatedText'] = response['TranslatedText'].replace('[[', '(').replace(']]', ')')
+        return response
+
+
+def manifest(count: int, languages: int, seed: int = 3) -> list:
+    rng = random.Random(seed)
+    names = ['Ana', 'Ben', 'Chen', 'Dara', 'Emil', 'Fatima', 'Goro', 'Hana', 'Ivan', 'Jonas']
+    return [{
+        'passenger_id': f"P-{n:05d}",
+        'first_name': rng.choice(names),
+        'language': rng.choice(LANGUAGES[:languages]),
+        'new_flight': f"UA{rng.randrange(100, 999)}",
+        'departure': f"{rng.randrange(6, 23):02d}:{rng.choice(['00', '15', '30', '45'])}",
+        'pnr': f"PNR-{n:06d}",
+    } for n in range(count)]
+
+
+def broadcast(passengers):
+    event = {'toolName': 'broadcast_notification', 'toolInput': {
+        'template': TEMPLATE, 'passengers': passengers,
+        'fields': {'flight_number': 'UA1234', 'destination': 'San Francisco', 'gate': 'B12'}}}
+    return json.loads(agent.handler(event, None)['body'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--passengers', type=int, default=1000)
+    parser.add_argument('--languages', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--sample', type=int, default=50, help='passengers timed for the per-passenger baseline')
+    args = parser.parse_args()
+    configure_logging('WARNING')
+    agent.USE_TRANSLATE = True
+    passengers = manifest(args.passengers, args.languages)
+    shared = {'flight_number': 'UA1234', 'destination': 'San Francisco', 'gate': 'B12'}
+
+    # Baseline: fill each passenger's message, then one translate_message call each
+    stub = StubTranslate(latency=args.latency)
+    set_client('translate', stub)
+    agent.translation_memory = None
+    agent.USE_TRANSLATION_MEMORY = False
+    start = time.perf_counter()
+    for passenger in passengers[:args.sample]:
+        if passenger['language'] != 'en':
+            agent.translate_message(fill(TEMPLATE, {**shared, **passenger}), passenger['language'], 'en')
+    per_passenger = (time.perf_counter() - start) / args.sample * args.passengers
+    baseline_calls = stub.calls * args.passengers / args.sample
+
+    stub = StubTranslate(latency=args.latency)
+    set_client('translate', stub)
+    start = time.perf_counter()
+    result = broadcast(passengers)
+    elapsed = time.perf_counter() - start
+    assert result['success'] and result['count'] == args.passengers, result
+
+    print(f"{args.passengers} passengers, {len(result['languages'])} languages, "
+          f"{args.latency * 1000:.0f} ms per Translate call\n")
+    print(f"per-passenger translate_message  {per_passenger:8.2f} s  ~{baseline_calls:5.0f} Translate calls "
+          f"(extrapolated from {args.sample})")
+    print(f"broadcast_notification           {elapsed:8.2f} s  {stub.calls:6d} Translate calls, "
+          f"{stub.characters} characters")
+
+    agent.USE_TRANSLATION_MEMORY = True
+    agent.translation_memory = None
+    broadcast(passengers)
+    calls = stub.calls
+    start = time.perf_counter()
+    broadcast(passengers)
+    print(f"repeat with translation memory   {time.perf_counter() - start:8.2f} s  "
+          f"{stub.calls - calls:6d} Translate calls")
+
+    german = next(m for m in result['messages'] if m['language'] == 'de')
+    print(f"\nsample ({german['passenger_id']}, de): {german['message'][:110]}...")
+    unfilled = sum('{' in m['message'] for m in result['messages'])
+    print(f"messages with unfilled placeholders: {unfilled}")
+
+    agent.USE_TRANSLATION_MEMORY = False
+    agent.translation_memory = None
+    stub = MarkerDroppingTranslate(latency=args.latency)
+    set_client('translate', stub)
+    mangled = broadcast(passengers)
+    print(f"markers mangled by translation:  {stub.calls} calls, failed languages {mangled['failed_languages']}, "
+          f"unfilled placeholders {sum('{' in m['message'] for m in mangled['messages'])}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark: bulk manifest rebooking vs. one generate_flight_options call per passenger.
+
+Usage:
+    python bench_bulk_rebooking.py [--passengers 500] [--flights 100000]
+"""
+import argparse
+import datetime
+import random
+import time
+
+import _paths  # noqa: F401
+from schedule import synthetic_schedule
+
+import lib.rebooking as rebooking
+from lib.booking import BookingEngine, schedule_capacity
+from lib.inventory import FlightIndex, set_flight_index
+from lib.passengers import generate_flight_options
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--passengers', type=int, default=500)
+    parser.add_argument('--flights', type=int, default=100_000)
+    args = parser.parse_args()
+
+    start = datetime.datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    index = FlightIndex.from_records(synthetic_schedule(args.flights, start=start))
+    set_flight_index(index)
+
+    rng = random.Random(3)
+    manifest = [{
+        'passenger_id': f"P{n:04d}",
+        'tier': rng.choices(['Platinum', 'Gold', 'Silver', 'General'], weights=[5, 15, 30, 50])[0],
+        'constraints': rng.choice([[], [], ['max_stops_0'], [f"arrive_before_{rng.randrange(12, 23)}_00"],
+                                   ['min_cabin_business']]),
+    } for n in range(args.passengers)]
+
+    t = time.perf_counter()
+    for passenger in manifest:
+        generate_flight_options('FRA', 'JFK', passenger['tier'], 5, departure_after=start)
+    per_passenger = time.perf_counter() - t
+
+    modes = [('numpy', rebooking.np), ('python', None)] if rebooking.np is not None else [('python', None)]
+    for label, np in modes:
+        rebooking.np = np
+        t = time.perf_counter()
+        result = rebooking.rebook_manifest(index, 'FRA', 'JFK', manifest, departure_after=start)
+        elapsed = time.perf_counter() - t
+        print(f"bulk ({label}):  {elapsed * 1000:8.1f} ms  placed {len(result['assignments'])}, "
+              f"unplaced {len(result['unplaced'])}, candidates {len(result['options'])}")
+
+    # Same allocation, holding every assigned seat in the booking engine
+    engine = BookingEngine(capacity=schedule_capacity(index, 9))
+    t = time.perf_counter()
+    result = rebooking.rebook_manifest(index, 'FRA', 'JFK', manifest, departure_after=start, engine=engine)
+    elapsed = time.perf_counter() - t
+    assert all('@' in flight for a in result['assignments'] for flight in a['flights'])
+    assert all(a['hold_id'] for a in result['assignments'])
+    wants_business = {p['passenger_id'] for p in manifest if 'min_cabin_business' in p['constraints']}
+    assert all(a['class'] in ('Business', 'First') for a in result['assignments'] if a['passenger_id'] in wants_business)
+    oversold = [f for f in {f for a in result['assignments'] for f in a['flights']} if engine.available(f) < 0]
+    assert not oversold, oversold
+    print(f"bulk + holds:  {elapsed * 1000:8.1f} ms  placed {len(result['assignments'])}, "
+          f"unplaced {len(result['unplaced'])}")
+
+    print(f"per-passenger loop: {per_passenger * 1000:8.1f} ms (no shared seat inventory)")
+
+
+if __name__ == '__main__':
+    main()
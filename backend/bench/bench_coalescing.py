@@ -0,0 +1,151 @@
+"""
+Benchmark: N concurrent identical knowledge base / translate calls with and without
+single-flight coalescing. Asserts that coalesced bursts reach the backend exactly once.
+
+Usage:
+    python bench_coalescing.py [--callers 50] [--latency 0.3]
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import _paths  # noqa: F401
+from stubs import StubBedrockAgent, StubTranslate
+
+from lib import bedrock, translate
+from lib.clients import set_client
+from lib.log import configure_logging
+from lib.request_context import deadline
+from lib.resilience import DeadlineExceeded
+from lib.singleflight import SingleFlight
+
+QUESTION = "What compensation applies to a cancelled flight over 3,500 km?"
+NOTICE = "Your flight has been cancelled. We have rebooked you on the next available departure."
+
+
+def burst(func, callers):
+    """
+    Start `callers` threads at once; returns (wall seconds, results or exceptions)
+    """
+    def call(_):
+        try:
+            return func()
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(call, range(callers)))
+    return time.perf_counter() - start, results
+
+
+def run(label, stub, func, callers, coalesce):
+    bedrock.USE_REQUEST_COALESCING = translate.USE_REQUEST_COALESCING = coalesce
+    stub.calls = 0
+    elapsed, results = burst(func, callers)
+    errors = sum(isinstance(r, Exception) for r in results)
+    print(f"  {label:<34} coalesce={str(coalesce):<5} backend calls {stub.calls:4d}  "
+          f"wall {elapsed * 1000:7.0f} ms  errors {errors}")
+    return stub.calls, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--callers', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.3)
+    args = parser.parse_args()
+    configure_logging('WARNING')
+
+    kb = StubBedrockAgent(latency=args.latency)
+    set_client('bedrock-agent-runtime', kb)
+    ask = lambda: bedrock.query_knowledge_base(QUESTION, 'KB')  # noqa: E731
+
+    print(f"{args.callers} concurrent identical calls, {args.latency * 1000:.0f} ms backend latency\n")
+    run("query_knowledge_base", kb, ask, args.callers, False)
+    calls, results = run("query_knowledge_base", kb, ask, args.callers, True)
+    assert calls == 1, calls
+    assert all(r['answer'] == kb.answer for r in results)
+
+    # Completed calls are not reused
+    kb.calls = 0
+    ask()
+    ask()
+    assert kb.calls == 2, kb.calls
+
+    kb.error = 'ThrottlingException'
+    calls, results = run("query_knowledge_base (failing)", kb, ask, args.callers, True)
+    assert calls == 1 and all(isinstance(r, RuntimeError) for r in results)
+    kb.error = None
+
+    tr = StubTranslate(latency=args.latency)
+    set_client('translate', tr)
+    say = lambda: translate.translate_text(NOTICE, 'en', 'de')  # noqa: E731
+    run("translate_text", tr, say, args.callers, False)
+    calls, _ = run("translate_text", tr, say, args.callers, True)
+    assert calls == 1, calls
+
+    # asyncio callers on one loop share a single worker-thread request
+    flight = SingleFlight('bench')
+    kb.calls = 0
+
+    async def gather():
+        return await asyncio.gather(*[
+            flight.do_async(QUESTION, bedrock._query_knowledge_base, QUESTION, 'KB') for _ in range(args.callers)
+        ])
+
+    start = time.perf_counter()
+    results = asyncio.run(gather())
+    print(f"  {'do_async (asyncio.gather)':<34} coalesce=True  backend calls {kb.calls:4d}  "
+          f"wall {(time.perf_counter() - start) * 1000:7.0f} ms  errors 0")
+    assert kb.calls == 1 and len(results) == args.callers
+
+    # Followers keep their own deadlines: one that cannot wait for the leader gives up at its
+    # deadline; one with time left re-runs a call whose leader ran out of budget
+    deadlines = SingleFlight('bench.deadlines')
+
+    def slow(seconds):
+        time.sleep(seconds)
+        return {'answer': 'late'}
+
+    def leader_out_of_budget(seconds):
+        time.sleep(seconds)
+        raise DeadlineExceeded('leader budget spent')
+
+    def follow(budget, func, seconds):
+        # Pool threads are reused: set this call's deadline outright rather than narrowing the last one
+        deadline.set(time.monotonic() + budget)
+        try:
+            return deadlines.do('key', func, seconds)
+        except DeadlineExceeded as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(follow, 10, slow, args.latency)
+        time.sleep(0.05)
+        start = time.perf_counter()
+        impatient = pool.submit(follow, args.latency / 3, slow, args.latency).result()
+        waited = time.perf_counter() - start
+        assert isinstance(impatient, DeadlineExceeded) and waited < args.latency * 2 / 3, waited
+        assert leader.result() == {'answer': 'late'}
+
+        leader = pool.submit(follow, 10, leader_out_of_budget, args.latency)
+        time.sleep(0.05)
+        patient = pool.submit(follow, 10, slow, args.latency).result()
+        assert isinstance(leader.result(), DeadlineExceeded) and patient == {'answer': 'late'}, patient
+    print(f"  {'deadlines':<34} follower gave up after {waited * 1000:.0f} ms; "
+          f"leader out of budget -> follower re-ran the call")
+
+    # Leader and followers each get their own copy of a shared result
+    shared = SingleFlight('bench.copies')
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(shared.do, 'key', slow, args.latency)
+        time.sleep(0.05)
+        second = shared.do('key', slow, args.latency)
+        assert first.result() == second and first.result() is not second
+
+    print("\nOK: every coalesced burst made exactly one backend call")
+
+
+if __name__ == '__main__':
+    main()
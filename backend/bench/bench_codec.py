@@ -0,0 +1,163 @@
+"""
+Benchmark: JSON codec and response compression on representative payloads.
+Encodes agent tool results and proxy chat replies with the stdlib and orjson codecs,
+compresses them with gzip (and brotli when installed), and replays /chat through the
+API proxy before (json, identity) and after (orjson, Accept-Encoding: gzip, br):
+CPU time per payload and bytes on the wire.
+
+Usage:
+    python bench_codec.py [--repeat 200] [--requests 300]
+"""
+import argparse
+import base64
+import gzip
+import os
+import random
+import time
+
+import _paths  # noqa: F401
+from stubs import StubAgentCore
+
+os.environ.setdefault('LOG_LEVEL', 'CRITICAL')
+os.environ.setdefault('METRICS_ENABLED', 'false')
+
+import handler as proxy  # noqa: E402
+from config import KNOWLEDGE_BASE_DOCS_DIR  # noqa: E402
+from lib import codec, compression  # noqa: E402
+from lib.options import OptionSet, dumps, option_label  # noqa: E402
+
+
+def passages(count: int, rng) -> list:
+    """
+    Knowledge base paragraphs, as retrieve-and-generate citations quote them
+    """
+    paragraphs = []
+    for name in sorted(os.listdir(KNOWLEDGE_BASE_DOCS_DIR)):
+        with open(os.path.join(KNOWLEDGE_BASE_DOCS_DIR, name), encoding='utf-8') as f:
+            paragraphs.extend((name, p.strip()) for p in f.read().split('\n\n') if len(p.strip()) > 200)
+    return [
+        {'text': text[:1000], 'location': {'type': 'S3', 's3Location': {'uri': f"s3://policy-docs/{name}"}},
+         'score': round(rng.random(), 4)}
+        for name, text in rng.sample(paragraphs, min(count, len(paragraphs)))
+    ]
+
+
+def option_set(count: int, rng) -> OptionSet:
+    options = OptionSet()
+    airports = ['ORD', 'JFK', 'SFO', 'LAX', 'DEN', 'ATL', 'SEA', 'BOS']
+    for i in range(count):
+        departure = 29_000_000 + rng.randrange(0, 1440)
+        legs = rng.choice((1, 2))
+        options.append(i, departure, departure + rng.randrange(90, 600), rng.sample(airports, legs + 1),
+                       [f"UA{rng.randrange(100, 9999)}" for _ in range(legs)], 'Economy',
+                       rng.choice((0, 0, 150, 300)), rng.uniform(0.7, 0.98), rng.uniform(0.8, 0.95))
+    options.sort_by_compatibility()
+    return options
+
+
+def payloads(rng) -> dict:
+    citations = passages(8, rng)
+    options = option_set(1000, rng)
+    return {
+        'rebooking options (5)': {'success': True, 'options': option_set(5, rng).to_dicts(), 'count': 5},
+        'chat reply, 8 citations': {
+            'assistant': 'Under EU261 you are entitled to a refund or rebooking, and compensation. ' * 4,
+            'sessionId': 'c3f1e0a2-5b7d-4e8a-9f10-2b3c4d5e6f70', 'timestamp': '2026-01-01T00:00:00Z',
+            'source': 'agentcore-runtime', 'citations': citations, 'piiDetected': False
+        },
+        'batch of 40 tool results': {'results': [
+            {'toolName': 'analyze_passenger_sentiment', 'statusCode': 200, 'elapsedMs': 21.4,
+             'result': {'success': True, 'sentiment': 'NEGATIVE', 'text': f"My flight {n} was cancelled, again!",
+                        'scores': {'positive': 0.01, 'negative': 0.93, 'neutral': 0.05, 'mixed': 0.01}}}
+            for n in range(40)
+        ]},
+        'bulk manifest (500 assignments)': {'success': True, 'assignments': [
+            {'passenger_id': f"PAX{n:05d}", 'option_id': option_label(n % 40), 'flights': ['UA1234', 'UA987'],
+             'cabin': 'Economy', 'cost': 0, 'score': 0.91} for n in range(500)
+        ], 'unplaced': [], 'placed_count': 500, 'unplaced_count': 0},
+        'OptionSet (1000 options)': {'success': True, 'options': options},
+    }
+
+
+def cpu(func, repeat: int) -> float:
+    """
+    Best CPU time of one call, in microseconds
+    """
+    best = float('inf')
+    for _ in range(max(1, repeat // 10)):
+        start = time.process_time()
+        for _ in range(10):
+            func()
+        best = min(best, (time.process_time() - start) / 10)
+    return best * 1e6
+
+
+def encoders() -> dict:
+    result = {'json': codec.StdlibCodec()}
+    if codec.orjson is not None:
+        result['orjson'] = codec.OrjsonCodec()
+    return result
+
+
+def chat_requests(count: int) -> tuple:
+    """
+    CPU ms and body bytes per request of proxying /chat with citation-heavy replies
+    """
+    proxy.set_agentcore_client(StubAgentCore(chunks=8, chunk_delay=0, streaming=False,
+                                            citations=passages(8, random.Random(1))))
+    event = {'httpMethod': 'POST', 'path': '/chat', 'headers': {'Accept-Encoding': 'gzip, deflate, br'},
+             'body': '{"message": "Am I entitled to compensation for a cancelled flight?", "sessionId": "s-1"}'}
+    sizes = []
+    start = time.process_time()
+    for _ in range(count):
+        sizes.append(len(proxy.handler(event, None)['body'].encode('utf-8')))
+    return (time.process_time() - start) * 1000 / count, sum(sizes) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=200, help='encodes per measurement')
+    parser.add_argument('--requests', type=int, default=300, help='proxied /chat requests per configuration')
+    args = parser.parse_args()
+
+    rng = random.Random(9)
+    codecs = encoders()
+    if 'orjson' not in codecs:
+        print('orjson is not installed: only the json codec is measured')
+    print(f"brotli {'available' if compression.brotli is not None else 'not installed: br is skipped'}")
+
+    print(f"\n{'encode, µs CPU':34}" + ''.join(f"{name:>10}" for name in codecs) + f"{'bytes':>10}"
+          f"{'gzip':>10}{'gzip µs':>10}" + (f"{'br':>10}{'br µs':>10}" if compression.brotli else ''))
+    for name, payload in payloads(rng).items():
+        cells = []
+        for encoder in codecs.values():
+            codec.set_codec(encoder)
+            cells.append(f"{cpu(lambda: dumps(payload), args.repeat):10.1f}")
+        codec.set_codec('json')
+        data = dumps(payload).encode('utf-8')
+        row = f"  {name:32}" + ''.join(cells) + f"{len(data):10d}"
+        for encoding in ('gzip', 'br') if compression.brotli else ('gzip',):
+            compressed = compression.compress(data, encoding)
+            row += f"{len(compressed):10d}{cpu(lambda: compression.compress(data, encoding), args.repeat):10.1f}"
+        print(row)
+
+    print(f"\nAPI proxy /chat, {args.requests} requests (stub AgentCore, 8 cited passages)")
+    print(f"  {'':32}{'CPU ms/req':>12}{'wire bytes':>12}")
+    best = 'orjson' if 'orjson' in codecs else 'json'
+    configurations = [('before: json, identity', False, False), (f"{best}, identity", True, False),
+                      (f"after: {best}, gzip/br", True, True)]
+    for name, fast, compress in configurations:
+        proxy.USE_ORJSON = fast and codec.orjson is not None
+        proxy.RESPONSE_COMPRESSION = compress
+        chat_requests(20)  # warm up
+        cpu_ms, size = chat_requests(args.requests)
+        print(f"  {name:32}{cpu_ms:12.3f}{size:12.0f}")
+
+    response = proxy.handler({'httpMethod': 'POST', 'path': '/chat', 'headers': {'accept-encoding': 'gzip'},
+                              'body': '{"message": "hi"}'}, None)
+    decoded = gzip.decompress(base64.b64decode(response['body'])) if response.get('isBase64Encoded') else None
+    print(f"  compressed reply decodes to JSON: {decoded is not None and proxy.json_loads(decoded)['assistant'] != ''}")
+
+
+if __name__ == '__main__':
+    main()
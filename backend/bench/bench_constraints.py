@@ -0,0 +1,87 @@
+"""
+Benchmark: constraint-aware rebooking search vs. generating every itinerary and filtering afterwards.
+
+Usage:
+    python bench_constraints.py [--flights 200000] [--queries 1000]
+"""
+import argparse
+import datetime
+import random
+import time
+
+import _paths  # noqa: F401
+from schedule import AIRPORTS, synthetic_schedule
+
+from lib.constraints import parse_constraints
+from lib.inventory import FlightIndex, to_epoch_minutes
+from lib.passengers import HUBS, SEARCH_WINDOW_HOURS
+
+CONSTRAINT_SETS = [
+    [],
+    ['arrive_before_21_00'],
+    ['arrive_before_21_00', 'max_stops_1'],
+    ['arrive_before_21_00', 'max_stops_1', 'avoid_LHR'],
+    ['arrive_before_21_00', 'max_stops_1', 'avoid_LHR', 'max_layover_2h'],
+    ['arrive_before_21_00', 'max_stops_1', 'avoid_LHR', 'max_layover_2h', 'min_cabin_business'],
+    ['direct_only'],
+]
+
+
+def post_filter(index, origin, destination, earliest, constraints, count):
+    """
+    The previous approach: every itinerary in the window, sorted, then filtered
+    """
+    parsed = parse_constraints(constraints, earliest, destination)
+    itineraries = index.search(origin, destination, earliest, earliest + SEARCH_WINDOW_HOURS * 60, HUBS)
+    itineraries.sort(key=lambda legs: (index.arrival[legs[-1]], len(legs)))
+    kept = []
+    for legs in itineraries:
+        hubs = [index.airport_code(index.origin[leg]) for leg in legs[1:]]
+        layovers = [index.departure[b] - index.arrival[a] for a, b in zip(legs, legs[1:])]
+        if parsed.allows(len(legs) - 1, index.arrival[legs[-1]], hubs, layovers):
+            kept.append(legs)
+            if len(kept) == count:
+                break
+    return kept
+
+
+def pruned(index, origin, destination, earliest, constraints, count):
+    parsed = parse_constraints(constraints, earliest, destination)
+    latest = min(earliest + SEARCH_WINDOW_HOURS * 60, parsed.deadline)
+    return index.best(origin, destination, earliest, latest, count, parsed.hubs(HUBS), parsed.predicate(index))
+
+
+def measure(func, index, pairs, earliest, constraints):
+    start = time.perf_counter()
+    found = 0
+    for origin, destination in pairs:
+        found += len(func(index, origin, destination, earliest, constraints, 5))
+    return (time.perf_counter() - start) / len(pairs) * 1e6, found / len(pairs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--flights', type=int, default=200_000)
+    parser.add_argument('--queries', type=int, default=1000)
+    args = parser.parse_args()
+
+    start_time = datetime.datetime.utcnow().replace(hour=6, minute=0, second=0, microsecond=0)
+    index = FlightIndex.from_records(synthetic_schedule(args.flights, start=start_time))
+    earliest = to_epoch_minutes(start_time)
+
+    rng = random.Random(11)
+    pairs = [tuple(rng.sample(AIRPORTS, 2)) for _ in range(args.queries)]
+    for origin, destination in pairs:
+        index.connections(origin, destination, HUBS)
+
+    print(f"{len(index)} flights, {args.queries} queries, top 5 options each\n")
+    print(f"{'constraints':<4} {'post-filter us':>15} {'pruned us':>10} {'speedup':>8} {'options':>8}  tokens")
+    for constraints in CONSTRAINT_SETS:
+        naive_us, naive_found = measure(post_filter, index, pairs, earliest, constraints)
+        pruned_us, pruned_found = measure(pruned, index, pairs, earliest, constraints)
+        print(f"{len(constraints):<4} {naive_us:15.0f} {pruned_us:10.0f} {naive_us / pruned_us:7.1f}x "
+              f"{pruned_found:8.1f}  {' '.join(constraints) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
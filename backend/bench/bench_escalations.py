@@ -0,0 +1,184 @@
+"""
+Benchmark: 50k escalations through the human-agent queue during a disruption.
+Escalations arrive faster than agent pools can take them for the first hours; pools
+take batches every simulated minute. Compares first-come-first-served (what the
+static priority string amounted to), priority without aging and the aging
+EscalationQueue: wait per passenger class (is the urgent work served first, and
+does anyone starve?) and the real cost of enqueue, reprioritize and batch dequeue.
+
+Usage:
+    python bench_escalations.py [--escalations 50000] [--hours 3] [--capacity 250] [--batch 10] [--aging 0.5]
+"""
+import argparse
+import collections
+import random
+import time
+
+import _paths  # noqa: F401
+
+from lib import metrics
+from lib.escalations import Escalation, EscalationQueue
+
+# Share of escalations per agent pool, and of agent capacity per pool
+POOLS = {'general': 0.8, 'es': 0.15, 'fr': 0.05}
+TIERS = (('Platinum', 0.05), ('Gold', 0.1), ('Silver', 0.2), ('General', 0.65))
+PRIORITIES = (('HIGH', 0.1), ('MEDIUM', 0.2), ('NORMAL', 0.7))
+# Passengers who escalate again (louder) while waiting
+REPEAT_RATE = 0.1
+
+CLASSES = {
+    'Platinum/Gold, distressed': lambda e: e.tier in ('Platinum', 'Gold') and e.distress >= 0.6,
+    'HIGH priority': lambda e: e.priority == 'HIGH',
+    'General, calm, NORMAL': lambda e: e.tier == 'General' and e.distress < 0.2 and e.priority == 'NORMAL',
+    'all': lambda e: True,
+}
+
+
+def pick(rng, weighted) -> str:
+    roll, total = rng.random(), 0.0
+    for value, weight in weighted:
+        total += weight
+        if roll < total:
+            return value
+    return weighted[-1][0]
+
+
+def arrivals(count: int, hours: float, seed: int = 11) -> list:
+    """
+    (minute, escalation) sorted by arrival; twice as many arrive in the first third
+    """
+    rng = random.Random(seed)
+    minutes = hours * 60
+    result = []
+    for n in range(count):
+        minute = rng.uniform(0, minutes / 3) if rng.random() < 0.5 else rng.uniform(0, minutes)
+        escalation = Escalation(
+            f"ESC-{n:06d}", f"PAX{n:06d}", 'Missed connection', pick(rng, PRIORITIES), pick(rng, TIERS),
+            round(rng.random() ** 2, 2), pick(rng, list(POOLS.items()))
+        )
+        result.append((minute, escalation))
+    result.sort(key=lambda arrival: arrival[0])
+    return result
+
+
+class FifoQueue:
+    """
+    First come, first served per pool
+    """
+
+    def __init__(self, clock):
+        self._clock = clock
+        self._queues = collections.defaultdict(collections.deque)
+
+    def push(self, escalation):
+        escalation.enqueued_at = self._clock()
+        self._queues[escalation.pool].append(escalation)
+
+    def pending(self, passenger_id):
+        return None
+
+    def pop_batch(self, count, pools):
+        queue, now = self._queues[pools[0]], self._clock()
+        return [(escalation, now - escalation.enqueued_at) for escalation in
+                (queue.popleft() for _ in range(min(count, len(queue))))]
+
+
+def simulate(queue, schedule: list, capacity: int, batch: int, now: list, rng) -> tuple:
+    """
+    Run the disruption minute by minute: waits per escalation (minutes) and timings (seconds)
+    """
+    waits, push_times, reprioritize_times, pop_times = {}, [], [], []
+    served = {pool: 0.0 for pool in POOLS}
+    position, minute = 0, 0
+    repeats = []
+    while position < len(schedule) or len(waits) < len(schedule):
+        end = (minute + 1) * 60
+        while position < len(schedule) and schedule[position][0] * 60 < end:
+            arrival, escalation = schedule[position]
+            now[0] = arrival * 60
+            start = time.perf_counter()
+            queue.push(Escalation(escalation.escalation_id, escalation.passenger_id, escalation.reason,
+                                  escalation.priority, escalation.tier, escalation.distress, escalation.pool))
+            push_times.append(time.perf_counter() - start)
+            if rng.random() < REPEAT_RATE:
+                repeats.append((arrival + rng.uniform(5, 30), escalation.passenger_id))
+            position += 1
+
+        # Some waiting passengers escalate again: higher priority, more distressed
+        due = [repeat for repeat in repeats if repeat[0] * 60 < end]
+        repeats = [repeat for repeat in repeats if repeat[0] * 60 >= end]
+        for _, passenger_id in due:
+            pending = queue.pending(passenger_id)
+            if pending is not None:
+                start = time.perf_counter()
+                queue.reprioritize(pending.escalation_id, priority='HIGH', distress=min(1.0, pending.distress + 0.3))
+                reprioritize_times.append(time.perf_counter() - start)
+
+        now[0] = end
+        for pool, share in POOLS.items():
+            served[pool] += capacity * share
+            while served[pool] >= batch:
+                start = time.perf_counter()
+                taken = queue.pop_batch(batch, [pool])
+                pop_times.append(time.perf_counter() - start)
+                served[pool] -= batch
+                for escalation, waited in taken:
+                    waits[escalation.escalation_id] = waited / 60
+                if len(taken) < batch:
+                    served[pool] = 0.0
+                    break
+        minute += 1
+    return waits, push_times, reprioritize_times, pop_times
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--escalations', type=int, default=50_000)
+    parser.add_argument('--hours', type=float, default=3, help='arrival window')
+    parser.add_argument('--capacity', type=int, default=250, help='escalations all agents handle per minute')
+    parser.add_argument('--batch', type=int, default=10, help='escalations taken per dequeue')
+    parser.add_argument('--aging', type=float, default=0.5, help='score points added per minute waited')
+    args = parser.parse_args()
+
+    metrics.configure_metrics(True)
+    schedule = arrivals(args.escalations, args.hours)
+    escalations = {escalation.escalation_id: escalation for _, escalation in schedule}
+    print(f"{args.escalations} escalations over {args.hours:g} h, agents take {args.capacity}/min "
+          f"in batches of {args.batch}; {REPEAT_RATE:.0%} of passengers escalate again while waiting")
+
+    results = {}
+    for name, make in (
+        ('FIFO', lambda clock: FifoQueue(clock)),
+        ('priority, no aging', lambda clock: EscalationQueue(aging_per_minute=0, clock=clock)),
+        ('priority + aging', lambda clock: EscalationQueue(aging_per_minute=args.aging, clock=clock)),
+    ):
+        now = [0.0]
+        metrics.reset()
+        results[name] = simulate(make(lambda: now[0]), schedule, args.capacity, args.batch, now, random.Random(5))
+
+    print(f"\nWait in minutes (p50 / p95 / max)")
+    print(f"  {'':28}" + ''.join(f"{name:>24}" for name in results))
+    for label, member in CLASSES.items():
+        ids = [escalation_id for escalation_id, escalation in escalations.items() if member(escalation)]
+        cells = []
+        for waits, *_ in results.values():
+            values = [waits[escalation_id] for escalation_id in ids]
+            cells.append(f"{percentile(values, 0.5):6.0f} /{percentile(values, 0.95):5.0f} /{max(values):5.0f}")
+        print(f"  {label + f' ({len(ids)})':28}" + ''.join(f"{cell:>24}" for cell in cells))
+
+    print(f"\nQueue operation cost, µs (p50 / p99)")
+    for name, (_, pushes, reprioritizes, pops) in results.items():
+        if name == 'FIFO':
+            continue
+        print(f"  {name:20} push {percentile(pushes, 0.5) * 1e6:5.1f} /{percentile(pushes, 0.99) * 1e6:6.1f}   "
+              f"reprioritize {percentile(reprioritizes, 0.5) * 1e6:5.1f} /{percentile(reprioritizes, 0.99) * 1e6:6.1f}   "
+              f"dequeue batch of {args.batch} {percentile(pops, 0.5) * 1e6:6.1f} /{percentile(pops, 0.99) * 1e6:7.1f}")
+
+
+if __name__ == '__main__':
+    main()
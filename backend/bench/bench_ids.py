@@ -0,0 +1,119 @@
+"""
+Benchmark: ID and PNR generation throughput across processes and threads, with a uniqueness check.
+Every worker process gets its own ID_NODE_DIR, as separate Lambda / AgentCore microVMs each
+have their own /tmp, so nodes are only as distinct as their entropy makes them; all IDs are
+merged and checked for duplicates, and PNR collisions are compared with the previous random
+3-letter + 3-digit scheme.
+
+Usage:
+    python bench_ids.py [--processes 8] [--ids 500000] [--threads 8] [--pnrs 100000]
+"""
+import argparse
+import heapq
+import multiprocessing
+import os
+import random
+import string
+import tempfile
+import threading
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import _paths  # noqa: F401
+
+
+def generate(count: int, pnrs: int, node_dir: str) -> tuple:
+    """
+    Worker process: count record IDs and pnrs PNRs from this process's node, claimed in node_dir
+    """
+    os.environ['ID_NODE_DIR'] = node_dir
+    from lib import ids
+    start = time.perf_counter()
+    values = array('Q', (ids.next_id() for _ in range(count)))
+    elapsed = time.perf_counter() - start
+    codes = [ids.new_pnr() for _ in range(pnrs)]
+    return ids.node_id(), values.tobytes(), elapsed, codes
+
+
+def legacy_pnr(rng) -> str:
+    letters = ''.join(rng.choices(string.ascii_uppercase, k=3))
+    numbers = ''.join(rng.choices(string.digits, k=3))
+    return f"PNR-{letters}{numbers}"
+
+
+def count_duplicates(streams) -> int:
+    """
+    Duplicates across per-process streams, each already increasing, via a k-way merge
+    """
+    duplicates, previous = 0, None
+    for value in heapq.merge(*streams):
+        duplicates += value == previous
+        previous = value
+    return duplicates
+
+
+def threaded(threads: int, per_thread: int) -> tuple:
+    from lib import ids
+    results = [None] * threads
+
+    def work(n):
+        results[n] = [ids.next_id() for _ in range(per_thread)]
+
+    workers = [threading.Thread(target=work, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    combined = [value for result in results for value in result]
+    ordered = all(result == sorted(result) for result in results)
+    return elapsed, len(combined) - len(set(combined)), ordered
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--ids', type=int, default=500_000, help='record IDs per process')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--pnrs', type=int, default=100_000, help='PNRs in total')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # One node directory per worker: no two workers share a host's lock files
+        node_dirs = [os.path.join(tmp, f"host-{n}") for n in range(args.processes)]
+        os.environ['LOG_LEVEL'] = 'WARNING'
+
+        pnrs_each = args.pnrs // args.processes
+        context = multiprocessing.get_context('spawn')
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=args.processes, mp_context=context) as pool:
+            results = list(pool.map(generate, [args.ids] * args.processes, [pnrs_each] * args.processes, node_dirs))
+        wall = time.perf_counter() - start
+
+        nodes = [result[0] for result in results]
+        streams = [array('Q', result[1]) for result in results]
+        total = sum(len(stream) for stream in streams)
+        rates = [len(stream) / result[2] for stream, result in zip(streams, results)]
+        print(f"{args.processes} processes (one /tmp each) x {args.ids} IDs on {os.cpu_count()} CPUs, "
+              f"nodes {sorted(nodes)}")
+        print(f"  per process   {min(rates) / 1e6:5.2f}-{max(rates) / 1e6:.2f} M IDs/s")
+        print(f"  all processes {total / wall / 1e6:5.2f} M IDs/s over {wall:.2f} s (incl. worker start-up)")
+        print(f"  monotonic per process: {all(list(s) == sorted(s) for s in streams)}, "
+              f"duplicates: {count_duplicates(streams)} of {total}")
+
+        elapsed, duplicates, ordered = threaded(args.threads, args.ids // args.threads)
+        print(f"\n{args.threads} threads in one process: {args.ids / elapsed / 1e6:5.2f} M IDs/s, "
+              f"duplicates: {duplicates}, monotonic per thread: {ordered}")
+
+        codes = [code for result in results for code in result[3]]
+        rng = random.Random(1)
+        legacy = [legacy_pnr(rng) for _ in range(len(codes))]
+        print(f"\n{len(codes)} PNRs across {args.processes} processes, e.g. {codes[0]} {codes[1]} {codes[2]}")
+        print(f"  node-based PNRs: {len(codes) - len(set(codes))} collisions")
+        print(f"  random 3+3 PNRs: {len(legacy) - len(set(legacy))} collisions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: flight schedule index load time, persisted-index cold start and rebooking query latency.
+Connection tables are built when the index is built and saved with it, so the first
+query on a route costs the same as any other.
+
+Usage:
+    python bench_inventory.py [--flights 100000] [--queries 2000]
+"""
+import argparse
+import csv
+import datetime
+import os
+import random
+import tempfile
+import time
+
+import _paths  # noqa: F401
+from schedule import AIRPORTS, synthetic_schedule
+
+from lib.inventory import FlightIndex, set_flight_index
+from lib.passengers import HUBS, generate_flight_options
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--flights', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    start_time = datetime.datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    records = synthetic_schedule(args.flights, start=start_time)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'schedule.csv')
+        with open(csv_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(records[0]))
+            writer.writeheader()
+            writer.writerows(records)
+
+        t = time.perf_counter()
+        index = FlightIndex.from_file(csv_path)
+        csv_load = time.perf_counter() - t
+
+        idx_path = os.path.join(tmp, 'schedule.idx')
+        index.save(idx_path)
+        t = time.perf_counter()
+        index = FlightIndex.from_file(idx_path)
+        idx_load = time.perf_counter() - t
+        idx_size = os.path.getsize(idx_path)
+
+    set_flight_index(index)
+    rng = random.Random(7)
+    pairs = [tuple(rng.sample(AIRPORTS, 2)) for _ in range(args.queries)]
+
+    # Connection tables are built with the index; queries only look them up
+    t = time.perf_counter()
+    index._build_hub_connections()
+    build = time.perf_counter() - t
+
+    latencies = []
+    for origin, destination in pairs:
+        t = time.perf_counter()
+        generate_flight_options(origin, destination, 'Gold', 5, departure_after=start_time)
+        latencies.append(time.perf_counter() - t)
+    latencies.sort()
+
+    print(f"flights indexed:          {len(index)}")
+    print(f"load from CSV:            {csv_load * 1000:8.1f} ms")
+    print(f"load from saved index:    {idx_load * 1000:8.1f} ms ({idx_size / 1e6:.1f} MB)")
+    print(f"connection tables built:  {build * 1000:8.1f} ms for all {len(index._hub_connections)} routes "
+          f"(part of each load from CSV)")
+    print(f"rebooking query p50:      {latencies[len(latencies) // 2] * 1e6:8.0f} us")
+    print(f"rebooking query p99:      {latencies[int(len(latencies) * 0.99)] * 1e6:8.0f} us")
+
+
+if __name__ == '__main__':
+    main()
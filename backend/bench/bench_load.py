@@ -0,0 +1,413 @@
+"""
+Benchmark: load test of the agent tool handler, the API proxy and rebooking option generation.
+Replays a weighted event mix shaped like events/disruption.json against stub AWS clients with a
+latency/error profile, on a thread pool or a process pool, and reports throughput, latency
+percentiles, error rate and memory per request. Results can be saved as JSON and compared with
+an earlier run; any metric worse than the threshold is reported and the script exits with 1.
+
+Usage:
+    python bench_load.py [--targets agent,proxy,options] [--modes thread,process]
+                         [--requests 2000] [--concurrency 8] [--profile typical]
+                         [--output results.json] [--baseline previous.json] [--threshold 0.15]
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import _paths
+from schedule import AIRPORTS, synthetic_schedule
+from stubs import StubAgentCore, StubBedrockAgent, StubComprehend, StubTranslate
+
+# Read by the agent's config on import, here and in spawned pool workers
+os.environ.setdefault('LOG_LEVEL', 'CRITICAL')
+
+# Base stub latency (seconds), exponential jitter (multiples of latency) and error rate.
+# The knowledge base is slower than Comprehend/Translate; see STUB_LATENCY_SCALE.
+PROFILES = {
+    'fast': {'latency': 0.0, 'jitter': 0.0, 'error_rate': 0.0},
+    'typical': {'latency': 0.02, 'jitter': 0.5, 'error_rate': 0.01},
+    'degraded': {'latency': 0.08, 'jitter': 2.0, 'error_rate': 0.1},
+}
+STUB_LATENCY_SCALE = {'bedrock-agent-runtime': 5, 'comprehend': 1, 'translate': 1, 'bedrock-agentcore': 2}
+
+# Relative weights of each kind of request in the replayed mix
+AGENT_MIX = {
+    'generate_rebooking_options': 35,
+    'query_policy': 20,
+    'analyze_passenger_sentiment': 20,
+    'translate_message': 10,
+    'confirm_booking': 10,
+    'create_escalation': 5,
+}
+PROXY_MIX = {'chat': 70, 'chat_stream': 15, 'health': 10, 'preflight': 5}
+
+MESSAGES = [
+    "My flight was cancelled and I need to get to San Francisco tonight",
+    "Am I entitled to compensation for a cancelled flight?",
+    "What is the baggage allowance on my rebooked flight?",
+    "This is the worst service, I missed my connection",
+    "Can I get a hotel voucher for an overnight delay?",
+    "Thanks, the new flight works for me",
+]
+QUESTIONS = [
+    "Am I entitled to compensation for a cancelled flight?",
+    "What is the compensation for a delay over 3 hours?",
+    "Do I get a hotel voucher for an overnight delay?",
+    "Can I change to a flight on another day without a fee?",
+    "What happens to my checked baggage when I am rebooked?",
+]
+LANGUAGES = ['de', 'es', 'fr', 'ja', 'pt']
+TIERS = ['Platinum', 'Gold', 'Silver', 'Standard']
+CONSTRAINTS = [[], ['arrive_before_21_00'], ['max_stops_1'], ['direct_only'], ['min_cabin_business', 'avoid_LHR']]
+
+# Relative change beyond the threshold in these directions counts as a regression
+# (p99 and max are reported but too noisy at a few thousand requests to gate on)
+HIGHER_IS_WORSE = ('p50_ms', 'p95_ms', 'memory_kib_per_request')
+LOWER_IS_WORSE = ('throughput_rps',)
+# Error rate is compared in absolute percentage points
+ERROR_RATE_TOLERANCE = 0.02
+
+TARGETS = ('agent', 'proxy', 'options')
+MODES = ('thread', 'process')
+
+
+def disruption_template() -> dict:
+    """
+    Passenger and disruption fields from the sample API Gateway event
+    """
+    with open(os.path.join(_paths.BACKEND_DIR, 'events', 'disruption.json')) as f:
+        return json.loads(json.load(f)['body'])
+
+
+def weighted(rng, mix: dict) -> str:
+    return rng.choices(list(mix), weights=list(mix.values()))[0]
+
+
+def make_passenger(rng, template: dict) -> dict:
+    passenger = dict(template['passenger'])
+    if rng.random() < 0.5:
+        passenger['origin'], passenger['destination'] = rng.sample(AIRPORTS, 2)
+    passenger['tier'] = rng.choice(TIERS)
+    passenger['constraints'] = rng.choice(CONSTRAINTS + [passenger.get('constraints', [])])
+    passenger['passengerId'] = f"P-{rng.randrange(10000, 99999)}"
+    return passenger
+
+
+def agent_event(rng, template: dict) -> dict:
+    """
+    One AgentCore tool invocation, as the agent issues them while handling a disruption
+    """
+    passenger = make_passenger(rng, template)
+    tool = weighted(rng, AGENT_MIX)
+    if tool == 'generate_rebooking_options':
+        tool_input = {'passenger_id': passenger['passengerId'], 'origin': passenger['origin'],
+                      'destination': passenger['destination'], 'tier': passenger['tier'],
+                      'constraints': passenger['constraints']}
+    elif tool == 'query_policy':
+        tool_input = {'query': rng.choice(QUESTIONS)}
+    elif tool == 'analyze_passenger_sentiment':
+        tool_input = {'text': rng.choice(MESSAGES)}
+    elif tool == 'translate_message':
+        tool_input = {'text': f"Your flight {passenger['flightNumber']} was cancelled ({template['reason']}). "
+                              f"You have been rebooked.", 'target_language': rng.choice(LANGUAGES)}
+    elif tool == 'confirm_booking':
+        tool_input = {'passenger_id': passenger['passengerId'], 'option_id': rng.choice('ABCDE')}
+    else:
+        tool_input = {'passenger_id': passenger['passengerId'], 'reason': template['reason'],
+                      'priority': rng.choice(['NORMAL', 'HIGH'])}
+    return {'toolName': tool, 'toolInput': tool_input}
+
+
+def proxy_event(rng, template: dict) -> dict:
+    """
+    One API Gateway request to the chat proxy
+    """
+    route = weighted(rng, PROXY_MIX)
+    if route == 'health':
+        return {'httpMethod': 'GET', 'path': '/health', 'headers': {}}
+    if route == 'preflight':
+        return {'httpMethod': 'OPTIONS', 'path': '/chat', 'headers': {}}
+    body = {'message': rng.choice(MESSAGES), 'context': {'disruption': template, 'passenger': make_passenger(rng, template)}}
+    return {'httpMethod': 'POST', 'path': '/chat/stream' if route == 'chat_stream' else '/chat',
+            'headers': {'Content-Type': 'application/json'}, 'body': json.dumps(body),
+            'requestContext': {'requestId': f"req-{rng.getrandbits(64):016x}"}}
+
+
+def options_event(rng, template: dict) -> dict:
+    """
+    Arguments for one lib.passengers.generate_flight_options call
+    """
+    passenger = make_passenger(rng, template)
+    return {'origin': passenger['origin'], 'destination': passenger['destination'],
+            'tier': passenger['tier'], 'constraints': passenger['constraints']}
+
+
+EVENT_FACTORIES = {'agent': agent_event, 'proxy': proxy_event, 'options': options_event}
+
+
+def make_events(target: str, count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    template = disruption_template()
+    return [EVENT_FACTORIES[target](rng, template) for _ in range(count)]
+
+
+# Per-process state set up by setup(): the callable under test
+_run = None
+
+
+def setup(target: str, profile: dict, flights: int, seed: int):
+    """
+    Install stub clients with the profile and return a callable that handles one event
+    and reports whether it succeeded. Runs once per process (pool initializer).
+    """
+    global _run
+    _run = make_runner(target, profile, flights, seed)
+
+    # After importing the handlers, which configure logging and metrics themselves.
+    # Injected errors are expected; keep their tracebacks out of the report.
+    from lib.log import configure_logging
+    from lib import metrics
+    configure_logging('CRITICAL')
+    metrics.configure_metrics(False)
+    return _run
+
+
+def make_runner(target: str, profile: dict, flights: int, seed: int):
+    def stub_profile(service):
+        return dict(profile, latency=profile['latency'] * STUB_LATENCY_SCALE[service], seed=seed)
+
+    if target == 'proxy':
+        import handler as proxy
+        proxy.METRICS_ENABLED = False
+        proxy.logger.setLevel('CRITICAL')
+        agentcore = stub_profile('bedrock-agentcore')
+        proxy.set_agentcore_client(StubAgentCore(chunks=5, chunk_delay=agentcore['latency'] / 10, **agentcore))
+        return lambda event: proxy.handler(event, None)['statusCode'] < 500
+
+    from lib.clients import set_client
+    set_client('bedrock-agent-runtime', StubBedrockAgent(**stub_profile('bedrock-agent-runtime')))
+    set_client('comprehend', StubComprehend(**stub_profile('comprehend')))
+    set_client('translate', StubTranslate(**stub_profile('translate')))
+    if flights:
+        from lib.inventory import FlightIndex, set_flight_index
+        start = datetime.datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        set_flight_index(FlightIndex.from_records(synthetic_schedule(flights, start=start, seed=seed)))
+
+    if target == 'options':
+        from lib.passengers import generate_flight_options
+        return lambda event: generate_flight_options(**event) is not None
+
+    import main as agent
+    agent.USE_TRANSLATE = True
+
+    def run(event):
+        response = agent.handler(event, None)
+        return response['statusCode'] < 500 and json.loads(response['body']).get('success', True)
+    return run
+
+
+def replay(run, events: list) -> tuple:
+    """
+    Handle each event in turn; (latencies in ms, error count)
+    """
+    latencies, errors = [], 0
+    for event in events:
+        start = time.perf_counter()
+        try:
+            ok = run(event)
+        except Exception:
+            ok = False
+        latencies.append((time.perf_counter() - start) * 1000)
+        errors += not ok
+    return latencies, errors
+
+
+def process_worker(events: list) -> tuple:
+    """
+    Process pool task: replay a share of the events; wall-clock bounds let the parent
+    compute throughput without counting interpreter start-up
+    """
+    started = time.time()
+    latencies, errors = replay(_run, events)
+    return latencies, errors, started, time.time()
+
+
+def run_threads(target: str, events: list, args, profile: dict) -> tuple:
+    run = setup(target, profile, args.flights, args.seed)
+    replay(run, events[:args.warmup])
+
+    def task(event):
+        return replay(run, [event])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(task, events))
+    wall = time.perf_counter() - start
+    latencies = [ms for result in results for ms in result[0]]
+    return latencies, sum(result[1] for result in results), wall
+
+
+def run_processes(target: str, events: list, args, profile: dict) -> tuple:
+    shares = [events[n::args.concurrency] for n in range(args.concurrency)]
+    # spawn gives every worker a clean interpreter (no inherited logger threads or caches)
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=args.concurrency, mp_context=context,
+                             initializer=warm_worker, initargs=(target, profile, args.flights, args.seed,
+                                                                events[:args.warmup])) as pool:
+        results = list(pool.map(process_worker, shares))
+    latencies = [ms for result in results for ms in result[0]]
+    wall = max(result[3] for result in results) - min(result[2] for result in results)
+    return latencies, sum(result[1] for result in results), wall
+
+
+def warm_worker(target: str, profile: dict, flights: int, seed: int, warmup: list):
+    replay(setup(target, profile, flights, seed), warmup)
+
+
+def memory_per_request(target: str, events: list, warmup: list, profile: dict, flights: int, seed: int) -> float:
+    """
+    Mean peak traced allocation (KiB) while handling one request, measured
+    sequentially with the profile's errors but without its latency
+    """
+    run = setup(target, dict(profile, latency=0.0), flights, seed)
+    replay(run, warmup)
+    peaks = []
+    tracemalloc.start()
+    try:
+        for event in events:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            try:
+                run(event)
+            except Exception:
+                pass
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return statistics.mean(peaks) / 1024
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: list, errors: int, wall: float, memory_kib: float) -> dict:
+    ordered = sorted(latencies)
+    return {
+        'requests': len(ordered),
+        'throughput_rps': round(len(ordered) / wall, 1),
+        'p50_ms': round(percentile(ordered, 0.50), 3),
+        'p95_ms': round(percentile(ordered, 0.95), 3),
+        'p99_ms': round(percentile(ordered, 0.99), 3),
+        'max_ms': round(ordered[-1], 3),
+        'error_rate': round(errors / len(ordered), 4),
+        'memory_kib_per_request': round(memory_kib, 1),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Regressions of this run against a baseline run, as printable lines
+    """
+    regressions = []
+    for scenario, current in results.items():
+        previous = baseline.get('results', {}).get(scenario)
+        if previous is None:
+            continue
+        for metric in HIGHER_IS_WORSE + LOWER_IS_WORSE:
+            before, after = previous.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = change > threshold if metric in HIGHER_IS_WORSE else change < -threshold
+            if worse:
+                regressions.append(f"{scenario} {metric}: {before} -> {after} ({change * 100:+.0f}%)")
+        if current['error_rate'] - previous.get('error_rate', 0) > ERROR_RATE_TOLERANCE:
+            regressions.append(f"{scenario} error_rate: {previous['error_rate']} -> {current['error_rate']}")
+    return regressions
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=_paths.BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--targets', default=','.join(TARGETS))
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='typical')
+    parser.add_argument('--flights', type=int, default=20_000, help='synthetic schedule size; 0 uses mock options')
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--memory-samples', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='earlier --output file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.15, help='relative change counted as a regression')
+    args = parser.parse_args()
+
+    profile = PROFILES[args.profile]
+    runners = {'thread': run_threads, 'process': run_processes}
+    results = {}
+
+    print(f"profile {args.profile} {profile}, {args.requests} requests, concurrency {args.concurrency}\n")
+    print(f"{'scenario':<16} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'errors':>7} {'KiB/req':>8}")
+    for target in args.targets.split(','):
+        events = make_events(target, args.requests, args.seed)
+        memory_kib = memory_per_request(target, events[:args.memory_samples], events[:args.warmup], profile,
+                                        args.flights, args.seed)
+        for mode in args.modes.split(','):
+            latencies, errors, wall = runners[mode](target, events, args, profile)
+            summary = results[f"{target}/{mode}"] = summarize(latencies, errors, wall, memory_kib)
+            print(f"{target + '/' + mode:<16} {summary['throughput_rps']:8.1f} {summary['p50_ms']:8.2f} "
+                  f"{summary['p95_ms']:8.2f} {summary['p99_ms']:8.2f} {summary['max_ms']:8.2f} "
+                  f"{summary['error_rate'] * 100:6.1f}% {summary['memory_kib_per_request']:8.1f}")
+
+    # ru_maxrss is in KiB on Linux
+    print(f"\nparent peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB")
+
+    report = {
+        'revision': git_revision(),
+        'timestamp': datetime.datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'python': sys.version.split()[0],
+        'config': {'profile': args.profile, **profile, 'requests': args.requests,
+                   'concurrency': args.concurrency, 'flights': args.flights, 'seed': args.seed},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        print(f"\ncompared with {args.baseline} (revision {baseline.get('revision')}), "
+              f"threshold {args.threshold * 100:.0f}%:")
+        for line in regressions:
+            print(f"  REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print("  no regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: per-request logging overhead of the old print(json.dumps(...)) pattern
+vs. the queue-backed structured logger with lazy, sampled payload logs.
+Output goes to os.devnull in both cases so only caller-side cost is measured.
+Finally checks that logger.exception() through the queue keeps its traceback.
+
+Usage:
+    python bench_logging.py [--requests 20000]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+
+import _paths  # noqa: F401
+
+from lib.log import configure_logging, flush_logging, get_logger, log_payload, redact
+
+EVENT = {
+    'toolName': 'generate_rebooking_options',
+    'toolInput': {'passenger_id': 'P123', 'origin': 'FRA', 'destination': 'JFK', 'tier': 'Gold',
+                  'constraints': ['arrive_before_21_00']},
+    'context': {'history': [{'role': 'user', 'content': 'My flight was cancelled, what now? ' * 20}] * 10,
+                'options': [{'optionId': chr(65 + i), 'routing': 'FRA→MUC→JFK', 'flights': ['LH100', 'LH400'],
+                             'departure': '14:05', 'arrival': '19:40'} for i in range(6)]},
+}
+TEXT = 'I have been waiting for four hours and nobody can tell me when I will get home.'
+
+
+def old_style(devnull):
+    with contextlib.redirect_stdout(devnull):
+        print(f"[HANDLER] Event: {json.dumps(EVENT)}")
+        print(f"[TOOL] analyze_passenger_sentiment called: {TEXT[:50]}...")
+        print(f"[COMPREHEND] Sentiment: NEGATIVE")
+
+
+def new_style(logger):
+    log_payload(logger, "Event", EVENT)
+    logger.info("analyze_passenger_sentiment called: %s", redact(TEXT))
+    logger.info("Sentiment: %s", 'NEGATIVE')
+
+
+def measure(label, func, requests):
+    start = time.perf_counter()
+    for _ in range(requests):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<34} {elapsed / requests * 1e6:8.1f} us/request")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=20000)
+    args = parser.parse_args()
+
+    with open(os.devnull, 'w') as devnull:
+        print(f"Logging overhead over {args.requests} requests (3 log lines each):")
+        measure('print + json.dumps (before)', lambda: old_style(devnull), args.requests)
+
+        logger = get_logger('bench')
+        configure_logging('INFO', payload_sample_rate=0.01, stream=devnull)
+        measure('structured, INFO', lambda: new_style(logger), args.requests)
+
+        configure_logging('DEBUG', payload_sample_rate=0.01, stream=devnull)
+        measure('structured, DEBUG, 1% payloads', lambda: new_style(logger), args.requests)
+
+        configure_logging('WARNING', stream=devnull)
+        measure('structured, WARNING', lambda: new_style(logger), args.requests)
+        flush_logging()
+
+    # Tracebacks are formatted on the calling thread and must reach the JSON line
+    output = io.StringIO()
+    configure_logging('INFO', stream=output)
+    try:
+        raise ValueError('seat map unavailable')
+    except ValueError:
+        logger.exception("Tool execution failed")
+    flush_logging()
+    line = json.loads(output.getvalue().splitlines()[-1])
+    print(f"\nlogger.exception keeps its traceback: {'ValueError: seat map unavailable' in line.get('exception', '')}")
+    assert 'Traceback' in line['exception'], line
+
+
+if __name__ == '__main__':
+    main()
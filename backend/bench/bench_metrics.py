@@ -0,0 +1,57 @@
+"""
+Benchmark: per-call overhead of tool instrumentation when metrics are disabled vs. enabled.
+
+Usage:
+    python bench_metrics.py [--calls 200000]
+"""
+import argparse
+import time
+
+import _paths  # noqa: F401
+
+from lib import metrics
+
+
+def tool(passenger_id: str, reason: str) -> dict:
+    return {"success": True, "passenger_id": passenger_id, "reason": reason}
+
+
+def measure(label, func, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func(passenger_id="P1", reason="missed connection")
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<20} {elapsed / calls * 1e9:8.0f} ns/call")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--calls', type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"Instrumentation overhead over {args.calls} calls:")
+    measure('bare function', tool, args.calls)
+
+    metrics.configure_metrics(False)
+    measure('metrics disabled', metrics.timed("tool.bench", metrics.tool_failed)(tool), args.calls)
+
+    metrics.configure_metrics(True)
+    measure('metrics enabled', metrics.timed("tool.bench", metrics.tool_failed)(tool), args.calls)
+
+    summary = metrics.snapshot()['histograms']['tool.bench']
+    print(f"  recorded {summary['count']} calls, p50 {summary['p50']} ms, p99 {summary['p99']} ms")
+
+    # EMF documents carry per-interval deltas: CloudWatch sums what it receives
+    first = metrics.drain()
+    metrics.increment("bench.events", 3)
+    metrics.record("tool.bench", 2.0)
+    second = metrics.drain()
+    assert first['histograms']['tool.bench']['count'] == args.calls
+    assert second['histograms']['tool.bench']['count'] == 1 and second['counters'] == {"bench.events": 3}
+    assert metrics.drain() == {'histograms': {}, 'counters': {"bench.events": 0}}
+    assert metrics.snapshot()['histograms']['tool.bench']['count'] == args.calls + 1
+    print("  EMF flushes report per-interval deltas; snapshot() keeps totals")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark: 100k rebooking options as option dicts vs. a columnar OptionSet.
+Compares build time, memory held by the options (tracemalloc) and JSON serialization,
+and checks that dumps() of the OptionSet is byte-identical to the codec encoding the dicts.
+
+Usage:
+    python bench_options.py [--options 100000] [--flights 100000]
+"""
+import argparse
+import datetime
+import gc
+import random
+import time
+import tracemalloc
+
+import _paths  # noqa: F401
+from schedule import synthetic_schedule
+
+from lib import codec
+from lib.inventory import FlightIndex, from_epoch_minutes
+from lib.options import OptionSet, dumps, option_label
+from lib.passengers import itinerary_cost
+
+
+def legacy_option(index, option_id: str, legs: tuple, cabin: str, cost: int, earliest: int) -> dict:
+    """
+    An option as built before OptionSet: one dict (and its strings and lists) per option
+    """
+    first, last = legs[0], legs[-1]
+    depart_time = from_epoch_minutes(index.departure[first])
+    arrive_time = from_epoch_minutes(index.arrival[last])
+    stops = len(legs) - 1
+    stations = [index.airport_code(index.origin[leg]) for leg in legs] + [index.airport_code(index.destination[last])]
+    wait_hours = (index.departure[first] - earliest) / 60
+    compatibility = max(0.7, 0.98 - 0.02 * wait_hours - 0.08 * stops)
+    seats = min(index.seats[leg] for leg in legs)
+    return {
+        'optionId': option_id,
+        'routing': f"{stations[0]}→{stations[-1]} (direct)" if stops == 0 else '→'.join(stations),
+        'departure': depart_time.strftime('%H:%M'),
+        'arrival': arrive_time.strftime('%H:%M'),
+        'duration': str(arrive_time - depart_time).split('.')[0],
+        'stops': stops,
+        'flights': [index.flight_numbers[leg] for leg in legs],
+        'class': cabin,
+        'cost': cost,
+        'availability': 'confirmed',
+        'compatibility': round(compatibility, 2),
+        'confidence': round(min(0.95, 0.8 + 0.01 * seats), 2)
+    }
+
+
+def itineraries(index, count: int, rng) -> list:
+    """
+    Direct flights and two-leg connections (each onward leg departs from the first leg's destination)
+    """
+    departing = {}
+    for leg in range(len(index.departure)):
+        departing.setdefault(index.origin[leg], []).append(leg)
+    result = []
+    for _ in range(count):
+        first = rng.randrange(len(index.departure))
+        if rng.random() < 0.5:
+            result.append((first,))
+        else:
+            result.append((first, rng.choice(departing[index.destination[first]])))
+    return result
+
+
+def build_dicts(index, candidates, earliest) -> list:
+    options = [
+        legacy_option(index, option_label(i), legs, 'Economy', itinerary_cost(index, legs, None), earliest)
+        for i, legs in enumerate(candidates)
+    ]
+    options.sort(key=lambda x: x['compatibility'], reverse=True)
+    return options
+
+
+def build_columns(index, candidates, earliest) -> OptionSet:
+    options = OptionSet()
+    for i, legs in enumerate(candidates):
+        options.add_itinerary(index, i, legs, 'Economy', itinerary_cost(index, legs, None), earliest)
+    options.sort_by_compatibility()
+    return options
+
+
+def timed(func, repeat: int = 3):
+    """
+    Best wall time of repeat runs, and the last result
+    """
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        result = None
+        gc.collect()
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def retained(func) -> tuple:
+    """
+    Bytes still allocated once func's result is built, and the peak while building it
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func()
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current - before, peak - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--options', type=int, default=100_000)
+    parser.add_argument('--flights', type=int, default=100_000)
+    args = parser.parse_args()
+
+    start = datetime.datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    index = FlightIndex.from_records(synthetic_schedule(args.flights, start=start))
+    earliest = min(index.departure)
+    candidates = itineraries(index, args.options, random.Random(7))
+
+    dict_build, dicts = timed(lambda: build_dicts(index, candidates, earliest))
+    column_build, columns = timed(lambda: build_columns(index, candidates, earliest))
+    dict_json_time, dict_json = timed(lambda: codec.dumps({'success': True, 'options': dicts}))
+    column_json_time, column_json = timed(lambda: dumps({'success': True, 'options': columns}))
+    dict_memory, dict_peak = retained(lambda: build_dicts(index, candidates, earliest))
+    column_memory, column_peak = retained(lambda: build_columns(index, candidates, earliest))
+
+    print(f"{len(candidates)} options ({sum(len(legs) > 1 for legs in candidates)} connecting) "
+          f"from {args.flights} flights")
+    print(f"{'':14}{'build':>10}{'to JSON':>10}{'total':>10}{'held':>12}{'peak':>12}")
+    for name, build, encode, memory, peak in (
+        ('option dicts', dict_build, dict_json_time, dict_memory, dict_peak),
+        ('OptionSet', column_build, column_json_time, column_memory, column_peak),
+    ):
+        print(f"{name:14}{build * 1000:8.0f}ms{encode * 1000:8.0f}ms{(build + encode) * 1000:8.0f}ms"
+              f"{memory / 2**20:9.1f}MiB{peak / 2**20:9.1f}MiB")
+    print(f"memory held: {dict_memory / column_memory:.1f}x less, "
+          f"build + serialize: {(dict_build + dict_json_time) / (column_build + column_json_time):.1f}x faster")
+    print(f"JSON identical ({codec.get_codec().name}): {dict_json == column_json} ({len(column_json) / 2**20:.1f} MiB), "
+          f"rows identical: {dicts == columns.to_dicts()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""
+Benchmark: local language identification and lexicon sentiment ahead of Comprehend.
+Runs a hand-labeled multilingual sample of passenger messages through
+lib.preclassifier and lib.comprehend.analyze_sentiment (stub Comprehend):
+language accuracy, how many Comprehend calls are avoided, accuracy of the
+locally decided sentiment, which LanguageCode reaches Comprehend, and cost per message.
+
+Usage:
+    python bench_preclassifier.py [--repeat 20]
+"""
+import argparse
+import collections
+import os
+import time
+
+import _paths  # noqa: F401
+from stubs import StubComprehend
+
+os.environ.setdefault('LOG_LEVEL', 'CRITICAL')
+# One Comprehend call per analyzed message, so calls count messages
+os.environ.setdefault('USE_HEDGED_REQUESTS', 'false')
+
+import lib.comprehend as comprehend  # noqa: E402
+from lib.clients import set_client  # noqa: E402
+from lib.preclassifier import comprehend_language, preclassify  # noqa: E402
+
+# (message, language, sentiment); written for this benchmark, separate from the n-gram training text
+SAMPLE = [
+    ("Thank you, that's perfect!", 'en', 'POSITIVE'),
+    ('ok', 'en', 'NEUTRAL'),
+    ('Thanks a lot for sorting this out so fast', 'en', 'POSITIVE'),
+    ('This is absolutely ridiculous, third delay today!', 'en', 'NEGATIVE'),
+    ('Which terminal does the new flight leave from?', 'en', 'NEUTRAL'),
+    ('I missed my daughter\'s wedding because of you. Unacceptable.', 'en', 'NEGATIVE'),
+    ('Can I take the 6pm flight instead?', 'en', 'NEUTRAL'),
+    ('Great, appreciate it', 'en', 'POSITIVE'),
+    ('My bag is lost and nobody at the desk can help', 'en', 'NEGATIVE'),
+    ('Do I get a meal voucher?', 'en', 'NEUTRAL'),
+    ('Thanks, but the hotel you sent us to was awful', 'en', 'MIXED'),
+    ('The crew were lovely, no complaints', 'en', 'POSITIVE'),
+    ('I am furious. Worst airline ever!', 'en', 'NEGATIVE'),
+    ('yes', 'en', 'NEUTRAL'),
+    ('Not good enough.', 'en', 'NEGATIVE'),
+    ('Please rebook me on the earliest option', 'en', 'NEUTRAL'),
+    ('Super helpful, thank you so much', 'en', 'POSITIVE'),
+    ('Why was my flight cancelled?', 'en', 'NEUTRAL'),
+    ('Sure, option B works', 'en', 'NEUTRAL'),
+    ('Thanks for nothing.', 'en', 'NEGATIVE'),
+    ('Great, cancelled again. Just great.', 'en', 'NEGATIVE'),
+    ('Perfect... another three hours in this terminal', 'en', 'NEGATIVE'),
+    ('Thanks a lot for nothing.', 'en', 'NEGATIVE'),
+    ('Great job losing my bag', 'en', 'NEGATIVE'),
+    ('I love how nobody answers the phone', 'en', 'NEGATIVE'),
+    ('Oh great, wonderful service as always', 'en', 'NEGATIVE'),
+    ('Fine. Whatever.', 'en', 'NEGATIVE'),
+    ('Super, schon wieder gestrichen', 'de', 'NEGATIVE'),
+    ('Merci pour rien', 'fr', 'NEGATIVE'),
+    ('I have been stuck here for nine hours with two kids, this is terrible', 'en', 'NEGATIVE'),
+    ('¡Muchas gracias, perfecto!', 'es', 'POSITIVE'),
+    ('Vale', 'es', 'NEUTRAL'),
+    ('Es inaceptable, llevo seis horas esperando', 'es', 'NEGATIVE'),
+    ('¿A qué hora sale el siguiente vuelo a Barcelona?', 'es', 'NEUTRAL'),
+    ('Perdí mi conexión y nadie me ayuda', 'es', 'NEGATIVE'),
+    ('Gracias por la ayuda, muy amable', 'es', 'POSITIVE'),
+    ('¿Puedo llevar mi equipaje al hotel?', 'es', 'NEUTRAL'),
+    ('Es la peor aerolínea del mundo, una vergüenza', 'es', 'NEGATIVE'),
+    ('No está mal, gracias', 'es', 'POSITIVE'),
+    ('Necesito cambiar mi asiento', 'es', 'NEUTRAL'),
+    ('Merci beaucoup, c\'est parfait', 'fr', 'POSITIVE'),
+    ('D\'accord', 'fr', 'NEUTRAL'),
+    ('C\'est inacceptable, j\'ai raté mon rendez-vous', 'fr', 'NEGATIVE'),
+    ('À quelle heure part le prochain vol pour Lyon?', 'fr', 'NEUTRAL'),
+    ('Service nul, personne ne répond', 'fr', 'NEGATIVE'),
+    ('Le personnel était très aimable, merci', 'fr', 'POSITIVE'),
+    ('Est-ce que je peux avoir un siège côté hublot?', 'fr', 'NEUTRAL'),
+    ('Je suis furieux, c\'est scandaleux!', 'fr', 'NEGATIVE'),
+    ('Mes bagages sont où maintenant?', 'fr', 'NEUTRAL'),
+    ('Merci, mais l\'hôtel était horrible', 'fr', 'MIXED'),
+    ('Vielen Dank, super!', 'de', 'POSITIVE'),
+    ('Alles klar', 'de', 'NEUTRAL'),
+    ('Das ist eine Katastrophe, ich habe meinen Anschluss verpasst', 'de', 'NEGATIVE'),
+    ('Wann fliegt die nächste Maschine nach München?', 'de', 'NEUTRAL'),
+    ('Ich bin sehr enttäuscht von Ihrem Service', 'de', 'NEGATIVE'),
+    ('Danke, das hat prima geklappt', 'de', 'POSITIVE'),
+    ('Kann ich mein Gepäck direkt durchchecken?', 'de', 'NEUTRAL'),
+    ('Unverschämt! Seit fünf Stunden keine Information!', 'de', 'NEGATIVE'),
+    ('Brauche ich ein neues Ticket?', 'de', 'NEUTRAL'),
+    ('Nicht schlecht, danke', 'de', 'POSITIVE'),
+    ('Grazie mille, gentilissimi', 'it', 'POSITIVE'),
+    ('Va bene', 'it', 'NEUTRAL'),
+    ('È una vergogna, ho perso la coincidenza', 'it', 'NEGATIVE'),
+    ('A che ora parte il prossimo volo per Milano?', 'it', 'NEUTRAL'),
+    ('Servizio pessimo, sono molto deluso', 'it', 'NEGATIVE'),
+    ('Perfetto, grazie per l\'aiuto', 'it', 'POSITIVE'),
+    ('Posso cambiare il mio posto?', 'it', 'NEUTRAL'),
+    ('Non è accettabile aspettare così tanto', 'it', 'NEGATIVE'),
+    ('Dove ritiro il bagaglio?', 'it', 'NEUTRAL'),
+    ('Muito obrigado, perfeito!', 'pt', 'POSITIVE'),
+    ('Combinado', 'pt', 'NEUTRAL'),
+    ('Isto é inaceitável, perdi a minha ligação', 'pt', 'NEGATIVE'),
+    ('A que horas sai o próximo voo para o Porto?', 'pt', 'NEUTRAL'),
+    ('Atendimento péssimo, estou muito irritado', 'pt', 'NEGATIVE'),
+    ('Obrigada pela ajuda, foram muito simpáticos', 'pt', 'POSITIVE'),
+    ('Posso levar a bagagem de mão?', 'pt', 'NEUTRAL'),
+    ('Que vergonha, ninguém explica nada', 'pt', 'NEGATIVE'),
+    ('Hartelijk bedankt, geweldig geregeld', 'nl', 'POSITIVE'),
+    ('Oké', 'nl', 'NEUTRAL'),
+    ('Dit is belachelijk, ik heb mijn aansluiting gemist', 'nl', 'NEGATIVE'),
+    ('Hoe laat vertrekt de volgende vlucht naar Rotterdam?', 'nl', 'NEUTRAL'),
+    ('Ik ben echt boos en teleurgesteld', 'nl', 'NEGATIVE'),
+    ('Dank u, heel vriendelijk', 'nl', 'POSITIVE'),
+    ('Waar kan ik mijn koffer ophalen?', 'nl', 'NEUTRAL'),
+    ('フライトがキャンセルされました。どうすればいいですか？', 'ja', 'NEUTRAL'),
+    ('本当にありがとうございます', 'ja', 'POSITIVE'),
+    ('我的航班被取消了，太糟糕了', 'zh', 'NEGATIVE'),
+    ('下一班飞机几点起飞？', 'zh', 'NEUTRAL'),
+    ('도와주셔서 감사합니다', 'ko', 'POSITIVE'),
+    ('제 가방은 어디에 있나요?', 'ko', 'NEUTRAL'),
+    ('رحلتي ألغيت وهذا غير مقبول', 'ar', 'NEGATIVE'),
+    ('متى تغادر الرحلة التالية؟', 'ar', 'NEUTRAL'),
+    ('मेरी उड़ान रद्द हो गई, यह बहुत बुरा है', 'hi', 'NEGATIVE'),
+    ('अगली उड़ान कब है?', 'hi', 'NEUTRAL'),
+]
+
+
+class RecordingComprehend(StubComprehend):
+    """
+    Stub Comprehend that also counts the LanguageCode of each call
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.languages = collections.Counter()
+
+    def detect_sentiment(self, Text, LanguageCode):
+        self.languages[LanguageCode] += 1
+        return super().detect_sentiment(Text, LanguageCode)
+
+
+def per_message_us(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text, _, _ in SAMPLE:
+            func(text)
+    return (time.perf_counter() - start) * 1e6 / (repeat * len(SAMPLE))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=20, help='passes over the sample when timing')
+    args = parser.parse_args()
+
+    by_language = collections.Counter(language for _, language, _ in SAMPLE)
+    print(f"Labeled sample: {len(SAMPLE)} messages, {len(by_language)} languages "
+          f"({', '.join(f'{language} {count}' for language, count in by_language.items())})")
+
+    guesses = [preclassify(text) for text, _, _ in SAMPLE]
+    correct = sum(g.language == language for g, (_, language, _) in zip(guesses, SAMPLE))
+    wrong = collections.Counter(f"{language}->{g.language}" for g, (_, language, _) in zip(guesses, SAMPLE)
+                                if g.language != language)
+    print(f"\nLanguage identification: {correct}/{len(SAMPLE)} correct ({correct / len(SAMPLE):.0%})"
+          + (f"; misses {dict(wrong)}" if wrong else ''))
+    hardcoded = sum(comprehend_language(language) == 'en' for _, language, _ in SAMPLE)
+    routed = sum(comprehend_language(g.language) == comprehend_language(language) for g, (_, language, _)
+                 in zip(guesses, SAMPLE))
+    print(f"  right Comprehend LanguageCode: {routed}/{len(SAMPLE)} with detection, {hardcoded}/{len(SAMPLE)} "
+          f"with LanguageCode='en'")
+
+    local = [(g, label) for g, (_, _, label) in zip(guesses, SAMPLE) if g.sentiment is not None]
+    right = sum(g.sentiment['sentiment'] == label for g, label in local)
+    print(f"\nLocal sentiment: {len(local)}/{len(SAMPLE)} decided locally ({len(local) / len(SAMPLE):.0%}), "
+          f"{right}/{len(local)} of them correct ({right / max(1, len(local)):.0%})")
+    for g, (text, _, label) in zip(guesses, SAMPLE):
+        if g.sentiment is not None and g.sentiment['sentiment'] != label:
+            print(f"    wrong: {text!r} -> {g.sentiment['sentiment']} (labeled {label})")
+    decided = collections.Counter(label for _, label in local)
+    escalated = collections.Counter(label for g, (_, _, label) in zip(guesses, SAMPLE) if g.sentiment is None)
+    print(f"  decided locally by label: {dict(decided)}; sent to Comprehend: {dict(escalated)}")
+
+    print(f"\nanalyze_sentiment over the sample (stub Comprehend, no latency)")
+    print(f"  {'':28}{'Comprehend calls':>18}{'avoided':>10}  LanguageCodes sent")
+    for name, enabled in (('before: LanguageCode=en', False), ('after: pre-classifier', True)):
+        stub = RecordingComprehend(latency=0)
+        set_client('comprehend', stub)
+        comprehend.USE_LOCAL_SENTIMENT = enabled
+        if not enabled:
+            # The old path: every message, always as English
+            for text, _, _ in SAMPLE:
+                comprehend.analyze_sentiment(text, 'en')
+        else:
+            for text, _, _ in SAMPLE:
+                comprehend.analyze_sentiment(text)
+        print(f"  {name:28}{stub.calls:>18}{1 - stub.calls / len(SAMPLE):>10.0%}  {dict(stub.languages)}")
+
+    set_client('comprehend', StubComprehend(latency=0))
+    comprehend.USE_LOCAL_SENTIMENT = True
+    print(f"\nCost per message: preclassify {per_message_us(preclassify, args.repeat):.1f} µs, "
+          f"analyze_sentiment with stub {per_message_us(comprehend.analyze_sentiment, args.repeat):.1f} µs "
+          f"(a Comprehend call is typically 20-100 ms)")
+
+
+if __name__ == '__main__':
+    main()
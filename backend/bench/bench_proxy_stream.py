@@ -0,0 +1,58 @@
+"""
+Benchmark: time to first byte for the buffered chat proxy vs. the streaming one,
+against a stub AgentCore client that emits delayed chunks. Turns carry a short
+web-client session ID (SES-xxxxxxxx), which must still reach one valid runtime session.
+
+Usage:
+    python bench_proxy_stream.py [--chunks 10] [--chunk-delay 0.05]
+"""
+import argparse
+import json
+import time
+
+import _paths  # noqa: F401
+from stubs import StubAgentCore
+
+import handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--chunks', type=int, default=10)
+    parser.add_argument('--chunk-delay', type=float, default=0.05)
+    args = parser.parse_args()
+
+    # The web client's generateId('SES') IDs are ~12 characters, below AgentCore's 33
+    body = {'message': 'Am I owed compensation?', 'sessionId': 'SES-k3j9x2a1'}
+    handler.METRICS_ENABLED = False
+
+    buffered_client = StubAgentCore(chunks=args.chunks, chunk_delay=args.chunk_delay, streaming=False)
+    handler.set_agentcore_client(buffered_client)
+    start = time.perf_counter()
+    buffered = json.loads(handler.handle_chat(body)['body'])
+    buffered_total = time.perf_counter() - start
+
+    streaming_client = StubAgentCore(chunks=args.chunks, chunk_delay=args.chunk_delay, streaming=True)
+    handler.set_agentcore_client(streaming_client)
+    start = time.perf_counter()
+    first_byte, events = None, []
+    for event in handler.stream_chat(body):
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+        events.append(event)
+    stream_total = time.perf_counter() - start
+    done = json.loads(events[-1].split('data: ', 1)[1])
+
+    print(f"buffered:  first byte {buffered_total * 1000:7.1f} ms, total {buffered_total * 1000:7.1f} ms")
+    print(f"streaming: first byte {first_byte * 1000:7.1f} ms, total {stream_total * 1000:7.1f} ms, "
+          f"{len(events) - 1} delta events")
+    print(f"same final text: {done['assistant'] == buffered['assistant']}, "
+          f"citations: {len(done['citations'])}")
+    runtime_ids = set(buffered_client.session_ids + streaming_client.session_ids)
+    print(f"client session {body['sessionId']} -> runtime session {runtime_ids.pop()} "
+          f"(one per conversation: {not runtime_ids}), reply keeps {done['sessionId']}")
+    assert 'error' not in buffered and not runtime_ids and done['sessionId'] == body['sessionId']
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Benchmark: tool tail latency with and without circuit breakers, hedged requests and deadlines.
+Comprehend and Translate stubs inject latency spikes, a full brownout (every call slow
+and failing) and a stall longer than the caller's budget; each scenario runs through
+main.handler unguarded (previous behaviour) and guarded. Translate calls are coalesced
+(single-flight), so only Comprehend is hedged.
+
+Usage:
+    python bench_resilience.py [--requests 600] [--concurrency 8] [--spike-rate 0.03] [--spike 1.5]
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import _paths  # noqa: F401
+from stubs import StubComprehend, StubTranslate
+
+os.environ.setdefault('LOG_LEVEL', 'CRITICAL')
+os.environ.setdefault('METRICS_FLUSH_INTERVAL_SECONDS', '3600')
+# Every sentiment call should reach (stub) Comprehend, not be answered locally
+os.environ.setdefault('USE_LOCAL_SENTIMENT', 'false')
+
+import main as agent  # noqa: E402
+from lib import metrics, resilience  # noqa: E402
+from lib.clients import set_client  # noqa: E402
+from lib.log import configure_logging  # noqa: E402
+
+SERVICES = ('comprehend', 'translate')
+
+
+def guard(guarded: bool):
+    """
+    Fresh guards per run: configured ones (breakers, hedges) or pass-through ones
+    """
+    resilience.reset_dependencies()
+    if not guarded:
+        for service in SERVICES:
+            resilience.set_dependency(service, resilience.Dependency(service))
+
+
+def events(count: int, start: int = 0, timeout: float = None) -> list:
+    """
+    Alternating sentiment and translate calls, each text distinct so nothing is coalesced
+    """
+    result = []
+    for n in range(start, start + count):
+        if n % 2:
+            event = {'toolName': 'analyze_passenger_sentiment',
+                     'toolInput': {'text': f"My flight {n} was cancelled and this is unacceptable"}}
+        else:
+            event = {'toolName': 'translate_message',
+                     'toolInput': {'text': f"Your new flight {n} departs at 14:05.", 'target_language': 'de',
+                                   'source_language': 'en'}}
+        if timeout is not None:
+            event['timeoutSeconds'] = timeout
+        result.append(event)
+    return result
+
+
+def run(batch: list, concurrency: int) -> tuple:
+    """
+    Per-request latencies (ms) and tool results
+    """
+    def call(event):
+        start = time.perf_counter()
+        response = agent.handler(event, None)
+        return (time.perf_counter() - start) * 1000, response
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(call, batch))
+    return [latency for latency, _ in outcomes], [response for _, response in outcomes]
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def report(name: str, latencies: list, responses: list, backend_calls: int):
+    fallbacks = sum(json.loads(response['body']).get('success') is False for response in responses)
+    print(f"  {name:10}{percentile(latencies, 0.5):9.1f}{percentile(latencies, 0.95):9.1f}"
+          f"{percentile(latencies, 0.99):9.1f}{max(latencies):9.1f}{backend_calls:9d}{fallbacks:10d}")
+
+
+def header(title: str):
+    print(f"\n{title}")
+    print(f"  {'':10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'calls':>9}{'fallbacks':>10}")
+
+
+def counters() -> str:
+    values = {name.split('resilience.')[1]: value for name, value in metrics.snapshot()['counters'].items()
+              if name.startswith('resilience.')}
+    return ', '.join(f"{name}={value}" for name, value in sorted(values.items())) or 'none'
+
+
+def install(profile: dict) -> list:
+    stubs = [StubComprehend(seed=1, **profile), StubTranslate(seed=2, **profile)]
+    set_client('comprehend', stubs[0])
+    set_client('translate', stubs[1])
+    return stubs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=600)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--spike-rate', type=float, default=0.03, help='fraction of calls that stall')
+    parser.add_argument('--spike', type=float, default=1.5, help='stall length in seconds')
+    args = parser.parse_args()
+
+    configure_logging('CRITICAL')
+    agent.USE_COMPREHEND = True
+    agent.USE_TRANSLATE = True
+    agent.USE_TRANSLATION_MEMORY = False
+    agent.translation_memory = None
+
+    header(f"Latency spikes: 20 ms calls, {args.spike_rate:.0%} stall {args.spike:.1f} s "
+           f"({args.requests} requests, concurrency {args.concurrency})")
+    warmup = events(100, start=10 ** 6)
+    for guarded in (False, True):
+        guard(guarded)
+        stubs = install({'latency': 0.02, 'jitter': 0.3, 'spike_rate': args.spike_rate, 'spike_latency': args.spike})
+        run(warmup, args.concurrency)  # hedge thresholds need recent latencies
+        metrics.reset()
+        calls = sum(stub.calls for stub in stubs)
+        latencies, responses = run(events(args.requests), args.concurrency)
+        report('guarded' if guarded else 'unguarded', latencies, responses, sum(stub.calls for stub in stubs) - calls)
+    print(f"  guarded: {counters()}")
+
+    brownout = min(args.requests, 100)
+    header(f"Brownout: every call takes 2.5 s and fails ({brownout} requests, concurrency {args.concurrency})")
+    for guarded in (False, True):
+        guard(guarded)
+        stubs = install({'latency': 2.5, 'error_rate': 1.0})
+        metrics.reset()
+        latencies, responses = run(events(brownout), args.concurrency)
+        report('guarded' if guarded else 'unguarded', latencies, responses, sum(stub.calls for stub in stubs))
+    print(f"  guarded: {counters()}")
+
+    stalled = min(args.requests, 40)
+    header(f"Stall past the caller's budget: calls take 3 s, caller allows 0.5 s ({stalled} requests)")
+    for guarded in (False, True):
+        guard(guarded)
+        stubs = install({'latency': 3.0})
+        metrics.reset()
+        # Unguarded, the budget is not forwarded, as before; guarded, timeoutSeconds bounds every AWS wait
+        latencies, responses = run(events(stalled, timeout=0.5 if guarded else None), args.concurrency)
+        report('guarded' if guarded else 'unguarded', latencies, responses, sum(stub.calls for stub in stubs))
+    print(f"  guarded: {counters()}")
+    # One caller's short budget is not the service failing: no circuit may open
+    states = resilience.circuit_states()
+    print(f"  circuits after the stall: {states}")
+    assert all(state == resilience.CircuitBreaker.CLOSED for state in states.values()), states
+
+
+if __name__ == '__main__':
+    main()
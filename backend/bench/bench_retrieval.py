@@ -0,0 +1,86 @@
+"""
+Benchmark: query_policy answered by the local BM25 index vs. a Bedrock knowledge base round trip.
+
+Usage:
+    python bench_retrieval.py [--rounds 50] [--kb-latency 1.5]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import _paths  # noqa: F401
+from stubs import StubBedrockAgent
+
+import main as agent
+from config import KNOWLEDGE_BASE_DOCS_DIR
+from lib import retrieval
+from lib.clients import set_client
+from lib.log import configure_logging
+
+QUESTIONS = [
+    "How much compensation will I receive for a flight over 3,500 km?",
+    "My flight is delayed, what am I entitled to?",
+    "Can I be rebooked on a different airline?",
+    "Do Platinum members get lounge access?",
+    "I missed my connection because of the delay. What happens?",
+    "Who handles my rebooking if I booked through a travel agent?",
+    "What are the hotel accommodation rules for overnight delays?",
+    "How long do you keep passenger data?",
+    "What is the weather in Paris?",
+    "Can I bring my pet in the cabin?",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--kb-latency', type=float, default=1.5)
+    args = parser.parse_args()
+    configure_logging('WARNING')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = os.path.join(tmp, 'policy-index.idx')
+
+        t = time.perf_counter()
+        index = retrieval.LocalIndex.build(KNOWLEDGE_BASE_DOCS_DIR)
+        build_ms = (time.perf_counter() - t) * 1000
+        index.save(index_path)
+        t = time.perf_counter()
+        retrieval.LocalIndex.load(index_path)
+        load_ms = (time.perf_counter() - t) * 1000
+
+    print(f"Index: {len(index)} chunks, build {build_ms:.1f} ms, load from disk {load_ms:.1f} ms\n")
+
+    retrieval.set_local_index(index)
+    agent.policy_cache.max_entries = 0
+    stub = StubBedrockAgent(latency=args.kb_latency)
+    set_client('bedrock-agent-runtime', stub)
+
+    print(f"{'question':<62} {'conf':>5}  {'source':<8} {'ms':>8}")
+    local_questions = []
+    for question in QUESTIONS:
+        t = time.perf_counter()
+        result = agent.query_policy(question)
+        elapsed = (time.perf_counter() - t) * 1000
+        source = result.get('source', 'bedrock')
+        if source == 'local':
+            local_questions.append(question)
+        print(f"  {question[:60]:<60} {result.get('confidence', 0):5.2f}  {source:<8} {elapsed:8.2f}")
+
+    latencies = []
+    for _ in range(args.rounds):
+        for question in local_questions:
+            t = time.perf_counter()
+            agent.query_policy(question)
+            latencies.append((time.perf_counter() - t) * 1000)
+
+    print(f"\nAnswered locally: {len(local_questions)}/{len(QUESTIONS)} "
+          f"({stub.calls} knowledge base calls, {args.kb_latency * 1000:.0f} ms each)")
+    if latencies:
+        print(f"Local query_policy latency: p50 {statistics.median(latencies):.3f} ms, "
+              f"max {max(latencies):.3f} ms over {len(latencies)} calls")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark: per-message detect_sentiment loop vs. batched, concurrent batch_detect_sentiment.
+
+Usage:
+    python bench_sentiment_batch.py [--messages 500] [--latency 0.02]
+"""
+import argparse
+import time
+
+import _paths  # noqa: F401
+from stubs import StubComprehend
+
+import lib.comprehend as comprehend
+from lib.clients import set_client
+
+
+SAMPLE_MESSAGES = [
+    'My flight was cancelled and this is unacceptable',
+    'Thanks for the quick rebooking, great service',
+    'Can I get a hotel voucher for tonight?',
+    'I missed my connection in Munich',
+    'What time does the new flight leave?',
+]
+
+
+def run(label, func, messages, stub):
+    stub.calls = 0
+    start = time.perf_counter()
+    results = func(messages)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<10} {len(results):>5} msgs  {stub.calls:>4} API calls  "
+          f"{elapsed * 1000:>8.1f} ms  {len(results) / elapsed:>9.0f} msgs/s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.02, help='Stub latency per API call (seconds)')
+    args = parser.parse_args()
+
+    messages = [SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)] + f' #{i}' for i in range(args.messages)]
+    stub = StubComprehend(latency=args.latency, failing_texts={messages[7]})
+    set_client('comprehend', stub)
+
+    print(f"Sentiment benchmark: {args.messages} messages, {args.latency * 1000:.0f} ms per API call")
+    loop = run('loop', lambda texts: [_safe(comprehend.analyze_sentiment, t) for t in texts], messages, stub)
+    batch = run('batch', comprehend.analyze_sentiment_batch, messages, stub)
+
+    mismatches = sum(1 for a, b in zip(loop, batch) if a.get('sentiment') != b.get('sentiment'))
+    print(f"  results differing between modes: {mismatches}")
+
+
+def _safe(func, text):
+    try:
+        return func(text)
+    except Exception as e:
+        return {'error': str(e)}
+
+
+if __name__ == '__main__':
+    main()
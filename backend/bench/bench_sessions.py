@@ -0,0 +1,101 @@
+"""
+Benchmark: per-turn latency of a scripted multi-turn conversation, stateless vs. with a session.
+With a sessionId, later turns reuse the passenger context and identical earlier tool results.
+
+Usage:
+    python bench_sessions.py [--conversations 5] [--latency 0.2]
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+import _paths  # noqa: F401
+from stubs import StubBedrockAgent, StubComprehend, StubTranslate
+
+import main as agent
+from lib.clients import set_client
+from lib.log import configure_logging
+from lib.sessions import SessionStore, SqliteSessionBackend
+
+PASSENGER = {"passenger_id": "P-1042", "origin": "FRA", "destination": "JFK", "tier": "Gold"}
+QUESTION = "Am I entitled to compensation for a cancelled flight?"
+
+# (label, tool, input with a session, input without one)
+SCRIPT = [
+    ("rebooking options", "generate_rebooking_options", PASSENGER, PASSENGER),
+    ("sentiment", "analyze_passenger_sentiment", {"text": "This cancellation is terrible"},
+     {"text": "This cancellation is terrible"}),
+    ("policy question", "query_policy", {"query": QUESTION}, {"query": QUESTION}),
+    ("show options again", "generate_rebooking_options", {}, PASSENGER),
+    ("policy follow-up", "query_policy", {"query": QUESTION}, {"query": QUESTION}),
+    ("translate notice", "translate_message", {"text": "Your new flight is confirmed.", "target_language": "de"},
+     {"text": "Your new flight is confirmed.", "target_language": "de"}),
+    ("confirm booking", "confirm_booking", {"option_id": "A"}, {"passenger_id": "P-1042", "option_id": "A"}),
+]
+
+
+def converse(session_id):
+    timings = []
+    for label, tool, with_session, stateless in SCRIPT:
+        event = {"toolName": tool, "toolInput": dict(with_session if session_id else stateless)}
+        if session_id:
+            event["sessionId"] = session_id
+        start = time.perf_counter()
+        response = agent.handler(event, None)
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response["statusCode"] == 200, response
+        assert json.loads(response["body"]).get("success"), response
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--conversations', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.2)
+    args = parser.parse_args()
+    configure_logging('WARNING')
+
+    set_client('bedrock-agent-runtime', StubBedrockAgent(latency=args.latency))
+    set_client('comprehend', StubComprehend(latency=args.latency / 4))
+    set_client('translate', StubTranslate(latency=args.latency / 4))
+    # Isolate the session layer from the process-wide policy cache and local index
+    agent.USE_TRANSLATE = True
+    agent.USE_LOCAL_RETRIEVAL = False
+    agent.policy_cache.max_entries = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'sessions.db')
+        agent.session_store = SessionStore(backend=SqliteSessionBackend(db_path))
+
+        runs = {'stateless': [], 'session': []}
+        for _ in range(args.conversations):
+            runs['stateless'].append(converse(None))
+            runs['session'].append(converse(str(uuid.uuid4())))
+
+        print(f"{args.conversations} conversations, {args.latency * 1000:.0f} ms knowledge base latency\n")
+        print(f"{'turn':<22} {'stateless ms':>13} {'session ms':>11}")
+        for n, (label, *_rest) in enumerate(SCRIPT):
+            stateless = statistics.median(run[n] for run in runs['stateless'])
+            session = statistics.median(run[n] for run in runs['session'])
+            print(f"{label:<22} {stateless:13.2f} {session:11.2f}")
+        total_stateless = statistics.median(sum(run) for run in runs['stateless'])
+        total_session = statistics.median(sum(run) for run in runs['session'])
+        print(f"{'conversation total':<22} {total_stateless:13.2f} {total_session:11.2f}  "
+              f"({(1 - total_session / total_stateless) * 100:.0f}% less)")
+
+        # A fresh store (restart / another worker) picks the session up from the backend
+        session_id = str(uuid.uuid4())
+        converse(session_id)
+        agent.session_store = SessionStore(backend=SqliteSessionBackend(db_path))
+        state = agent.session_store.get(session_id)
+        print(f"\nReloaded from SQLite: turns={state.turns} passenger={state.passenger.passenger_id} "
+              f"options={len(state.options)} sentiment={state.sentiment} language={state.language} "
+              f"cached results={len(state.results)} ({len(state.to_json())} bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark: cold-start import time of the agent handler, lazy tool modules vs. importing every tool module up front.
+Each sample is a fresh interpreter; --importtime prints the slowest imports (python -X importtime).
+
+Usage:
+    python bench_startup.py [--runs 15] [--importtime]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+import _paths
+
+EAGER_MODULES = [
+    'lib.bedrock', 'lib.comprehend', 'lib.translate', 'lib.translation_memory', 'lib.passengers',
+    'lib.inventory', 'lib.rebooking', 'lib.retrieval', 'lib.executor', 'lib.util',
+]
+
+MODES = {
+    'lazy (handler only)': 'import main',
+    'eager (all tool modules)': 'import main\n' + '\n'.join(f'import {m}' for m in EAGER_MODULES),
+}
+
+PROBE = '''
+import time
+start = time.perf_counter()
+{imports}
+elapsed = time.perf_counter() - start
+import sys
+print(elapsed * 1000, sum(1 for name in sys.modules if name.startswith('lib.')), 'boto3' in sys.modules)
+'''
+
+
+def sample(imports: str) -> tuple:
+    out = subprocess.run(
+        [sys.executable, '-c', PROBE.format(imports=imports)],
+        cwd=_paths.AGENT_SRC_DIR, capture_output=True, text=True, check=True,
+        env=dict(os.environ, LOG_LEVEL='WARNING')
+    ).stdout.split()
+    return float(out[0]), int(out[1]), out[2] == 'True'
+
+
+def slowest_imports(limit: int = 15):
+    err = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main'],
+        cwd=_paths.AGENT_SRC_DIR, capture_output=True, text=True, env=dict(os.environ, LOG_LEVEL='WARNING')
+    ).stderr
+    rows = []
+    for line in err.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    for cumulative, name in sorted(rows, reverse=True)[:limit]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=15)
+    parser.add_argument('--importtime', action='store_true')
+    args = parser.parse_args()
+
+    results = {}
+    for label, imports in MODES.items():
+        samples = [sample(imports) for _ in range(args.runs)]
+        times = [s[0] for s in samples]
+        results[label] = statistics.median(times)
+        print(f"{label:<26} median {statistics.median(times):6.1f} ms  min {min(times):6.1f} ms  "
+              f"lib modules {samples[0][1]:2d}  boto3 imported: {samples[0][2]}")
+
+    lazy, eager = results['lazy (handler only)'], results['eager (all tool modules)']
+    print(f"\nImport time reduced by {(1 - lazy / eager) * 100:.0f}%")
+
+    if args.importtime:
+        print("\nSlowest imports for 'import main' (cumulative):")
+        slowest_imports()
+
+
+if __name__ == '__main__':
+    main()
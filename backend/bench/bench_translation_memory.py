@@ -0,0 +1,61 @@
+"""
+Benchmark: templated agent messages translated with and without the translation memory.
+
+Usage:
+    python bench_translation_memory.py [--messages 1000] [--latency 0.01]
+"""
+import argparse
+import random
+import time
+
+import _paths  # noqa: F401
+from stubs import StubTranslate
+
+from lib.clients import set_client
+from lib.translate import translate_text, translate_with_memory
+from lib.translation_memory import TranslationMemory
+
+TEMPLATES = [
+    "We're sorry your flight was cancelled. You have been rebooked on {flight}. Your new PNR is {pnr}.",
+    "Under EU261 you may be entitled to compensation. Please keep your receipts for meals and hotels.",
+    "Your new flight {flight} departs at {time}. Please arrive at the gate 30 minutes before departure.",
+    "We're sorry your flight was cancelled. A hotel voucher has been added to your booking.",
+]
+LANGUAGES = ['de', 'fr', 'es', 'it', 'ja']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--messages', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.01)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    workload = [(rng.choice(TEMPLATES).format(flight=f"LH{rng.randrange(100, 130)}", pnr=f"PNR-{n:06d}",
+                                              time=f"{rng.randrange(6, 23)}:00"),
+                 rng.choice(LANGUAGES)) for n in range(args.messages)]
+
+    stub = StubTranslate(latency=args.latency)
+    set_client('translate', stub)
+    start = time.perf_counter()
+    for text, language in workload:
+        translate_text(text, 'en', language)
+    plain = time.perf_counter() - start
+    plain_calls, plain_chars = stub.calls, stub.characters
+
+    stub = StubTranslate(latency=args.latency)
+    set_client('translate', stub)
+    memory = TranslationMemory()
+    start = time.perf_counter()
+    for text, language in workload:
+        translate_with_memory(text, 'en', language, memory)
+    cached = time.perf_counter() - start
+
+    stats = memory.stats()
+    print(f"without memory: {plain * 1000:8.1f} ms  {plain_calls:5d} calls  {plain_chars:8d} chars billed")
+    print(f"with memory:    {cached * 1000:8.1f} ms  {stub.calls:5d} calls  {stub.characters:8d} chars billed")
+    print(f"segment hit rate {stats['hit_rate']:.1%}, saved {stats['saved_characters']} characters")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark: web asset upload, serial put of every file vs. incremental concurrent sync.
+Runs upload-web.py against an in-memory S3 stub: first upload, unchanged tree, and a
+tree with a few edited and removed files (--delete).
+
+Usage:
+    python bench_upload.py [--assets 300] [--latency 0.03] [--workers 16]
+"""
+import argparse
+import gzip
+import importlib.util
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import _paths
+from stubs import StubS3
+
+spec = importlib.util.spec_from_file_location('upload_web', os.path.join(_paths.BACKEND_DIR, 'upload-web.py'))
+upload = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(upload)
+
+API_URL = 'https://example.execute-api.us-east-1.amazonaws.com/Prod'
+WEB_SOURCE = os.path.join(_paths.BACKEND_DIR, '..', 'web')
+
+
+def build_tree(root: str, assets: int, seed: int = 11):
+    """
+    The real web/ plus generated scripts, styles and images
+    """
+    shutil.copytree(WEB_SOURCE, root)
+    rng = random.Random(seed)
+    words = ['flight', 'rebooking', 'passenger', 'delay', 'gate', 'policy', 'voucher', 'seat']
+    for n in range(assets):
+        kind = ('js', 'css', 'png')[n % 3]
+        path = os.path.join(root, 'assets', kind, f"asset-{n}.{kind}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if kind == 'png':
+            with open(path, 'wb') as f:
+                f.write(rng.randbytes(rng.randrange(2_000, 40_000)))
+        else:
+            lines = (f"const {rng.choice(words)}{i} = '{' '.join(rng.choices(words, k=8))}';"
+                     for i in range(rng.randrange(50, 800)))
+            with open(path, 'w') as f:
+                f.write('\n'.join(lines))
+
+
+def edit_tree(root: str, changed: int, removed: int):
+    scripts = sorted(os.listdir(os.path.join(root, 'assets', 'js')))
+    for name in scripts[:changed]:
+        with open(os.path.join(root, 'assets', 'js', name), 'a') as f:
+            f.write(f"\n// edited {time.time()}")
+    for name in scripts[changed:changed + removed]:
+        os.remove(os.path.join(root, 'assets', 'js', name))
+
+
+def run(label: str, s3, root: str, **options):
+    calls = s3.calls
+    start = time.perf_counter()
+    stats = upload.upload_web('bench-bucket', 'us-east-1', API_URL, s3=s3, web_dir=root, verbose=False, **options)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {elapsed * 1000:9.1f} ms  uploaded {stats['uploaded']:4d}  unchanged {stats['unchanged']:4d}  "
+          f"deleted {stats['deleted']:3d}  {stats['bytes'] / 1024:8.1f} KiB  S3 requests {s3.calls - calls:4d}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--assets', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.03)
+    parser.add_argument('--workers', type=int, default=16)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, 'web')
+        build_tree(root, args.assets)
+        print(f"{sum(len(files) for _, _, files in os.walk(root))} files, {args.latency * 1000:.0f} ms per S3 request\n")
+
+        # Previous behaviour: one put_object per file on every run, uncompressed
+        run('serial, every file', StubS3(args.latency), root, workers=1, force=True, compression='none')
+
+        s3 = StubS3(args.latency)
+        run('incremental, empty bucket', s3, root, workers=args.workers)
+        run('incremental, unchanged tree', s3, root, workers=args.workers)
+        edit_tree(root, changed=5, removed=3)
+        run('incremental, 5 edited, 3 removed', s3, root, workers=args.workers, delete=True)
+        run('incremental, unchanged again', s3, root, workers=args.workers, delete=True)
+
+        page = s3.objects['index.html']
+        restored = gzip.decompress(page['Body'])
+        with open(os.path.join(root, 'index.html'), 'rb') as f:
+            original = f.read()
+        print(f"\nindex.html: {page['ContentEncoding']}, {len(original)} -> {len(page['Body'])} bytes, "
+              f"Cache-Control '{page['CacheControl']}', round-trips: {restored == original}")
+
+
+if __name__ == '__main__':
+    main()
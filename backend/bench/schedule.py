@@ -0,0 +1,34 @@
+"""
+Synthetic flight schedules for benchmarks
+"""
+import datetime
+import random
+
+AIRPORTS = [
+    'ORD', 'ATL', 'DFW', 'LAX', 'MUC', 'LHR', 'CDG', 'FRA', 'JFK', 'SFO', 'SEA', 'BOS', 'MIA', 'DEN',
+    'AMS', 'MAD', 'FCO', 'ZRH', 'VIE', 'DUB', 'IAD', 'EWR', 'PHX', 'LAS', 'MSP', 'DTW', 'CLT', 'IAH',
+]
+CARRIERS = ['UA', 'LH', 'BA', 'AF', 'DL']
+
+
+def synthetic_schedule(flights: int = 100_000, days: int = 7, seed: int = 42, start: datetime.datetime = None) -> list:
+    """
+    Schedule records spread across all airport pairs over the given number of days
+    """
+    rng = random.Random(seed)
+    start = start or datetime.datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    records = []
+    for n in range(flights):
+        origin, destination = rng.sample(AIRPORTS, 2)
+        departure = start + datetime.timedelta(minutes=rng.randrange(0, days * 24 * 60, 5))
+        arrival = departure + datetime.timedelta(minutes=rng.randrange(60, 11 * 60, 5))
+        records.append({
+            'flight_number': f"{rng.choice(CARRIERS)}{1000 + n % 9000}",
+            'origin': origin,
+            'destination': destination,
+            'departure': departure.isoformat(),
+            'arrival': arrival.isoformat(),
+            'seats_available': rng.choice([0, 2, 5, 9, 14, 30]),
+            'fare': rng.randrange(80, 900),
+        })
+    return records
@@ -0,0 +1,215 @@
+"""
+Local stand-ins for AWS clients used by the benchmarks.
+Each stub sleeps for a configurable latency and counts backend calls; an
+optional jitter and error rate turn that into a latency/error profile.
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+
+
+NEGATIVE_WORDS = ('angry', 'terrible', 'worst', 'cancelled', 'missed', 'unacceptable')
+POSITIVE_WORDS = ('thanks', 'great', 'perfect', 'appreciate', 'good')
+
+
+class StubClient:
+    """
+    Base stub with latency injection and a thread-safe call counter.
+    jitter adds an exponential tail (in multiples of latency); error_rate is the
+    fraction of calls that fail with a throttling error after the delay;
+    spike_rate is the fraction of calls that stall for an extra spike_latency.
+    """
+
+    def __init__(self, latency: float = 0.02, jitter: float = 0.0, error_rate: float = 0.0, seed: int = None,
+                 spike_rate: float = 0.0, spike_latency: float = 1.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.spike_rate = spike_rate
+        self.spike_latency = spike_latency
+        self.calls = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _call(self):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency * (1 + self.jitter * self._rng.expovariate(1.0)) if self.jitter else self.latency
+            if self.spike_rate and self._rng.random() < self.spike_rate:
+                delay += self.spike_latency
+            failed = self.error_rate and self._rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        if delay:
+            time.sleep(delay)
+        if failed:
+            raise RuntimeError('ThrottlingException: Rate exceeded')
+
+
+class StubComprehend(StubClient):
+    """
+    Keyword-based sentiment with Comprehend's response shape
+    """
+
+    def __init__(self, latency: float = 0.02, failing_texts: set = None, **profile):
+        super().__init__(latency, **profile)
+        self.failing_texts = failing_texts or set()
+
+    def detect_sentiment(self, Text, LanguageCode):
+        self._call()
+        if Text in self.failing_texts:
+            raise RuntimeError('InternalServerException')
+        return self._score(Text)
+
+    def batch_detect_sentiment(self, TextList, LanguageCode):
+        self._call()
+        results, errors = [], []
+        for index, text in enumerate(TextList):
+            if text in self.failing_texts:
+                errors.append({'Index': index, 'ErrorCode': 'INTERNAL_SERVER_ERROR', 'ErrorMessage': 'stub failure'})
+            else:
+                results.append(dict(self._score(text), Index=index))
+        return {'ResultList': results, 'ErrorList': errors}
+
+    @staticmethod
+    def _score(text):
+        lowered = text.lower()
+        if any(word in lowered for word in NEGATIVE_WORDS):
+            return {'Sentiment': 'NEGATIVE', 'SentimentScore': {'Positive': 0.02, 'Negative': 0.9, 'Neutral': 0.06, 'Mixed': 0.02}}
+        if any(word in lowered for word in POSITIVE_WORDS):
+            return {'Sentiment': 'POSITIVE', 'SentimentScore': {'Positive': 0.9, 'Negative': 0.02, 'Neutral': 0.06, 'Mixed': 0.02}}
+        return {'Sentiment': 'NEUTRAL', 'SentimentScore': {'Positive': 0.05, 'Negative': 0.05, 'Neutral': 0.88, 'Mixed': 0.02}}
+
+
+class StubAgentCore(StubClient):
+    """
+    AgentCore Runtime stand-in whose response body arrives as delayed chunks.
+    With streaming=True it emits an event stream of text deltas followed by the
+    complete result; otherwise a single JSON document split across chunks.
+    Like the service, it rejects runtime session IDs outside 33-256 characters.
+    """
+
+    def __init__(self, text: str = None, chunks: int = 10, chunk_delay: float = 0.05,
+                 streaming: bool = True, latency: float = 0.0, citations: list = None, **profile):
+        super().__init__(latency, **profile)
+        self.text = text or ('Your flight has been cancelled. Under EU261 you are entitled to '
+                             'rebooking or a refund, plus compensation of up to 600 EUR. ')
+        self.chunks = chunks
+        self.chunk_delay = chunk_delay
+        self.streaming = streaming
+        self.citations = citations or [{'text': 'EU261 Article 7', 'location': {'type': 'S3'}}]
+        self.session_ids = []
+
+    def invoke_agent_runtime(self, **kwargs):
+        session_id = kwargs['runtimeSessionId']
+        if not 33 <= len(session_id) <= 256:
+            raise RuntimeError(f"ValidationException: runtimeSessionId must be 33-256 characters, got {len(session_id)}")
+        self.session_ids.append(session_id)
+        self._call()
+        citations = self.citations
+        result = {'response': self.text, 'citations': citations,
+                  'timestamp': '2026-01-01T00:00:00Z', 'source': 'stub-agentcore'}
+
+        if self.streaming:
+            size = max(1, len(self.text) // self.chunks)
+            parts = [f"data: {json.dumps({'delta': self.text[i:i + size]})}\n\n"
+                     for i in range(0, len(self.text), size)]
+            parts.append(f"data: {json.dumps(result)}\n\n")
+            content_type = 'text/event-stream'
+        else:
+            raw = json.dumps(result)
+            size = max(1, len(raw) // self.chunks)
+            parts = [raw[i:i + size] for i in range(0, len(raw), size)]
+            content_type = 'application/json'
+
+        return {'contentType': content_type, 'response': self._emit(parts)}
+
+    def _emit(self, parts):
+        for part in parts:
+            time.sleep(self.chunk_delay)
+            yield part.encode('utf-8')
+
+
+class StubTranslate(StubClient):
+    """
+    Line-preserving fake translation: prefixes each line with the target language
+    """
+
+    def __init__(self, latency: float = 0.02, **profile):
+        super().__init__(latency, **profile)
+        self.characters = 0
+
+    def translate_text(self, Text, SourceLanguageCode, TargetLanguageCode):
+        self._call()
+        with self._lock:
+            self.characters += len(Text)
+        translated = '\n'.join(f"[{TargetLanguageCode}] {line}" if line else line for line in Text.split('\n'))
+        return {
+            'TranslatedText': translated,
+            'SourceLanguageCode': 'en' if SourceLanguageCode == 'auto' else SourceLanguageCode,
+            'TargetLanguageCode': TargetLanguageCode
+        }
+
+
+class StubBedrockAgent(StubClient):
+    """
+    Knowledge base stub returning a canned retrieve_and_generate response
+    """
+
+    def __init__(self, latency: float = 1.5, answer: str = 'Policy answer from the knowledge base.',
+                 error: str = None, **profile):
+        super().__init__(latency, **profile)
+        self.answer = answer
+        self.error = error
+
+    def retrieve_and_generate(self, input, retrieveAndGenerateConfiguration):
+        self._call()
+        if self.error:
+            raise RuntimeError(self.error)
+        return {
+            'output': {'text': self.answer},
+            'citations': [{'retrievedReferences': [{
+                'content': {'text': self.answer},
+                'location': {'type': 'S3', 's3Location': {'uri': 's3://policies/airline-policy.md'}}
+            }]}]
+        }
+
+
+class StubS3(StubClient):
+    """
+    In-memory bucket: put/list/delete with S3's MD5 ETags and 1000-key list pages
+    """
+
+    PAGE_SIZE = 1000
+
+    def __init__(self, latency: float = 0.02, **profile):
+        super().__init__(latency, **profile)
+        self.objects = {}
+        self.puts = 0
+
+    def put_object(self, Bucket, Key, Body, **metadata):
+        self._call()
+        with self._lock:
+            self.puts += 1
+            self.objects[Key] = {'Body': Body, 'ETag': f'"{hashlib.md5(Body).hexdigest()}"', **metadata}
+        return {'ETag': self.objects[Key]['ETag']}
+
+    def delete_objects(self, Bucket, Delete):
+        self._call()
+        with self._lock:
+            for obj in Delete['Objects']:
+                self.objects.pop(obj['Key'], None)
+        return {}
+
+    def get_paginator(self, operation):
+        return self
+
+    def paginate(self, Bucket):
+        keys = sorted(self.objects)
+        for start in range(0, max(len(keys), 1), self.PAGE_SIZE):
+            self._call()
+            page = keys[start:start + self.PAGE_SIZE]
+            yield {'Contents': [{'Key': key, 'ETag': self.objects[key]['ETag']} for key in page], 'KeyCount': len(page)}
@@ -1,20 +1,29 @@
 #!/usr/bin/env python3
 """Upload web/ files to the S3 website bucket created by SAM.
 
+Only files whose content changed since the last upload are sent: local
+content hashes are compared with the ETags already in the bucket.
+
 Usage:
     python upload-web.py                          # auto-detect from stack
     python upload-web.py --bucket BUCKET_NAME     # explicit bucket
+    python upload-web.py --delete                 # also remove keys no longer in web/
+    python upload-web.py --force                  # re-upload everything
 """
 
 import argparse
-import json
+import gzip
+import hashlib
 import mimetypes
 import os
-import subprocess
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import boto3
-from botocore.exceptions import ClientError
+try:
+    import brotli
+except ImportError:  # optional; --compress br needs it
+    brotli = None
 
 STACK_NAME = os.environ.get("SAM_STACK_NAME", "genai-disruption-poc")
 REGION = os.environ.get("AWS_REGION", "us-east-1")
@@ -30,10 +39,35 @@ CONTENT_TYPES = {
     ".svg": "image/svg+xml",
     ".ico": "image/x-icon",
 }
+TEXT_EXTENSIONS = (".html", ".js", ".css", ".json", ".svg")
+
+# Files that get the deployed API URL patched in
+PATCHED_FILES = ("app.js", "config.js", "dashboard.html")
+
+# Asset names carry no content hash, so only images are cached for long;
+# pages and patched files are revalidated on every load
+CACHE_CONTROL = {
+    ".html": "no-cache",
+    ".json": "no-cache",
+    ".js": "public, max-age=300",
+    ".css": "public, max-age=300",
+}
+DEFAULT_CACHE_CONTROL = "public, max-age=86400"
+
+# Text files smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 1024
+
+# S3 serves one encoding to every client: gzip works everywhere, while browsers
+# only accept br over HTTPS (CloudFront), not the plain-HTTP website endpoint
+COMPRESSIONS = ("gzip", "br", "none")
+
+DEFAULT_WORKERS = 16
+DELETE_BATCH = 1000
 
 
 def get_stack_output(stack_name, region, key):
     """Fetch a CloudFormation stack output value."""
+    import boto3
     cf = boto3.client("cloudformation", region_name=region)
     resp = cf.describe_stacks(StackName=stack_name)
     for output in resp["Stacks"][0].get("Outputs", []):
@@ -49,6 +83,18 @@ def get_api_url(stack_name, region):
     return None
 
 
+def s3_client(region, endpoint_url=None, workers=DEFAULT_WORKERS):
+    """S3 client shared by all upload threads, with a connection per worker."""
+    import boto3
+    from botocore.config import Config
+    return boto3.client(
+        "s3",
+        region_name=region,
+        endpoint_url=endpoint_url,
+        config=Config(max_pool_connections=workers),
+    )
+
+
 def patch_api_base_url(file_content, api_url):
     """Replace API_BASE_URL in app.js with the deployed API Gateway URL."""
     return file_content.replace(
@@ -58,44 +104,148 @@ def patch_api_base_url(file_content, api_url):
     )
 
 
-def upload_web(bucket_name, region, api_url=None):
-    s3 = boto3.client("s3", region_name=region)
-    web_dir = os.path.abspath(WEB_DIR)
+def compress(body_bytes, compression):
+    """Compress deterministically (same input, same bytes, same ETag); None if not smaller."""
+    if compression == "gzip":
+        # Level 6 is ~4x faster than 9 for ~2% more bytes; every file is recompressed to hash it
+        compressed = gzip.compress(body_bytes, compresslevel=6, mtime=0)
+    elif compression == "br":
+        compressed = brotli.compress(body_bytes, quality=11)
+    else:
+        return None
+    return compressed if len(compressed) < len(body_bytes) else None
 
-    if not os.path.isdir(web_dir):
-        print(f"ERROR: web directory not found at {web_dir}")
-        sys.exit(1)
 
-    count = 0
+def prepare_file(fpath, key, api_url=None, compression="gzip"):
+    """Build the object exactly as it will be stored, with the MD5 S3 reports as its ETag."""
+    fname = os.path.basename(fpath)
+    ext = os.path.splitext(fname)[1].lower()
+    content_type = CONTENT_TYPES.get(ext) or mimetypes.guess_type(fname)[0] or "application/octet-stream"
+    cache_control = CACHE_CONTROL.get(ext, DEFAULT_CACHE_CONTROL)
+
+    with open(fpath, "rb") as f:
+        body_bytes = f.read()
+
+    # Patch API URL in app.js, config.js, or dashboard.html
+    if fname in PATCHED_FILES and api_url:
+        body_bytes = patch_api_base_url(body_bytes.decode("utf-8"), api_url).encode("utf-8")
+        cache_control = "no-cache"
+
+    content_encoding = None
+    if ext in TEXT_EXTENSIONS and len(body_bytes) >= MIN_COMPRESS_BYTES:
+        compressed = compress(body_bytes, compression)
+        if compressed is not None:
+            body_bytes, content_encoding = compressed, compression
+
+    return {
+        "key": key,
+        "body": body_bytes,
+        "content_type": content_type,
+        "content_encoding": content_encoding,
+        "cache_control": cache_control,
+        "etag": hashlib.md5(body_bytes, usedforsecurity=False).hexdigest(),
+    }
+
+
+def scan_web_dir(web_dir, api_url=None, compression="gzip", workers=DEFAULT_WORKERS):
+    """Prepared objects for every file under web_dir, keyed by S3 key."""
+    paths = {}
     for root, _dirs, files in os.walk(web_dir):
         for fname in files:
             fpath = os.path.join(root, fname)
-            key = os.path.relpath(fpath, web_dir).replace("\\", "/")
-            ext = os.path.splitext(fname)[1].lower()
-            content_type = CONTENT_TYPES.get(ext, "application/octet-stream")
-
-            # Read file content
-            if ext in (".html", ".js", ".css", ".json", ".svg"):
-                with open(fpath, "r", encoding="utf-8") as f:
-                    body = f.read()
-                # Patch API URL in app.js, config.js, or dashboard.html
-                if fname in ("app.js", "config.js", "dashboard.html") and api_url:
-                    body = patch_api_base_url(body, api_url)
-                body_bytes = body.encode("utf-8")
-            else:
-                with open(fpath, "rb") as f:
-                    body_bytes = f.read()
-
-            print(f"  Uploading {key}  ({content_type})")
-            s3.put_object(
-                Bucket=bucket_name,
-                Key=key,
-                Body=body_bytes,
-                ContentType=content_type,
-            )
-            count += 1
-
-    print(f"\n  {count} file(s) uploaded to s3://{bucket_name}/")
+            paths[os.path.relpath(fpath, web_dir).replace("\\", "/")] = fpath
+
+    # Compression and hashing release the GIL, so files are prepared in parallel
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {key: pool.submit(prepare_file, fpath, key, api_url, compression) for key, fpath in paths.items()}
+    return {key: future.result() for key, future in futures.items()}
+
+
+def list_remote_etags(s3, bucket_name):
+    """ETag of every object in the bucket, following list_objects_v2 pagination."""
+    etags = {}
+    for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket_name):
+        for obj in page.get("Contents", []):
+            etags[obj["Key"]] = obj["ETag"].strip('"')
+    return etags
+
+
+def put_asset(s3, bucket_name, asset):
+    extra = {"ContentEncoding": asset["content_encoding"]} if asset["content_encoding"] else {}
+    s3.put_object(
+        Bucket=bucket_name,
+        Key=asset["key"],
+        Body=asset["body"],
+        ContentType=asset["content_type"],
+        CacheControl=asset["cache_control"],
+        **extra,
+    )
+    return asset
+
+
+def delete_keys(s3, bucket_name, keys):
+    for start in range(0, len(keys), DELETE_BATCH):
+        batch = keys[start:start + DELETE_BATCH]
+        s3.delete_objects(
+            Bucket=bucket_name,
+            Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+        )
+
+
+def upload_web(bucket_name, region, api_url=None, s3=None, web_dir=WEB_DIR, workers=DEFAULT_WORKERS,
+               delete=False, force=False, compression="gzip", verbose=True):
+    """Sync web_dir to the bucket; returns counts and timings."""
+    web_dir = os.path.abspath(web_dir)
+
+    if not os.path.isdir(web_dir):
+        print(f"ERROR: web directory not found at {web_dir}")
+        sys.exit(1)
+
+    if compression == "br" and brotli is None:
+        print("ERROR: --compress br needs the 'brotli' package (pip install brotli)")
+        sys.exit(1)
+
+    s3 = s3 or s3_client(region, workers=workers)
+    timings = {}
+
+    start = time.perf_counter()
+    assets = scan_web_dir(web_dir, api_url, compression, workers)
+    timings["scan"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    remote = {} if force and not delete else list_remote_etags(s3, bucket_name)
+    timings["list"] = time.perf_counter() - start
+
+    changed = [asset for key, asset in assets.items() if force or remote.get(key) != asset["etag"]]
+    orphaned = sorted(set(remote) - set(assets)) if delete else []
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(put_asset, s3, bucket_name, asset) for asset in changed]
+        for future in as_completed(futures):
+            asset = future.result()
+            if verbose:
+                encoding = f", {asset['content_encoding']}" if asset["content_encoding"] else ""
+                print(f"  Uploaded {asset['key']}  ({asset['content_type']}{encoding})")
+    if orphaned:
+        delete_keys(s3, bucket_name, orphaned)
+        if verbose:
+            for key in orphaned:
+                print(f"  Deleted {key}")
+    timings["upload"] = time.perf_counter() - start
+
+    stats = {
+        "uploaded": len(changed),
+        "unchanged": len(assets) - len(changed),
+        "deleted": len(orphaned),
+        "bytes": sum(len(asset["body"]) for asset in changed),
+        "timings": timings,
+    }
+    if verbose:
+        print(f"\n  {stats['uploaded']} file(s) uploaded, {stats['unchanged']} unchanged, "
+              f"{stats['deleted']} deleted in s3://{bucket_name}/")
+        print("  " + ", ".join(f"{step} {seconds * 1000:.0f} ms" for step, seconds in timings.items()))
+    return stats
 
 
 def main():
@@ -103,6 +253,13 @@ def main():
     parser.add_argument("--bucket", help="S3 bucket name (auto-detected if omitted)")
     parser.add_argument("--stack", default=STACK_NAME, help="CloudFormation stack name")
     parser.add_argument("--region", default=REGION, help="AWS region")
+    parser.add_argument("--api-url", help="API URL to patch in (looked up from the stack if omitted)")
+    parser.add_argument("--endpoint-url", help="S3 endpoint, e.g. a local moto/MinIO server")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="concurrent uploads")
+    parser.add_argument("--delete", action="store_true", help="delete bucket keys that are no longer in web/")
+    parser.add_argument("--force", action="store_true", help="upload every file, changed or not")
+    parser.add_argument("--compress", choices=COMPRESSIONS, default="gzip",
+                        help="precompress text assets (br only when served over HTTPS)")
     args = parser.parse_args()
 
     bucket = args.bucket
@@ -113,12 +270,14 @@ def main():
             print("ERROR: Could not find WebBucketName output. Did the stack deploy?")
             sys.exit(1)
 
-    api_url = get_api_url(args.stack, args.region)
+    api_url = args.api_url or get_api_url(args.stack, args.region)
     print(f"API URL: {api_url}")
     print(f"Bucket:  {bucket}")
     print()
 
-    upload_web(bucket, args.region, api_url)
+    s3 = s3_client(args.region, args.endpoint_url, args.workers)
+    upload_web(bucket, args.region, api_url, s3=s3, workers=args.workers,
+               delete=args.delete, force=args.force, compression=args.compress)
 
     website_url = get_stack_output(args.stack, args.region, "WebsiteUrl")
     if website_url: